@@ -0,0 +1,60 @@
+# benchmarks/import_time.py
+# Cold-start check: imports main_api in fresh interpreters and fails when the median
+# import time is over budget. Also lists the slowest top-level imports (from
+# `python -X importtime`) so a regression points at the package responsible.
+#
+#   python -m benchmarks.import_time --budget-ms 1500
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+from typing import Dict, List, Tuple
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+MEASURE = "import time; started = time.perf_counter(); import main_api; print(time.perf_counter() - started)"
+
+
+def measure_once() -> float:
+    output = subprocess.check_output([sys.executable, "-c", MEASURE], cwd=REPO_ROOT, text=True, stderr=subprocess.DEVNULL)
+    return float(output.strip().splitlines()[-1])
+
+
+def slowest_imports(limit: int) -> List[Tuple[str, float]]:
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", "import main_api"],
+        cwd=REPO_ROOT, text=True, capture_output=True,
+    )
+    cumulative: Dict[str, float] = {}
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "|" not in line:
+            continue
+        _, total, name = line.split("|", 2)
+        # Direct imports of main_api are nested one level (three spaces) below it
+        if name.startswith("   ") and not name.startswith("    ") and total.strip().isdigit():
+            cumulative[name.strip()] = int(total.strip()) / 1000
+    return sorted(cumulative.items(), key=lambda item: item[1], reverse=True)[:limit]
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Measure the cold import time of main_api")
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--budget-ms", type=float, default=float(os.environ.get("IMPORT_TIME_BUDGET_MS", 1500)))
+    parser.add_argument("--top", type=int, default=10, help="how many of the slowest imports to list")
+    args = parser.parse_args()
+
+    timings = [measure_once() * 1000 for _ in range(args.runs)]
+    median = statistics.median(timings)
+    print(f"import main_api: median {median:.0f} ms, min {min(timings):.0f} ms, max {max(timings):.0f} ms over {args.runs} runs")
+    print("Slowest top-level imports:")
+    for name, total_ms in slowest_imports(args.top):
+        print(f"  {name:<32} {total_ms:8.1f} ms")
+    if median > args.budget_ms:
+        print(f"Over the {args.budget_ms:.0f} ms budget")
+        return 1
+    print(f"Within the {args.budget_ms:.0f} ms budget")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,392 @@
+# benchmarks/run_benchmark.py
+# Offline load test for the summarizer API. Starts the local stand-ins from
+# benchmarks/stand_ins.py (fake website + fake OpenAI-compatible LLM) and the API
+# itself, drives /summarize, /summarize/stream, /summarize/batch and /crawl at a given
+# concurrency and reports latency percentiles, throughput, peak RSS and the number of
+# Chromium processes. Results are written as JSON so runs can be compared:
+#
+#   python -m benchmarks.run_benchmark --requests 100 --concurrency 16
+#   python -m benchmarks.run_benchmark --compare bench_results/baseline.json
+#
+# Requires the API's own dependencies (and Chromium for the `spa` page kind).
+import argparse
+import asyncio
+import json
+import os
+import socket
+import statistics
+import subprocess
+import sys
+import time
+from typing import Any, Dict, List, Optional
+
+import httpx
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+SCENARIOS = ("summarize", "stream", "batch", "crawl")
+
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def _start_server(app: str, port: int, env: Dict[str, str]) -> subprocess.Popen:
+    return subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", app, "--host", "127.0.0.1", "--port", str(port), "--log-level", "warning", "--ws", "none"],
+        cwd=REPO_ROOT,
+        env={**os.environ, **env},
+        stdout=subprocess.DEVNULL,
+    )
+
+
+async def _wait_until_up(url: str, process: Optional[subprocess.Popen] = None, timeout: float = 60) -> None:
+    deadline = time.monotonic() + timeout
+    async with httpx.AsyncClient() as client:
+        while time.monotonic() < deadline:
+            if process is not None and process.poll() is not None:
+                raise RuntimeError(f"server for {url} exited with code {process.returncode}")
+            try:
+                if (await client.get(url, timeout=2)).status_code < 500:
+                    return
+            except httpx.HTTPError:
+                pass
+            await asyncio.sleep(0.2)
+    raise RuntimeError(f"{url} did not come up within {timeout} seconds")
+
+
+def _process_tree(root_pid: int) -> List[int]:
+    children: Dict[int, List[int]] = {}
+    for entry in os.listdir("/proc"):
+        if not entry.isdigit():
+            continue
+        try:
+            with open(f"/proc/{entry}/stat") as stat_file:
+                # The command name may contain spaces; the ppid follows the closing parenthesis
+                ppid = int(stat_file.read().rsplit(")", 1)[1].split()[1])
+        except (OSError, ValueError, IndexError):
+            continue
+        children.setdefault(ppid, []).append(int(entry))
+    pids, stack = [], [root_pid]
+    while stack:
+        pid = stack.pop()
+        pids.append(pid)
+        stack.extend(children.get(pid, []))
+    return pids
+
+
+def _sample_resources(root_pid: int) -> Dict[str, float]:
+    rss_kb = 0
+    chromium = 0
+    for pid in _process_tree(root_pid):
+        try:
+            with open(f"/proc/{pid}/status") as status_file:
+                for line in status_file:
+                    if line.startswith("VmRSS:"):
+                        rss_kb += int(line.split()[1])
+            with open(f"/proc/{pid}/comm") as comm_file:
+                if "chrom" in comm_file.read():
+                    chromium += 1
+        except (OSError, ValueError):
+            continue
+    return {"rss_mb": rss_kb / 1024, "chromium_processes": chromium}
+
+
+class ResourceMonitor:
+    # Polls the API's process tree in the background and keeps the peaks
+    def __init__(self, pid: Optional[int], interval: float = 0.1):
+        self.pid = pid
+        self.interval = interval
+        self.peak_rss_mb = 0.0
+        self.peak_chromium_processes = 0
+        self._task: Optional[asyncio.Task] = None
+
+    async def _run(self) -> None:
+        while True:
+            sample = await asyncio.to_thread(_sample_resources, self.pid)
+            self.peak_rss_mb = max(self.peak_rss_mb, sample["rss_mb"])
+            self.peak_chromium_processes = max(self.peak_chromium_processes, int(sample["chromium_processes"]))
+            await asyncio.sleep(self.interval)
+
+    def __enter__(self):
+        if self.pid and os.path.isdir("/proc"):
+            self._task = asyncio.ensure_future(self._run())
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        if self._task:
+            self._task.cancel()
+
+    def to_dict(self) -> Dict[str, Any]:
+        if not self._task:
+            return {"peak_rss_mb": None, "peak_chromium_processes": None}
+        return {"peak_rss_mb": round(self.peak_rss_mb, 1), "peak_chromium_processes": self.peak_chromium_processes}
+
+
+def _percentiles(values: List[float]) -> Optional[Dict[str, float]]:
+    if not values:
+        return None
+    ordered = sorted(values)
+
+    def pick(fraction: float) -> float:
+        return round(ordered[min(len(ordered) - 1, int(fraction * len(ordered)))] * 1000, 1)
+
+    return {
+        "p50": pick(0.50),
+        "p95": pick(0.95),
+        "p99": pick(0.99),
+        "mean": round(statistics.fmean(ordered) * 1000, 1),
+        "max": round(ordered[-1] * 1000, 1),
+    }
+
+
+class Workload:
+    def __init__(self, args: argparse.Namespace, site_url: str, llm_url: str):
+        self.args = args
+        self.site_url = site_url
+        self.llm_url = llm_url
+        self._counter = 0
+
+    def next_url(self) -> str:
+        # Unique query strings defeat the scrape/summary caches; --repeat-ratio sends
+        # that share of requests to a small set of hot URLs instead
+        self._counter += 1
+        kind = self.args.pages[self._counter % len(self.args.pages)]
+        page_id = self._counter % 50
+        if int(self._counter * self.args.repeat_ratio) != int((self._counter - 1) * self.args.repeat_ratio):
+            return f"{self.site_url}/{kind}/{page_id % 5}"
+        return f"{self.site_url}/{kind}/{page_id}?run={self.args.run_id}-{self._counter}"
+
+    def request_body(self, url: str) -> Dict[str, Any]:
+        return {
+            "url": url,
+            "llm_provider": "openai",
+            "api_key": "benchmark",
+            "model_name": self.args.model,
+            "base_url": f"{self.llm_url}/v1",
+        }
+
+
+async def _summarize_once(client: httpx.AsyncClient, api_url: str, workload: Workload) -> Dict[str, Any]:
+    started = time.perf_counter()
+    response = await client.post(f"{api_url}/summarize", json=workload.request_body(workload.next_url()))
+    return {"latency": time.perf_counter() - started, "ok": response.status_code == 200}
+
+
+async def _stream_once(client: httpx.AsyncClient, api_url: str, workload: Workload) -> Dict[str, Any]:
+    started = time.perf_counter()
+    first_byte = first_token = None
+    content_frames = 0
+    ok = False
+    async with client.stream("POST", f"{api_url}/summarize/stream", json=workload.request_body(workload.next_url())) as response:
+        async for line in response.aiter_lines():
+            if first_byte is None:
+                first_byte = time.perf_counter() - started
+            if not line.startswith("data: "):
+                continue
+            event = json.loads(line[6:])
+            if event.get("content"):
+                content_frames += 1
+                if first_token is None:
+                    first_token = time.perf_counter() - started
+            if event.get("error"):
+                break
+            if event.get("done"):
+                ok = True
+                break
+    return {"latency": time.perf_counter() - started, "ok": ok, "ttfb": first_byte, "first_token": first_token, "frames": content_frames}
+
+
+async def _batch_once(client: httpx.AsyncClient, api_url: str, workload: Workload) -> Dict[str, Any]:
+    started = time.perf_counter()
+    body = workload.request_body("")
+    body.pop("url")
+    body["urls"] = [workload.next_url() for _ in range(workload.args.batch_size)]
+    first_result = None
+    ok = False
+    async with client.stream("POST", f"{api_url}/summarize/batch", json=body) as response:
+        async for line in response.aiter_lines():
+            if not line.strip():
+                continue
+            result = json.loads(line)
+            if result.get("done"):
+                ok = result.get("failed") == 0
+            elif first_result is None:
+                first_result = time.perf_counter() - started
+    return {"latency": time.perf_counter() - started, "ok": ok, "first_token": first_result}
+
+
+async def _crawl_once(client: httpx.AsyncClient, api_url: str, workload: Workload) -> Dict[str, Any]:
+    # One crawl of the stand-in handbook; latency is the whole crawl including the site roll-up
+    started = time.perf_counter()
+    body = workload.request_body(f"{workload.site_url}/handbook/")
+    body.update({"max_pages": workload.args.crawl_pages, "max_depth": 3, "path_prefix": "/handbook/"})
+    first_page = None
+    ok = False
+    async with client.stream("POST", f"{api_url}/crawl", json=body) as response:
+        async for line in response.aiter_lines():
+            if not line.strip():
+                continue
+            event = json.loads(line)
+            if event.get("type") == "page" and first_page is None:
+                first_page = time.perf_counter() - started
+            elif event.get("type") == "site":
+                ok = event.get("status") == "ok" and event.get("failed") == 0
+    return {"latency": time.perf_counter() - started, "ok": ok, "first_token": first_page}
+
+
+RUNNERS = {"summarize": _summarize_once, "stream": _stream_once, "batch": _batch_once, "crawl": _crawl_once}
+
+
+async def run_scenario(name: str, api_url: str, api_pid: Optional[int], workload: Workload) -> Dict[str, Any]:
+    args = workload.args
+    total = {"batch": max(1, args.requests // args.batch_size), "crawl": 1}.get(name, args.requests)
+    semaphore = asyncio.Semaphore(args.concurrency)
+    results: List[Dict[str, Any]] = []
+
+    async with httpx.AsyncClient(timeout=args.timeout, limits=httpx.Limits(max_connections=args.concurrency * 2)) as client:
+        async def one() -> None:
+            async with semaphore:
+                try:
+                    results.append(await RUNNERS[name](client, api_url, workload))
+                except httpx.HTTPError as e:
+                    results.append({"latency": None, "ok": False, "error": str(e)})
+
+        with ResourceMonitor(api_pid) as monitor:
+            started = time.perf_counter()
+            await asyncio.gather(*(one() for _ in range(total)))
+            wall = time.perf_counter() - started
+
+    succeeded = [result for result in results if result["ok"]]
+    summary = {
+        "requests": total,
+        "errors": total - len(succeeded),
+        "concurrency": args.concurrency,
+        "wall_seconds": round(wall, 3),
+        "throughput_rps": round(len(succeeded) / wall, 2) if wall else None,
+        "latency_ms": _percentiles([result["latency"] for result in succeeded]),
+        "ttfb_ms": _percentiles([result["ttfb"] for result in succeeded if result.get("ttfb") is not None]),
+        "first_token_ms": _percentiles([result["first_token"] for result in succeeded if result.get("first_token") is not None]),
+        **monitor.to_dict(),
+    }
+    if name == "batch":
+        summary["urls_per_batch"] = args.batch_size
+    if name == "stream" and succeeded:
+        summary["content_frames_per_request"] = round(statistics.mean(result["frames"] for result in succeeded), 1)
+    return summary
+
+
+def compare(current: Dict[str, Any], baseline: Dict[str, Any]) -> None:
+    print(f"\nComparison against {baseline['meta'].get('git_commit') or 'baseline'}:")
+    print(f"{'scenario':<10} {'metric':<16} {'baseline':>10} {'current':>10} {'change':>8}")
+    for name, scenario in current["scenarios"].items():
+        before = baseline.get("scenarios", {}).get(name)
+        if not before:
+            continue
+        rows = [
+            ("p50 ms", (scenario["latency_ms"] or {}).get("p50"), (before["latency_ms"] or {}).get("p50")),
+            ("p95 ms", (scenario["latency_ms"] or {}).get("p95"), (before["latency_ms"] or {}).get("p95")),
+            ("p99 ms", (scenario["latency_ms"] or {}).get("p99"), (before["latency_ms"] or {}).get("p99")),
+            ("throughput rps", scenario["throughput_rps"], before["throughput_rps"]),
+            ("peak rss MB", scenario["peak_rss_mb"], before["peak_rss_mb"]),
+        ]
+        for metric, now, then in rows:
+            if now is None or then is None:
+                continue
+            change = f"{(now - then) / then * 100:+.1f}%" if then else "n/a"
+            print(f"{name:<10} {metric:<16} {then:>10} {now:>10} {change:>8}")
+
+
+def _git_commit() -> Optional[str]:
+    try:
+        return subprocess.check_output(["git", "rev-parse", "--short", "HEAD"], cwd=REPO_ROOT, text=True).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+async def main(args: argparse.Namespace) -> Dict[str, Any]:
+    processes: List[subprocess.Popen] = []
+    try:
+        site_port, llm_port = _free_port(), _free_port()
+        llm_env = {
+            "FAKE_LLM_TTFT_MS": str(args.llm_ttft_ms),
+            "FAKE_LLM_TOKENS_PER_SECOND": str(args.llm_tokens_per_second),
+            "FAKE_LLM_OUTPUT_TOKENS": str(args.llm_output_tokens),
+        }
+        site = _start_server("benchmarks.stand_ins:site_app", site_port, {})
+        llm = _start_server("benchmarks.stand_ins:llm_app", llm_port, llm_env)
+        processes.extend([site, llm])
+        site_url, llm_url = f"http://127.0.0.1:{site_port}", f"http://127.0.0.1:{llm_port}"
+
+        api_url, api, api_pid = args.api_url, None, None
+        if not api_url:
+            api_port = _free_port()
+            api_env = dict(item.split("=", 1) for item in args.env)
+            api = _start_server("main_api:app", api_port, api_env)
+            processes.append(api)
+            api_url, api_pid = f"http://127.0.0.1:{api_port}", api.pid
+
+        for url, process in ((f"{site_url}/", site), (f"{llm_url}/docs", llm), (f"{api_url}/health", api)):
+            await _wait_until_up(url, process)
+
+        workload = Workload(args, site_url, llm_url)
+        results: Dict[str, Any] = {
+            "meta": {
+                "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+                "git_commit": _git_commit(),
+                "args": {key: value for key, value in vars(args).items() if key not in ("compare", "output")},
+            },
+            "scenarios": {},
+        }
+        for name in args.scenarios:
+            print(f"Running {name}...", flush=True)
+            results["scenarios"][name] = await run_scenario(name, api_url, api_pid, workload)
+            print(json.dumps(results["scenarios"][name], indent=2), flush=True)
+        return results
+    finally:
+        for process in processes:
+            process.terminate()
+        for process in processes:
+            try:
+                process.wait(timeout=10)
+            except subprocess.TimeoutExpired:
+                process.kill()
+
+
+def parse_args(argv: Optional[List[str]] = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Offline latency/throughput benchmark for the summarizer API")
+    parser.add_argument("--scenarios", nargs="+", choices=SCENARIOS, default=list(SCENARIOS))
+    parser.add_argument("--pages", nargs="+", choices=("article", "spa", "docs", "pdf", "feed", "text", "json"), default=["article"],
+                        help="page kinds to request, used round-robin")
+    parser.add_argument("--requests", type=int, default=50, help="requests per scenario (URLs for batch)")
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--batch-size", type=int, default=10)
+    parser.add_argument("--crawl-pages", type=int, default=100, help="page limit for the crawl scenario")
+    parser.add_argument("--repeat-ratio", type=float, default=0.0,
+                        help="share of requests sent to a few hot URLs (exercises the caches)")
+    parser.add_argument("--model", default="gpt-4o-mini")
+    parser.add_argument("--llm-ttft-ms", type=float, default=300)
+    parser.add_argument("--llm-tokens-per-second", type=float, default=80)
+    parser.add_argument("--llm-output-tokens", type=int, default=200)
+    parser.add_argument("--timeout", type=float, default=300)
+    parser.add_argument("--api-url", help="benchmark an already running API instead of starting one")
+    parser.add_argument("--env", nargs="*", default=[], metavar="KEY=VALUE", help="extra environment for the API process")
+    parser.add_argument("--output", help="where to write the JSON results (default bench_results/<timestamp>.json)")
+    parser.add_argument("--compare", help="previous results JSON to compare against")
+    args = parser.parse_args(argv)
+    args.run_id = int(time.time())
+    return args
+
+
+if __name__ == "__main__":
+    arguments = parse_args()
+    run_results = asyncio.run(main(arguments))
+    output = arguments.output or os.path.join(REPO_ROOT, "bench_results", f"{time.strftime('%Y%m%d-%H%M%S')}.json")
+    os.makedirs(os.path.dirname(output), exist_ok=True)
+    with open(output, "w") as output_file:
+        json.dump(run_results, output_file, indent=2)
+    print(f"\nResults written to {output}")
+    if arguments.compare:
+        with open(arguments.compare) as baseline_file:
+            compare(run_results, json.load(baseline_file))
@@ -0,0 +1,232 @@
+# benchmarks/stand_ins.py
+# Local stand-ins for everything the summarizer talks to, so it can be benchmarked
+# offline and reproducibly:
+#   site_app - a small website with server-rendered, JS-rendered and very large pages,
+#              documents (/pdf/{id}, /feed/{id}, /text/{id}, /json/{id}), a crawlable
+#              docs section (/handbook/, 111 pages) and a robots.txt
+#   llm_app  - an OpenAI-compatible chat completions API with configurable latency
+#
+# Run them with uvicorn, e.g. `uvicorn benchmarks.stand_ins:llm_app --port 9100`.
+# The fake LLM reads its timing from the environment:
+#   FAKE_LLM_TTFT_MS (default 300), FAKE_LLM_TOKENS_PER_SECOND (default 80),
+#   FAKE_LLM_OUTPUT_TOKENS (default 200)
+import asyncio
+import json
+import os
+import time
+import uuid
+
+from fastapi import FastAPI, Request
+from fastapi.responses import HTMLResponse, JSONResponse, PlainTextResponse, Response, StreamingResponse
+
+WORDS = (
+    "latency throughput browser render summary cache token stream model request page "
+    "server client queue worker budget extract content network memory process context"
+).split()
+
+
+def _paragraph(seed: int, words: int = 60) -> str:
+    return " ".join(WORDS[(seed * 7 + i * 3) % len(WORDS)] for i in range(words)).capitalize() + "."
+
+
+def _boilerplate_nav(page_id: int) -> str:
+    links = "".join(f'<li><a href="/article/{(page_id + i) % 50}">Article {(page_id + i) % 50}</a></li>' for i in range(1, 6))
+    return f"<nav><ul><li><a href='/'>Home</a></li>{links}</ul></nav>"
+
+
+# --- Fake website ---
+site_app = FastAPI()
+
+
+@site_app.get("/", response_class=HTMLResponse)
+async def site_index():
+    links = "".join(f'<li><a href="/article/{i}">Article {i}</a></li>' for i in range(50))
+    return f"<html><head><title>Benchmark site</title></head><body><h1>Benchmark site</h1><ul>{links}</ul></body></html>"
+
+
+@site_app.get("/article/{page_id}", response_class=HTMLResponse)
+async def site_article(page_id: int):
+    # Server-rendered: the HTTP tier should handle these without a browser
+    paragraphs = "".join(f"<p>{_paragraph(page_id + i)}</p>" for i in range(12))
+    html = (
+        f"<html><head><title>Article {page_id}</title><link rel='stylesheet' href='/static/site.css'></head><body>"
+        f"{_boilerplate_nav(page_id)}<main><article><h1>Article {page_id}</h1>{paragraphs}</article></main>"
+        "<footer>Copyright Benchmark site. All rights reserved. Privacy | Terms | Cookies</footer></body></html>"
+    )
+    return HTMLResponse(html, headers={"ETag": f'"article-{page_id}"', "Cache-Control": "max-age=60"})
+
+
+@site_app.get("/spa/{page_id}", response_class=HTMLResponse)
+async def site_spa(page_id: int):
+    # Client-rendered: an empty app root that is filled in by script after a short delay
+    paragraphs = json.dumps("".join(f"<p>{_paragraph(page_id + i)}</p>" for i in range(12)))
+    return (
+        f"<html><head><title>App {page_id}</title></head><body><div id='root'></div>"
+        "<noscript>You need to enable JavaScript to run this app.</noscript>"
+        f"<script>setTimeout(function () {{ document.getElementById('root').innerHTML = "
+        f"'<h1>App page {page_id}</h1>' + {paragraphs}; }}, 300);</script></body></html>"
+    )
+
+
+@site_app.get("/docs/{page_id}", response_class=HTMLResponse)
+async def site_docs(page_id: int, paragraphs: int = 800):
+    # Very large page, big enough to need chunked (map-reduce) summarization
+    body = "".join(f"<h2>Section {i}</h2><p>{_paragraph(page_id + i, 120)}</p>" for i in range(paragraphs))
+    return f"<html><head><title>Docs {page_id}</title></head><body><main>{body}</main></body></html>"
+
+
+def _pdf(title: str, pages: list) -> bytes:
+    # Minimal uncompressed PDF with one line of Helvetica text per paragraph
+    objects = [b"<< /Type /Catalog /Pages 2 0 R >>", None, b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>"]
+    page_ids = []
+    for paragraphs in pages:
+        lines = "".join(f"({line[:90]}) Tj 0 -14 Td " for line in paragraphs)
+        stream = f"BT /F1 10 Tf 40 800 Td {lines}ET".encode("latin-1")
+        objects.append(b"<< /Length %d >>\nstream\n%s\nendstream" % (len(stream), stream))
+        objects.append(b"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 595 842] /Resources << /Font << /F1 3 0 R >> >> /Contents %d 0 R >>" % len(objects))
+        page_ids.append(len(objects))
+    objects[1] = b"<< /Type /Pages /Kids [%s] /Count %d >>" % (b" ".join(b"%d 0 R" % i for i in page_ids), len(page_ids))
+    objects.append(f"<< /Title ({title}) >>".encode("latin-1"))
+    output = b"%PDF-1.4\n"
+    offsets = []
+    for number, body in enumerate(objects, start=1):
+        offsets.append(len(output))
+        output += b"%d 0 obj\n%s\nendobj\n" % (number, body)
+    xref = len(output)
+    output += b"xref\n0 %d\n0000000000 65535 f \n" % (len(objects) + 1)
+    output += b"".join(b"%010d 00000 n \n" % offset for offset in offsets)
+    output += b"trailer\n<< /Size %d /Root 1 0 R /Info %d 0 R >>\nstartxref\n%d\n%%%%EOF\n" % (len(objects) + 1, len(objects), xref)
+    return output
+
+
+# Documents: served with their real content types, so the API should never render them in Chromium
+@site_app.get("/pdf/{page_id}")
+async def site_pdf(page_id: int, pages: int = 20):
+    content = [[f"{page + 1}.{line + 1} " + _paragraph(page_id + page + line, 14) for line in range(8)] for page in range(pages)]
+    return Response(_pdf(f"Report {page_id}", content), media_type="application/pdf")
+
+
+@site_app.get("/feed/{page_id}")
+async def site_feed(page_id: int, items: int = 30):
+    entries = "".join(
+        f"<item><title>Update {page_id}.{i}</title><link>/article/{(page_id + i) % 50}</link>"
+        f"<pubDate>Mon, 0{i % 9 + 1} Jan 2024 10:00:00 GMT</pubDate>"
+        f"<description>&lt;p&gt;{_paragraph(page_id + i, 30)}&lt;/p&gt;</description></item>"
+        for i in range(items)
+    )
+    xml = f"<?xml version='1.0'?><rss version='2.0'><channel><title>Benchmark feed {page_id}</title>{entries}</channel></rss>"
+    return Response(xml, media_type="application/rss+xml")
+
+
+@site_app.get("/text/{page_id}", response_class=PlainTextResponse)
+async def site_text(page_id: int):
+    return f"# Notes {page_id}\n\n" + "\n\n".join(_paragraph(page_id + i) for i in range(12))
+
+
+@site_app.get("/json/{page_id}")
+async def site_json(page_id: int):
+    return {"title": f"Record {page_id}", "items": [{"id": i, "text": _paragraph(page_id + i, 20)} for i in range(10)]}
+
+
+@site_app.get("/robots.txt", response_class=PlainTextResponse)
+async def site_robots():
+    return "User-agent: *\nDisallow: /handbook/drafts/\n"
+
+
+def _handbook_page(title: str, seed: int, links: str) -> str:
+    paragraphs = "".join(f"<p>{_paragraph(seed + i)}</p>" for i in range(6))
+    return (
+        f"<html><head><title>{title}</title></head><body>"
+        f"<nav><a href='/handbook/'>Handbook</a> {links}</nav><main><h1>{title}</h1>{paragraphs}</main></body></html>"
+    )
+
+
+# Crawlable docs section: an index of 10 chapters with 10 pages each, cross-linked
+# like a typical docs site. The drafts link is disallowed by robots.txt.
+@site_app.get("/handbook/", response_class=HTMLResponse)
+async def handbook_index():
+    chapters = "".join(f'<li><a href="/handbook/{chapter}">Chapter {chapter}</a></li>' for chapter in range(10))
+    return _handbook_page("Handbook", 0, f"<ul>{chapters}</ul><a href='/handbook/drafts/next'>Drafts</a>")
+
+
+@site_app.get("/handbook/{chapter}", response_class=HTMLResponse)
+async def handbook_chapter(chapter: int):
+    pages = "".join(f'<li><a href="/handbook/{chapter}/{page}">Page {chapter}.{page}</a></li>' for page in range(10))
+    return _handbook_page(f"Chapter {chapter}", chapter * 11, f"<ul>{pages}</ul>")
+
+
+@site_app.get("/handbook/{chapter}/{page}", response_class=HTMLResponse)
+async def handbook_page(chapter: int, page: int):
+    links = (
+        f"<a href='/handbook/{chapter}'>Chapter {chapter}</a> "
+        f"<a href='/handbook/{chapter}/{(page + 1) % 10}#top'>Next</a> "
+        f"<a href='../{(chapter + 1) % 10}/{page}?utm_source=nav'>Next chapter</a>"
+    )
+    return _handbook_page(f"Page {chapter}.{page}", chapter * 11 + page, links)
+
+
+@site_app.get("/static/site.css")
+async def site_css():
+    return HTMLResponse("body { font-family: sans-serif; }", media_type="text/css")
+
+
+# --- Fake OpenAI-compatible LLM ---
+llm_app = FastAPI()
+
+
+def _llm_settings():
+    return (
+        float(os.environ.get("FAKE_LLM_TTFT_MS", "300")) / 1000,
+        float(os.environ.get("FAKE_LLM_TOKENS_PER_SECOND", "80")),
+        int(os.environ.get("FAKE_LLM_OUTPUT_TOKENS", "200")),
+    )
+
+
+def _output_tokens(count: int):
+    return [WORDS[i % len(WORDS)] + " " for i in range(count)]
+
+
+@llm_app.post("/v1/chat/completions")
+async def fake_chat_completions(request: Request):
+    body = await request.json()
+    ttft, tokens_per_second, output_tokens = _llm_settings()
+    model = body.get("model", "fake-model")
+    completion_id = f"chatcmpl-{uuid.uuid4().hex}"
+    created = int(time.time())
+    tokens = _output_tokens(min(output_tokens, body.get("max_tokens") or output_tokens))
+    prompt_chars = sum(len(message.get("content", "")) for message in body.get("messages", []))
+
+    if not body.get("stream"):
+        await asyncio.sleep(ttft + len(tokens) / tokens_per_second)
+        return JSONResponse({
+            "id": completion_id,
+            "object": "chat.completion",
+            "created": created,
+            "model": model,
+            "choices": [{"index": 0, "message": {"role": "assistant", "content": "".join(tokens)}, "finish_reason": "stop"}],
+            "usage": {"prompt_tokens": prompt_chars // 4, "completion_tokens": len(tokens), "total_tokens": prompt_chars // 4 + len(tokens)},
+        })
+
+    async def stream():
+        await asyncio.sleep(ttft)
+        for token in tokens:
+            chunk = {
+                "id": completion_id,
+                "object": "chat.completion.chunk",
+                "created": created,
+                "model": model,
+                "choices": [{"index": 0, "delta": {"content": token}, "finish_reason": None}],
+            }
+            yield f"data: {json.dumps(chunk)}\n\n"
+            await asyncio.sleep(1 / tokens_per_second)
+        final = {
+            "id": completion_id,
+            "object": "chat.completion.chunk",
+            "created": created,
+            "model": model,
+            "choices": [{"index": 0, "delta": {}, "finish_reason": "stop"}],
+        }
+        yield f"data: {json.dumps(final)}\n\n"
+        yield "data: [DONE]\n\n"
+
+    return StreamingResponse(stream(), media_type="text/event-stream")
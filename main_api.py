@@ -1,23 +1,49 @@
 # main_api.py (your new Python API file)
+import time
+_import_started = time.perf_counter()
+
 import dotenv
 import asyncio
+import codecs
+import hashlib
+import importlib
+import math
+import email.utils
 import os
+import re
+import sqlite3
+import tempfile
+import threading
+import xml.etree.ElementTree as ElementTree
+import uuid
+from collections import OrderedDict, deque
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import asynccontextmanager, contextmanager
+from contextvars import ContextVar
+from datetime import datetime
+from html.parser import HTMLParser
+from urllib.parse import urlsplit, urlunsplit, parse_qsl, urlencode, urljoin, urldefrag
+from urllib.robotparser import RobotFileParser
 # os.environ['PYPPETEER_CHROMIUM_REVISION'] = '1263111' # Keep this if it works for your deployment
 
-from fastapi import FastAPI, HTTPException
+from fastapi import FastAPI, HTTPException, Request
 from fastapi.middleware.cors import CORSMiddleware # For allowing Next.js to call
-from fastapi.responses import StreamingResponse
+from fastapi.responses import PlainTextResponse, StreamingResponse
 from pydantic import BaseModel, Field
 from rich.console import Console
-from openai import OpenAI, AsyncOpenAI
-from openai.types.chat import ChatCompletion
-from typing import Optional, Union, Dict, List, Literal
-from pyppeteer import launch
-from pyppeteer_stealth import stealth
-from random import randint
-import google.generativeai as genai # For Google Gemini
+from typing import Any, AsyncIterator, Awaitable, Callable, Optional, Union, Dict, List, Literal, Tuple
+from random import randint, uniform
+import httpx
+# Provider SDKs (openai, anthropic, google.generativeai) and pyppeteer are imported where
+# they are first used: together they are most of this module's import time, and a
+# cold-started instance usually only ever talks to one provider.
 import json
 
+try:
+    import tiktoken # Optional: exact token counts for OpenAI models
+except ImportError:
+    tiktoken = None
+
 console = Console() # For server-side logging
 
 
@@ -32,360 +58,3764 @@ class Config:
             print("No API key was found - please head over to the troubleshooting notebook in this folder to identify & fix!")
             # raise ValueError("OPENAI_API_KEY not found in .env file")
 
-    def get(self, key: str) -> str:
-        return self._config.get(key, None)
+    def get(self, key: str, default: Optional[str] = None) -> Optional[str]:
+        # Values from the .env file win; fall back to the process environment
+        # so deployments (e.g. Cloud Run) can configure the service without a file.
+        value = self._config.get(key, None)
+        if value is None:
+            value = os.environ.get(key, default)
+        return value
+
+    def get_int(self, key: str, default: int) -> int:
+        value = self.get(key)
+        try:
+            return int(value) if value not in (None, "") else default
+        except ValueError:
+            console.print(f"[yellow]Invalid integer for {key}={value!r}, using {default}[/yellow]")
+            return default
+
+    def get_float(self, key: str, default: float) -> float:
+        value = self.get(key)
+        try:
+            return float(value) if value not in (None, "") else default
+        except ValueError:
+            console.print(f"[yellow]Invalid number for {key}={value!r}, using {default}[/yellow]")
+            return default
+
+    def get_bool(self, key: str, default: bool) -> bool:
+        value = self.get(key)
+        if value in (None, ""):
+            return default
+        return value.strip().lower() in ("1", "true", "yes", "on")
 
     @property
     def openai_api_key(self) -> str:
         return self.get("OPENAI_API_KEY")
 
-class Website:
-    __url: str
-    __title: str
-    __text: str
+    @property
+    def ollama_base_url(self) -> str:
+        return self.get("OLLAMA_BASE_URL", "http://localhost:11434/v1")
+
+# Latency buckets in seconds, from cache hits to slow LLM answers
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0)
+THROUGHPUT_BUCKETS = (1, 5, 10, 20, 40, 60, 80, 100, 150, 200, 400)
+TOKEN_BUCKETS = (100, 250, 500, 1000, 2500, 5000, 10000, 25000, 50000, 100000, 250000)
+
+
+class Histogram:
+    def __init__(self, name: str, help_text: str, buckets: Tuple[float, ...] = LATENCY_BUCKETS):
+        self.name = name
+        self.help_text = help_text
+        self.buckets = buckets
+        # label values tuple -> (bucket counts, sum, count)
+        self._series: Dict[Tuple[Tuple[str, str], ...], List[Any]] = {}
+
+    def observe(self, value: float, **labels: str) -> None:
+        key = tuple(sorted(labels.items()))
+        series = self._series.get(key)
+        if series is None:
+            series = self._series[key] = [[0] * len(self.buckets), 0.0, 0]
+        for i, bound in enumerate(self.buckets):
+            if value <= bound:
+                series[0][i] += 1
+        series[1] += value
+        series[2] += 1
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} histogram"]
+        for key, (bucket_counts, total, count) in self._series.items():
+            labels = ",".join(f'{name}="{value}"' for name, value in key)
+            prefix = f"{labels}," if labels else ""
+            for bound, bucket_count in zip(self.buckets, bucket_counts):
+                lines.append(f'{self.name}_bucket{{{prefix}le="{bound}"}} {bucket_count}')
+            lines.append(f'{self.name}_bucket{{{prefix}le="+Inf"}} {count}')
+            suffix = f"{{{labels}}}" if labels else ""
+            lines.append(f"{self.name}_sum{suffix} {total}")
+            lines.append(f"{self.name}_count{suffix} {count}")
+        return lines
+
+
+class Metrics:
+    # Minimal Prometheus registry: histograms plus gauges read from callbacks at scrape time
+    def __init__(self):
+        self.stage_seconds = Histogram("summarizer_stage_seconds", "Time spent in each stage of a summarization")
+        self.request_seconds = Histogram("summarizer_http_request_seconds", "HTTP request duration by route")
+        self.llm_tokens_per_second = Histogram(
+            "summarizer_llm_tokens_per_second", "Streaming output speed of the LLM after the first token", THROUGHPUT_BUCKETS
+        )
+        self.page_tokens = Histogram(
+            "summarizer_page_tokens", "Estimated tokens of scraped page text, full and after main-content extraction", TOKEN_BUCKETS
+        )
+        self._gauges: Dict[str, Tuple[str, Callable[[], float]]] = {}
+
+    def gauge(self, name: str, help_text: str, read: Callable[[], float]) -> None:
+        self._gauges[name] = (help_text, read)
+
+    def render(self) -> str:
+        lines: List[str] = []
+        for histogram in (self.stage_seconds, self.request_seconds, self.llm_tokens_per_second, self.page_tokens):
+            lines.extend(histogram.render())
+        for name, (help_text, read) in self._gauges.items():
+            lines.extend([f"# HELP {name} {help_text}", f"# TYPE {name} gauge", f"{name} {read()}"])
+        return "\n".join(lines) + "\n"
+
+
+class RequestTimings:
+    # Per-request stage durations, collected through a context variable and reported
+    # as a Server-Timing header and in the SSE `done` metadata
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.stages: Dict[str, float] = {}
+        self.llm_tokens_per_second: Optional[float] = None
+
+    def record(self, stage: str, seconds: float) -> None:
+        self.stages[stage] = self.stages.get(stage, 0.0) + seconds
+
+    def as_ms(self) -> Dict[str, float]:
+        timings = {stage: round(seconds * 1000, 1) for stage, seconds in self.stages.items()}
+        timings["total"] = round((time.perf_counter() - self.started) * 1000, 1)
+        return timings
+
+    def server_timing_header(self) -> str:
+        return ", ".join(f"{stage};dur={duration}" for stage, duration in self.as_ms().items())
+
+    def to_metadata(self) -> Dict[str, Any]:
+        return {"stages_ms": self.as_ms(), "llm_tokens_per_second": self.llm_tokens_per_second}
+
+
+metrics = Metrics()
+current_timings: ContextVar[Optional[RequestTimings]] = ContextVar("current_timings", default=None)
+
+
+def record_stage(stage: str, seconds: float) -> None:
+    metrics.stage_seconds.observe(seconds, stage=stage)
+    timings = current_timings.get()
+    if timings is not None:
+        timings.record(stage, seconds)
+
+
+# Listener for progress events of the current request, set by /summarize/stream
+current_progress: ContextVar[Optional[Callable[[str, Dict[str, Any]], None]]] = ContextVar("current_progress", default=None)
+
+
+def report_progress(stage: str, **details: Any) -> None:
+    listener = current_progress.get()
+    if listener is not None:
+        listener(stage, details)
+
+
+@contextmanager
+def stage_timer(stage: str):
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        record_stage(stage, time.perf_counter() - started)
+
+
+USER_AGENTS: List[str] = [
+    "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/114.0.0.0 Safari/537.36",
+    "Mozilla/5.0 (Macintosh; Intel Mac OS X 13_0) AppleWebKit/605.1.15 (KHTML, like Gecko) Version/16.0 Safari/605.1.15",
+    "Mozilla/5.0 (X11; Linux x86_64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/102.0.0.0 Safari/537.36",
+]
+
+
+def _process_tree_rss_mb(root_pid: int) -> float:
+    # Chromium spreads its memory over renderer/GPU/utility children, so sum the
+    # RSS of the whole process tree. Only works where /proc exists (Linux).
+    children: Dict[int, List[int]] = {}
+    rss_kb: Dict[int, int] = {}
+    try:
+        entries = os.listdir("/proc")
+    except OSError:
+        return 0.0
+    for entry in entries:
+        if not entry.isdigit():
+            continue
+        try:
+            with open(f"/proc/{entry}/status") as status_file:
+                ppid = None
+                rss = 0
+                for line in status_file:
+                    if line.startswith("PPid:"):
+                        ppid = int(line.split()[1])
+                    elif line.startswith("VmRSS:"):
+                        rss = int(line.split()[1])
+        except (OSError, ValueError):
+            continue
+        pid = int(entry)
+        rss_kb[pid] = rss
+        if ppid is not None:
+            children.setdefault(ppid, []).append(pid)
+
+    total_kb = 0
+    stack = [root_pid]
+    while stack:
+        pid = stack.pop()
+        total_kb += rss_kb.get(pid, 0)
+        stack.extend(children.get(pid, []))
+    return total_kb / 1024
+
+
+# Ad, analytics and tag-manager hosts whose requests never carry page text
+DEFAULT_BLOCKED_HOSTS = {
+    # Ad and tracking networks that serve nothing else
+    "doubleclick.net", "googlesyndication.com", "googleadservices.com", "google-analytics.com",
+    "googletagmanager.com", "googletagservices.com", "adservice.google.com", "facebook.net",
+    "scorecardresearch.com", "quantserve.com", "adnxs.com", "criteo.net", "amazon-adsystem.com",
+    "nr-data.net", "moatads.com", "pubmatic.com", "rubiconproject.com", "casalemedia.com",
+    # Tracking subdomains of vendors whose main domains are ordinary sites
+    "static.criteo.com", "cdn.taboola.com", "trc.taboola.com", "widgets.outbrain.com", "odb.outbrain.com",
+    "static.hotjar.com", "script.hotjar.com", "vars.hotjar.com", "api.segment.io", "cdn.segment.com",
+    "cdn.mxpnl.com", "api-js.mixpanel.com", "static.chartbeat.com", "ping.chartbeat.net",
+    "js-agent.newrelic.com", "cdn.optimizely.com", "logx.optimizely.com", "bat.bing.com",
+}
+
+# Resolves once the body has text and the DOM has been quiet for `quietMs`, or after `maxMs`
+WAIT_FOR_STABLE_TEXT_JS = """(quietMs, maxMs) => new Promise((resolve) => {
+    const start = performance.now();
+    let lastMutation = start;
+    const observer = new MutationObserver(() => { lastMutation = performance.now(); });
+    observer.observe(document.documentElement, {childList: true, subtree: true, characterData: true});
+    const check = () => {
+        const now = performance.now();
+        const hasText = !!document.body && document.body.textContent.trim().length > 0;
+        if ((hasText && now - lastMutation >= quietMs) || now - start >= maxMs) {
+            observer.disconnect();
+            resolve({waitedMs: Math.round(now - start), stable: now - start < maxMs});
+        } else {
+            setTimeout(check, 50);
+        }
+    };
+    check();
+})"""
+
+
+# Class/id hints used to score DOM blocks, in the spirit of Mozilla's Readability
+CONTENT_HINT_POSITIVE = r"article|body|content|entry|main|page|post|text|blog|story|prose"
+CONTENT_HINT_NEGATIVE = (
+    r"banner|breadcrumb|combx|comment|consent|cookie|footer|footnote|gdpr|masthead|menu|modal|"
+    r"nav|newsletter|outbrain|popup|promo|related|share|sharing|shoutbox|sidebar|skyscraper|"
+    r"social|sponsor|subscribe|widget"
+)
+# A negative hint is ignored for removal when one of these also matches
+CONTENT_HINT_KEEP = r"article|body|column|content|main"
+BOILERPLATE_SELECTOR = (
+    'nav, aside, footer, form, dialog, [role="navigation"], [role="banner"], [role="contentinfo"], '
+    '[role="complementary"], [role="dialog"], [aria-hidden="true"]'
+)
+
+# Runs in the page in a single evaluate: returns the title, the full body text and the
+# text of the highest-scoring content block (plus its high-scoring siblings) with
+# boilerplate inside it hidden. Blocks are scored by the paragraphs they hold, their
+# class/id hints and their link density; both texts have repeated lines removed.
+EXTRACT_CONTENT_JS = """(positiveHints, negativeHints, keepHints, boilerplateSelector) => {
+    const POSITIVE = new RegExp(positiveHints, 'i');
+    const NEGATIVE = new RegExp(negativeHints, 'i');
+    const KEEP = new RegExp(keepHints, 'i');
+    const dedupe = (text) => {
+        const seen = new Set();
+        return text.split('\\n').map((line) => line.replace(/\\s+/g, ' ').trim())
+            .filter((line) => line && !seen.has(line) && seen.add(line)).join('\\n');
+    };
+    const body = document.body;
+    if (!body) return {title: document.title, fullText: '', mainText: '', candidate: null};
+    const fullText = dedupe(body.innerText);
+
+    const hint = (el) => (typeof el.className === 'string' ? el.className : '') + ' ' + (el.id || '');
+    const isBoilerplate = (el) => NEGATIVE.test(hint(el)) && !KEEP.test(hint(el));
+    const TAG_WEIGHTS = {ARTICLE: 10, MAIN: 10, SECTION: 5, DIV: 5, TD: 3, BLOCKQUOTE: 3, FORM: -3, UL: -3, OL: -3, LI: -3};
+    const scores = new Map();
+    const addScore = (el, score) => {
+        if (!el || el === document.documentElement) return;
+        if (!scores.has(el)) {
+            const h = hint(el);
+            scores.set(el, (TAG_WEIGHTS[el.tagName] || 0) + (POSITIVE.test(h) ? 25 : 0) - (NEGATIVE.test(h) ? 25 : 0));
+        }
+        scores.set(el, scores.get(el) + score);
+    };
+    body.querySelectorAll('p, pre, td, blockquote').forEach((node) => {
+        if (node.closest(boilerplateSelector)) return;
+        const text = node.textContent.trim();
+        if (text.length < 25) return;
+        const score = 1 + text.split(',').length + Math.min(Math.floor(text.length / 100), 3);
+        addScore(node.parentElement, score);
+        if (node.parentElement) addScore(node.parentElement.parentElement, score / 2);
+    });
+
+    const finalScores = new Map();
+    let best = null;
+    scores.forEach((score, el) => {
+        let linkChars = 0;
+        el.querySelectorAll('a').forEach((a) => { linkChars += a.textContent.length; });
+        const linkDensity = Math.min(1, linkChars / Math.max(1, el.textContent.length));
+        finalScores.set(el, score * (1 - linkDensity));
+        if (!best || finalScores.get(el) > finalScores.get(best)) best = el;
+    });
+    if (!best) return {title: document.title, fullText, mainText: '', candidate: null};
+
+    const threshold = Math.max(10, finalScores.get(best) * 0.2);
+    const parts = best.parentElement
+        ? Array.from(best.parentElement.children).filter((el) => el === best || (finalScores.get(el) || 0) >= threshold)
+        : [best];
+    const hidden = [];
+    parts.forEach((part) => part.querySelectorAll('*').forEach((el) => {
+        if (el.style && (el.matches(boilerplateSelector) || isBoilerplate(el))) {
+            hidden.push([el, el.style.display]);
+            el.style.display = 'none';
+        }
+    }));
+    const mainText = dedupe(parts.map((part) => part.innerText).join('\\n'));
+    hidden.forEach(([el, display]) => { el.style.display = display; });
+    return {
+        title: document.title,
+        fullText,
+        mainText,
+        candidate: best.tagName.toLowerCase() + (best.id ? '#' + best.id : ''),
+    };
+}"""
+
+# Resolved hrefs of the rendered page's links, for crawl link discovery
+EXTRACT_LINKS_JS = "(limit) => Array.from(document.links, (a) => a.href).slice(0, limit)"
 
 
+class PageLoadPolicy:
+    # How the Chromium tier loads a page: which requests are aborted (heavy resources
+    # and ad/analytics hosts), and when the page counts as ready (DOM text stopped
+    # changing) within the latency budget of the request.
+    def __init__(self, global_config: Config):
+        self.block_resources = global_config.get_bool("SCRAPER_BLOCK_RESOURCES", True)
+        self.blocked_resource_types = {
+            item.strip() for item in
+            global_config.get("SCRAPER_BLOCKED_RESOURCE_TYPES", "image,media,font,stylesheet").split(",")
+            if item.strip()
+        }
+        self.blocked_hosts = set(DEFAULT_BLOCKED_HOSTS)
+        self.blocked_hosts.update(
+            item.strip().lower() for item in global_config.get("SCRAPER_BLOCKED_HOSTS", "").split(",") if item.strip()
+        )
+        self.quiet_window_ms = global_config.get_int("SCRAPER_QUIET_WINDOW_MS", 500)
+        self.budget_ms = global_config.get_int("SCRAPER_BROWSER_BUDGET_MS", 20000)
+
+    def should_block(self, resource_type: str, url: str, main_navigation: bool = False) -> bool:
+        # The page's own navigation (and its redirects) is never aborted, even on a listed
+        # host; the host list only applies to subresources and iframes
+        if main_navigation:
+            return False
+        if resource_type in self.blocked_resource_types:
+            return True
+        host = (urlsplit(url).hostname or "").lower()
+        return any(host == blocked or host.endswith("." + blocked) for blocked in self.blocked_hosts)
+
+    async def install(self, page) -> None:
+        # Called once per pooled page; the handler stays attached while the page is reused
+        if not self.block_resources:
+            return
+        await page.setRequestInterception(True)
+
+        async def handle_request(request) -> None:
+            try:
+                main_navigation = request.isNavigationRequest() and request.frame in (None, page.mainFrame)
+                if self.should_block(request.resourceType, request.url, main_navigation):
+                    await request.abort()
+                else:
+                    await request.continue_()
+            except Exception:
+                # The request was already handled or the page went away
+                pass
+
+        page.on("request", lambda request: asyncio.ensure_future(handle_request(request)))
+
+    async def wait_until_ready(self, page, remaining_ms: int) -> Dict[str, Any]:
+        if remaining_ms <= 0:
+            return {"waitedMs": 0, "stable": False}
+        return await page.evaluate(WAIT_FOR_STABLE_TEXT_JS, self.quiet_window_ms, remaining_ms)
+
+
+class _PooledBrowser:
+    def __init__(self, browser):
+        self.browser = browser
+        self.pages_served = 0
+        self.active_pages = 0
+        self.retired = False
+        # When the process tree's RSS was last measured (time.monotonic)
+        self.rss_checked_at = 0.0
+        # Idle (context, page) pairs ready to be handed out again
+        self.idle_pages: List = []
+
     @property
-    def url(self) -> str:
-        return self.__url
+    def pid(self) -> Optional[int]:
+        process = getattr(self.browser, "process", None)
+        return process.pid if process else None
+
+    def is_alive(self) -> bool:
+        process = getattr(self.browser, "process", None)
+        return process is None or process.poll() is None
+
+
+class BrowserPool:
+    # One long-lived Chromium process shared by all requests. Pages live in their own
+    # incognito contexts and are reused between requests (stealth scripts, UA and
+    # viewport are only set up once per page). The browser is recycled after it has
+    # served `max_pages_per_browser` pages or its process tree exceeds `max_rss_mb`.
+    def __init__(self, global_config: Config):
+        self.max_concurrency = global_config.get_int("BROWSER_POOL_MAX_CONCURRENCY", 4)
+        self.max_idle_pages = global_config.get_int("BROWSER_POOL_MAX_IDLE_PAGES", self.max_concurrency)
+        self.max_pages_per_browser = global_config.get_int("BROWSER_POOL_MAX_PAGES_PER_BROWSER", 200)
+        self.max_rss_mb = global_config.get_float("BROWSER_POOL_MAX_RSS_MB", 1024)
+        self.rss_check_interval = global_config.get_float("BROWSER_POOL_RSS_CHECK_INTERVAL", 5)
+        self.health_check_interval = global_config.get_float("BROWSER_POOL_HEALTH_CHECK_INTERVAL", 30)
+        self.executable_path = global_config.get("PYPPETEER_EXECUTABLE_PATH", "/usr/bin/chromium")
+        self.load_policy = PageLoadPolicy(global_config)
+        self._semaphore = asyncio.Semaphore(self.max_concurrency)
+        self._lock = asyncio.Lock()
+        self._current: Optional[_PooledBrowser] = None
+        self._health_task: Optional[asyncio.Task] = None
+        self._closed = False
+
+    async def start(self) -> None:
+        # Chromium is launched by warm_up() or by the first request that needs a page
+        self._closed = False
+        if self.health_check_interval > 0:
+            self._health_task = asyncio.create_task(self._health_loop())
+
+    async def warm_up(self) -> None:
+        # Launch the browser and park one fully set-up blank page, so the first request
+        # pays neither the Chromium launch nor the page setup
+        async with self._lock:
+            handle = await self._ensure_browser()
+            handle.active_pages += 1
+        try:
+            context, page = await self._new_page(handle)
+            await page.goto("about:blank")
+            if not handle.retired and len(handle.idle_pages) < self.max_idle_pages:
+                handle.idle_pages.append((context, page))
+            else:
+                await self._close_context(context, page)
+        finally:
+            async with self._lock:
+                handle.active_pages -= 1
+                if handle.retired and handle.active_pages == 0:
+                    await self._close_browser(handle)
+
+    async def close(self) -> None:
+        self._closed = True
+        if self._health_task:
+            self._health_task.cancel()
+            try:
+                await self._health_task
+            except asyncio.CancelledError:
+                pass
+            self._health_task = None
+        async with self._lock:
+            if self._current:
+                await self._close_browser(self._current)
+                self._current = None
+
+    async def _launch(self) -> _PooledBrowser:
+        from pyppeteer import launch
+        console.print("Launching pooled browser")
+        browser = await launch(
+                    headless=True,
+                    handleSIGINT=False,
+                    handleSIGTERM=False,
+                    handleSIGHUP=False,
+                    args=[
+                        '--no-sandbox',
+                        '--disable-setuid-sandbox',
+                        '--disable-dev-shm-usage', # Often needed in limited resource environments
+                        '--disable-gpu',           # Usually not needed for headless
+                        # Add other essential args only if proven necessary
+                    ],
+
+                    executablePath=self.executable_path
+                )
+        return _PooledBrowser(browser)
+
+    async def _ensure_browser(self) -> _PooledBrowser:
+        # Must be called with self._lock held
+        if self._current is None or self._current.retired or not self._current.is_alive():
+            if self._current is not None and not self._current.retired:
+                console.print("[yellow]Pooled browser is not alive anymore, replacing it[/yellow]")
+                self._retire(self._current)
+            self._current = await self._launch()
+        return self._current
+
+    def _retire(self, handle: _PooledBrowser) -> None:
+        handle.retired = True
+        if handle.active_pages == 0:
+            asyncio.create_task(self._close_browser(handle))
+
+    async def _close_browser(self, handle: _PooledBrowser) -> None:
+        console.print("Closing pooled browser")
+        handle.retired = True
+        for context, page in handle.idle_pages:
+            await self._close_context(context, page)
+        handle.idle_pages.clear()
+        try:
+            await handle.browser.close()
+        except Exception as e:
+            console.print(f"[yellow]Error closing pooled browser: {e}[/yellow]")
+
+    async def _close_context(self, context, page) -> None:
+        try:
+            await page.close()
+            await context.close()
+        except Exception as e:
+            console.print(f"[yellow]Error closing browser context: {e}[/yellow]")
+
+    async def _new_page(self, handle: _PooledBrowser):
+        from pyppeteer_stealth import stealth
+        context = await handle.browser.createIncognitoBrowserContext()
+        try:
+            page = await context.newPage()
+            await stealth(page)
+            page.setDefaultNavigationTimeout(60000)  # 60 seconds
+            await page.setUserAgent(USER_AGENTS[randint(0, len(USER_AGENTS) - 1)])
+            # Set viewport to a reasonable desktop size
+            await page.setViewport({'width': 1280, 'height': 800})
+            await self.load_policy.install(page)
+        except Exception:
+            await context.close()
+            raise
+        return context, page
+
+    async def _reset_page(self, page) -> bool:
+        try:
+            await page.goto("about:blank")
+            await page._client.send("Network.clearBrowserCookies")
+            return True
+        except Exception as e:
+            console.print(f"[yellow]Could not reset pooled page, discarding it: {e}[/yellow]")
+            return False
+
+    def _needs_recycle(self, handle: _PooledBrowser) -> bool:
+        if handle.pages_served >= self.max_pages_per_browser:
+            console.print(f"Recycling browser after {handle.pages_served} pages")
+            return True
+        return False
+
+    async def _over_memory_limit(self, handle: _PooledBrowser) -> bool:
+        # Measuring walks all of /proc, so it runs in a worker thread outside the pool
+        # lock and at most once every `rss_check_interval` seconds per browser
+        if self.max_rss_mb <= 0 or not handle.pid:
+            return False
+        now = time.monotonic()
+        if now - handle.rss_checked_at < self.rss_check_interval:
+            return False
+        handle.rss_checked_at = now
+        rss_mb = await asyncio.to_thread(_process_tree_rss_mb, handle.pid)
+        if rss_mb > self.max_rss_mb:
+            console.print(f"Recycling browser at {rss_mb:.0f} MB RSS (limit {self.max_rss_mb:.0f} MB)")
+            return True
+        return False
+
+    @asynccontextmanager
+    async def page(self):
+        if self._closed:
+            raise RuntimeError("Browser pool is closed")
+        acquire_started = time.perf_counter()
+        async with self._semaphore:
+            async with self._lock:
+                handle = await self._ensure_browser()
+                handle.active_pages += 1
+                handle.pages_served += 1
+                pooled = handle.idle_pages.pop() if handle.idle_pages else None
+
+            context = page = None
+            reusable = False
+            try:
+                context, page = pooled or await self._new_page(handle)
+                record_stage("browser_acquire", time.perf_counter() - acquire_started)
+                yield page
+                reusable = True
+            finally:
+                if page is not None:
+                    keep = (
+                        reusable
+                        and not handle.retired
+                        and len(handle.idle_pages) < self.max_idle_pages
+                        and await self._reset_page(page)
+                    )
+                    if keep:
+                        handle.idle_pages.append((context, page))
+                    else:
+                        await self._close_context(context, page)
+                over_memory = not handle.retired and await self._over_memory_limit(handle)
+                async with self._lock:
+                    handle.active_pages -= 1
+                    if not handle.retired and (over_memory or self._needs_recycle(handle)):
+                        handle.retired = True
+                    if handle.retired and handle.active_pages == 0:
+                        await self._close_browser(handle)
 
     @property
-    def title(self) -> str:
-        return self.__title
+    def active_pages(self) -> int:
+        return self._current.active_pages if self._current else 0
+
+    async def check_health(self) -> bool:
+        async with self._lock:
+            handle = self._current
+        if handle is None:
+            return False
+        try:
+            await asyncio.wait_for(handle.browser.version(), timeout=5)
+            return handle.is_alive()
+        except Exception as e:
+            console.print(f"[yellow]Browser health check failed: {e}[/yellow]")
+            return False
+
+    async def _health_loop(self) -> None:
+        while True:
+            await asyncio.sleep(self.health_check_interval)
+            try:
+                healthy = await self.check_health()
+                handle = self._current
+                over_memory = handle is not None and await self._over_memory_limit(handle)
+                async with self._lock:
+                    if handle is not self._current or handle is None or handle.retired:
+                        continue
+                    if not healthy or over_memory or self._needs_recycle(handle):
+                        self._retire(handle)
+                        self._current = None
+                        await self._ensure_browser()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                console.print(f"[red]Browser pool health loop error: {e}[/red]")
+
+
+# Query parameters that only track where a click came from; they never change the page
+TRACKING_QUERY_PARAMS = ("utm_", "fbclid", "gclid", "mc_cid", "mc_eid")
+
+
+def normalize_url(url: str) -> str:
+    # Canonical form used as cache/dedup key: lowercase scheme and host, default
+    # ports and fragments dropped, tracking parameters removed, query sorted.
+    parts = urlsplit(url.strip())
+    scheme = (parts.scheme or "http").lower()
+    host = (parts.hostname or "").lower()
+    port = parts.port
+    if port is None or (scheme, port) in (("http", 80), ("https", 443)):
+        netloc = host
+    else:
+        netloc = f"{host}:{port}"
+    if parts.username:
+        netloc = f"{parts.username}@{netloc}"
+    query = urlencode(sorted(
+        (key, value)
+        for key, value in parse_qsl(parts.query, keep_blank_values=True)
+        if not key.lower().startswith(TRACKING_QUERY_PARAMS)
+    ))
+    return urlunsplit((scheme, netloc, parts.path or "/", query, ""))
+
+
+class LruCache:
+    # In-memory LRU bounded by entry count and by the approximate size of the values.
+    # `on_evict` is called with each value pushed out to make room.
+    def __init__(self, max_entries: int, max_bytes: int, on_evict: Optional[Callable[[Any], None]] = None):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.on_evict = on_evict
+        self._entries: "OrderedDict[str, Tuple[int, Any]]" = OrderedDict()
+        self._bytes = 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, key: str) -> Any:
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        self._entries.move_to_end(key)
+        return entry[1]
+
+    def set(self, key: str, value: Any, size: int) -> None:
+        self.pop(key)
+        if self.max_entries <= 0 or size > self.max_bytes:
+            return
+        self._entries[key] = (size, value)
+        self._bytes += size
+        while len(self._entries) > self.max_entries or self._bytes > self.max_bytes:
+            _, (evicted_size, evicted) = self._entries.popitem(last=False)
+            self._bytes -= evicted_size
+            if self.on_evict is not None:
+                self.on_evict(evicted)
+
+    def pop(self, key: str) -> Any:
+        entry = self._entries.pop(key, None)
+        if entry is None:
+            return None
+        self._bytes -= entry[0]
+        return entry[1]
+
+    def values(self) -> List[Any]:
+        return [value for _, value in self._entries.values()]
+
+    def clear(self) -> None:
+        self._entries.clear()
+        self._bytes = 0
+
+
+class SqliteCacheTier:
+    # Optional on-disk tier: JSON values in a single SQLite table, evicted by least
+    # recent access once the stored values exceed `max_bytes`. Calls are blocking, so
+    # callers run them in a worker thread.
+    def __init__(self, path: str, table: str, max_bytes: int):
+        self.table = table
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute(
+            f"CREATE TABLE IF NOT EXISTS {table} ("
+            "key TEXT PRIMARY KEY, value TEXT NOT NULL, size INTEGER NOT NULL, accessed_at REAL NOT NULL)"
+        )
+        self._db.commit()
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            row = self._db.execute(f"SELECT value FROM {self.table} WHERE key = ?", (key,)).fetchone()
+            if row is None:
+                return None
+            self._db.execute(f"UPDATE {self.table} SET accessed_at = ? WHERE key = ?", (time.time(), key))
+            self._db.commit()
+        return json.loads(row[0])
+
+    def set(self, key: str, value: Dict[str, Any]) -> None:
+        payload = json.dumps(value)
+        size = len(payload)
+        with self._lock:
+            self._db.execute(
+                f"INSERT OR REPLACE INTO {self.table} (key, value, size, accessed_at) VALUES (?, ?, ?, ?)",
+                (key, payload, size, time.time()),
+            )
+            total = self._db.execute(f"SELECT COALESCE(SUM(size), 0) FROM {self.table}").fetchone()[0]
+            while total > self.max_bytes:
+                oldest = self._db.execute(
+                    f"SELECT key, size FROM {self.table} ORDER BY accessed_at ASC LIMIT 1"
+                ).fetchone()
+                if oldest is None:
+                    break
+                self._db.execute(f"DELETE FROM {self.table} WHERE key = ?", (oldest[0],))
+                total -= oldest[1]
+            self._db.commit()
+
+    def delete(self, key: str) -> None:
+        with self._lock:
+            self._db.execute(f"DELETE FROM {self.table} WHERE key = ?", (key,))
+            self._db.commit()
+
+    def close(self) -> None:
+        with self._lock:
+            self._db.close()
+
+
+class ScrapeCache:
+    # Caches scraped title + text per normalized URL. Entries younger than `ttl` are
+    # served as-is; older entries that carry an ETag/Last-Modified are revalidated
+    # with a conditional GET (cheap 304) before falling back to a full re-render.
+    def __init__(self, global_config: Config):
+        self.ttl = global_config.get_float("SCRAPE_CACHE_TTL_SECONDS", 600)
+        self.max_stale = global_config.get_float("SCRAPE_CACHE_MAX_STALE_SECONDS", 86400)
+        self.memory = LruCache(
+            max_entries=global_config.get_int("SCRAPE_CACHE_MAX_ENTRIES", 512),
+            max_bytes=int(global_config.get_float("SCRAPE_CACHE_MAX_MB", 64) * 1024 * 1024),
+        )
+        self.sqlite_path = global_config.get("SCRAPE_CACHE_SQLITE_PATH")
+        self.sqlite_max_bytes = int(global_config.get_float("SCRAPE_CACHE_SQLITE_MAX_MB", 512) * 1024 * 1024)
+        self.disk: Optional[SqliteCacheTier] = None
 
     @property
-    def text(self) -> str:
-        return self.__text
+    def enabled(self) -> bool:
+        return self.ttl > 0
 
-    
-    async def scrape_async(self) -> None:
-        console.print("Started scraping")
-        browser = None
-        page = None
-        try:
-            browser = await launch(
-                        headless=True,
-                        handleSIGINT=False,
-                        handleSIGTERM=False,
-                        handleSIGHUP=False,
-                        args=[
-                            '--no-sandbox',
-                            '--disable-setuid-sandbox',
-                            '--disable-dev-shm-usage', # Often needed in limited resource environments
-                            '--disable-gpu',           # Usually not needed for headless
-                            # Add other essential args only if proven necessary
-                        ],
-
-                        executablePath='/usr/bin/chromium' 
-                    )
-            page = await browser.newPage()
-            await stealth(page)
+    def open(self) -> None:
+        if self.sqlite_path and self.enabled:
+            self.disk = SqliteCacheTier(self.sqlite_path, "scrape_cache", self.sqlite_max_bytes)
+
+    def close(self) -> None:
+        if self.disk:
+            self.disk.close()
+            self.disk = None
+
+    async def _load(self, key: str) -> Optional[Dict[str, Any]]:
+        entry = self.memory.get(key)
+        if entry is None and self.disk:
+            entry = await asyncio.to_thread(self.disk.get, key)
+            if entry is not None:
+                self.memory.set(key, entry, len(entry["text"]) + len(entry["title"]))
+        return entry
+
+    async def _store(self, key: str, entry: Dict[str, Any]) -> None:
+        self.memory.set(key, entry, len(entry["text"]) + len(entry["title"]))
+        if self.disk:
+            await asyncio.to_thread(self.disk.set, key, entry)
+
+    async def _drop(self, key: str) -> None:
+        self.memory.pop(key)
+        if self.disk:
+            await asyncio.to_thread(self.disk.delete, key)
+
+    async def _revalidate(self, url: str, entry: Dict[str, Any]) -> bool:
+        headers = {"User-Agent": USER_AGENTS[0]}
+        if entry.get("etag"):
+            headers["If-None-Match"] = entry["etag"]
+        if entry.get("last_modified"):
+            headers["If-Modified-Since"] = entry["last_modified"]
+        if len(headers) == 1:
+            return False
+        try:
+            client = get_http_client()
+            async with client.stream("GET", url, headers=headers, timeout=10) as response:
+                # Don't download the body, a 200 means we re-render anyway
+                return response.status_code == 304
+        except Exception as e:
+            console.print(f"[yellow]Revalidation of {url} failed: {e}[/yellow]")
+            return False
+
+    async def get(self, url: str) -> Optional[Dict[str, Any]]:
+        if not self.enabled:
+            return None
+        key = normalize_url(url)
+        entry = await self._load(key)
+        if entry is None:
+            return None
+        age = time.time() - entry["stored_at"]
+        if age < self.ttl:
+            return dict(entry, cache_status="hit")
+        if age < self.max_stale and await self._revalidate(url, entry):
+            entry = dict(entry, stored_at=time.time())
+            await self._store(key, entry)
+            return dict(entry, cache_status="revalidated")
+        await self._drop(key)
+        return None
+
+    async def put(self, website: "Website") -> None:
+        if not self.enabled:
+            return
+        await self._store(normalize_url(website.url), {
+            "title": website.title,
+            "text": website.text,
+            "links": website.links,
+            "etag": website.validators.get("etag"),
+            "last_modified": website.validators.get("last-modified"),
+            "stored_at": time.time(),
+        })
+
+
+_http_client = None
+
+
+def get_http_client():
+    # Shared connection-pooled HTTP client, created on first use and closed in the lifespan hook
+    global _http_client
+    if _http_client is None or _http_client.is_closed:
+        _http_client = httpx.AsyncClient(
+            follow_redirects=True,
+            timeout=httpx.Timeout(15.0, connect=5.0),
+            limits=httpx.Limits(max_connections=100, max_keepalive_connections=20),
+        )
+    return _http_client
+
+
+async def close_http_client() -> None:
+    global _http_client
+    if _http_client is not None:
+        await _http_client.aclose()
+        _http_client = None
+
+
+# Elements whose text never shows up in document.body.innerText
+HTML_SKIP_TAGS = {"script", "style", "noscript", "template", "svg", "canvas", "iframe", "head", "object"}
+# Elements that start a new line in rendered text
+HTML_BLOCK_TAGS = {
+    "address", "article", "aside", "blockquote", "br", "dd", "div", "dl", "dt", "fieldset",
+    "figcaption", "figure", "footer", "form", "h1", "h2", "h3", "h4", "h5", "h6", "header",
+    "hr", "li", "main", "nav", "ol", "p", "pre", "section", "table", "tr", "td", "th", "ul",
+}
+HTML_VOID_TAGS = {"area", "base", "br", "col", "embed", "hr", "img", "input", "link", "meta", "param", "source", "track", "wbr"}
+# Empty mount points of client-side frameworks
+SPA_ROOT_IDS = {"root", "app", "__next", "__nuxt", "svelte", "___gatsby", "main-app"}
+SPA_ATTRIBUTES = ("ng-app", "ng-version", "data-reactroot", "data-server-rendered")
+# Elements whose text is boilerplate; the HTTP-tier counterpart of BOILERPLATE_SELECTOR
+BOILERPLATE_TAGS = {"nav", "aside", "footer", "form", "dialog"}
+BOILERPLATE_ROLES = {"navigation", "banner", "contentinfo", "complementary", "dialog"}
+# Links kept per scraped page; enough for a docs index, bounded for huge link farms
+MAX_PAGE_LINKS = 2000
+
+
+def resolve_links(base_url: str, hrefs: List[str]) -> List[str]:
+    # Absolute http(s) URLs of a page's links, without fragments, duplicates or javascript:/mailto: targets
+    links = []
+    seen = set()
+    for href in hrefs:
+        absolute, _ = urldefrag(urljoin(base_url, href.strip()))
+        if absolute.startswith(("http://", "https://")) and absolute not in seen:
+            seen.add(absolute)
+            links.append(absolute)
+            if len(links) >= MAX_PAGE_LINKS:
+                break
+    return links
+
+
+def dedupe_lines(text: str) -> str:
+    # Drop blank and repeated lines (menus, share buttons and cookie notices tend to repeat)
+    seen = set()
+    lines = []
+    for line in text.split("\n"):
+        line = " ".join(line.split())
+        if line and line not in seen:
+            seen.add(line)
+            lines.append(line)
+    return "\n".join(lines)
+
+
+class HtmlTextExtractor(HTMLParser):
+    # Incremental HTML -> text converter that approximates document.body.innerText.
+    # Feed it chunks as they arrive; it also records the signals used to decide
+    # whether the page needs a real browser.
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self.title = ""
+        self.markup_chars = 0
+        self.spa_markers: List[str] = []
+        self.noscript_warning = False
+        self._parts: List[str] = []
+        self._skip_depth = 0
+        self._in_title = False
+        self._capturing_title = False
+        self._title_done = False
+        self._in_body = False
+        # Depth inside <svg>/<math>, whose <title> elements are icon labels, not the page's
+        self._foreign_depth = 0
+        self._in_noscript = False
+        self._open_roots: List[str] = []
+        self._root_text_chars = 0
+        # Text outside boilerplate elements, for main-content extraction
+        self._main_parts: List[str] = []
+        self._boilerplate_tag: Optional[str] = None
+        self._boilerplate_depth = 0
+        # Raw href values of anchors (and <base href>), for crawl link discovery
+        self.links: List[str] = []
+        self.base_href: Optional[str] = None
+
+    def feed(self, data: str) -> None:
+        self.markup_chars += len(data)
+        super().feed(data)
+
+    def handle_starttag(self, tag: str, attrs: List[Tuple[str, Optional[str]]]) -> None:
+        if tag in ("svg", "math"):
+            self._foreign_depth += 1
+        if tag == "body":
+            self._in_body = True
+        if tag == "title":
+            self._in_title = True
+            # Only the document's first <title>, in the (possibly implied) <head>
+            self._capturing_title = not self._title_done and not self._in_body and not self._foreign_depth
+        if tag == "noscript":
+            self._in_noscript = True
+        if tag in HTML_SKIP_TAGS and tag not in HTML_VOID_TAGS:
+            self._skip_depth += 1
+        if tag in HTML_BLOCK_TAGS:
+            self._parts.append("\n")
+            self._main_parts.append("\n")
+        attributes = dict(attrs)
+        if self._boilerplate_tag == tag:
+            self._boilerplate_depth += 1
+        elif self._boilerplate_tag is None and tag not in HTML_VOID_TAGS and self._is_boilerplate(tag, attributes):
+            self._boilerplate_tag = tag
+            self._boilerplate_depth = 1
+        if tag == "a" and attributes.get("href"):
+            self.links.append(attributes["href"])
+        if tag == "base" and attributes.get("href") and self.base_href is None:
+            self.base_href = attributes["href"]
+        if any(name in attributes for name in SPA_ATTRIBUTES):
+            self.spa_markers.append(tag)
+        if tag == "div" and attributes.get("id") in SPA_ROOT_IDS:
+            self._open_roots.append(attributes["id"])
+            self._root_text_chars = 0
+
+    def handle_startendtag(self, tag: str, attrs: List[Tuple[str, Optional[str]]]) -> None:
+        attributes = dict(attrs)
+        if tag == "base" and attributes.get("href") and self.base_href is None:
+            self.base_href = attributes["href"]
+        if tag in HTML_BLOCK_TAGS:
+            self._parts.append("\n")
+            self._main_parts.append("\n")
+
+    def handle_endtag(self, tag: str) -> None:
+        if tag in ("svg", "math") and self._foreign_depth:
+            self._foreign_depth -= 1
+        if tag == "title":
+            self._in_title = False
+            if self._capturing_title:
+                self._capturing_title = False
+                self._title_done = True
+        if tag == "noscript":
+            self._in_noscript = False
+        if tag in HTML_SKIP_TAGS and self._skip_depth:
+            self._skip_depth -= 1
+        if tag in HTML_BLOCK_TAGS:
+            self._parts.append("\n")
+            self._main_parts.append("\n")
+        if tag == self._boilerplate_tag:
+            self._boilerplate_depth -= 1
+            if self._boilerplate_depth == 0:
+                self._boilerplate_tag = None
+        if tag == "div" and self._open_roots:
+            # An app root that closes without any text is a client-rendered shell
+            root_id = self._open_roots.pop()
+            if self._root_text_chars == 0:
+                self.spa_markers.append(f"#{root_id}")
+
+    def handle_data(self, data: str) -> None:
+        if self._in_title:
+            if self._capturing_title:
+                self.title += data
+            return
+        if self._in_noscript and "javascript" in data.lower():
+            self.noscript_warning = True
+        if self._skip_depth:
+            return
+        collapsed = " ".join(data.split())
+        if collapsed:
+            self._parts.append(collapsed)
+            self._root_text_chars += len(collapsed)
+            if self._boilerplate_tag is None:
+                self._main_parts.append(collapsed)
+
+    @staticmethod
+    def _is_boilerplate(tag: str, attributes: Dict[str, Optional[str]]) -> bool:
+        if tag in BOILERPLATE_TAGS or attributes.get("role") in BOILERPLATE_ROLES or attributes.get("aria-hidden") == "true":
+            return True
+        hints = f"{attributes.get('class') or ''} {attributes.get('id') or ''}"
+        return bool(re.search(CONTENT_HINT_NEGATIVE, hints, re.I)) and not re.search(CONTENT_HINT_KEEP, hints, re.I)
+
+    def get_text(self) -> str:
+        lines = [" ".join(line.split()) for line in " ".join(self._parts).split("\n")]
+        return "\n".join(line for line in lines if line)
+
+    def get_main_text(self) -> str:
+        # Page text without boilerplate elements and repeated lines
+        return dedupe_lines(" ".join(self._main_parts))
+
+
+class ContentExtractor:
+    # Decides what page text is sent to the LLM: the extracted main content when it
+    # leaves enough text, otherwise the full page text. Token counts before and after
+    # are logged and exported so the savings are visible.
+    def __init__(self, global_config: Config):
+        self.enabled = global_config.get_bool("SCRAPER_MAIN_CONTENT", True)
+        self.min_chars = global_config.get_int("SCRAPER_MAIN_CONTENT_MIN_CHARS", 250)
+        self.min_ratio = global_config.get_float("SCRAPER_MAIN_CONTENT_MIN_RATIO", 0.1)
+
+    def choose(self, url: str, full_text: str, main_text: str) -> Tuple[str, Dict[str, Any]]:
+        use_main = (
+            self.enabled
+            and len(main_text) >= self.min_chars
+            and len(main_text) >= self.min_ratio * len(full_text)
+        )
+        # Token counts are only for reporting, so the default OpenAI model's tokenizer will do
+        tokens_before = count_tokens(full_text, DEFAULT_MODELS["openai"])
+        tokens_after = count_tokens(main_text, DEFAULT_MODELS["openai"]) if use_main else tokens_before
+        metrics.page_tokens.observe(tokens_before, text="full")
+        metrics.page_tokens.observe(tokens_after, text="sent")
+        if use_main:
+            saved = 100 * (1 - tokens_after / tokens_before) if tokens_before else 0
+            console.print(f"Main content of {url}: {tokens_before} -> {tokens_after} tokens ({saved:.0f}% fewer)")
+        elif self.enabled:
+            console.print(f"[yellow]Main-content extraction left {len(main_text)} characters for {url}, using the full text ({tokens_before} tokens)[/yellow]")
+        return (main_text if use_main else full_text), {
+            "method": "main_content" if use_main else "full_text",
+            "tokens_before": tokens_before,
+            "tokens_after": tokens_after,
+        }
+
+    def document(self, url: str, kind: str, text: str, details: Dict[str, Any]) -> Dict[str, Any]:
+        # Documents are sent as extracted; the method names the fast path that read them
+        tokens = count_tokens(text, DEFAULT_MODELS["openai"])
+        metrics.page_tokens.observe(tokens, text="full")
+        metrics.page_tokens.observe(tokens, text="sent")
+        console.print(f"Extracted {tokens} tokens from {kind} document {url}")
+        return dict(details, method=kind, tokens_before=tokens, tokens_after=tokens)
+
+
+# Documents that are extracted straight from the HTTP response, never in a browser
+DOCUMENT_CONTENT_TYPES = {
+    "application/pdf": "pdf",
+    "application/x-pdf": "pdf",
+    "text/plain": "text",
+    "text/markdown": "text",
+    "text/x-markdown": "text",
+    "text/csv": "text",
+    "application/json": "json",
+    "application/ld+json": "json",
+    "application/feed+json": "json",
+    "application/rss+xml": "feed",
+    "application/atom+xml": "feed",
+    "application/rdf+xml": "feed",
+}
+DOCUMENT_KINDS = {"pdf", "text", "json", "feed"}
+# Generic XML is only a feed when its root element says so
+XML_CONTENT_TYPES = {"application/xml", "text/xml"}
+FEED_ROOT_MARKERS = (b"<rss", b"<feed", b"<rdf:rdf")
+DOCUMENT_SNIFF_BYTES = 2048
+
+
+def document_kind(content_type: str, head: bytes = b"") -> Optional[str]:
+    # "html" for web pages, "pdf"/"text"/"json"/"feed" for documents with a fast path and
+    # None for anything else. `head` (the first bytes of the body, when known) catches PDFs
+    # served as application/octet-stream and feeds served as plain XML.
+    media_type = content_type.split(";")[0].strip().lower()
+    if head.lstrip().startswith(b"%PDF-"):
+        return "pdf"
+    if media_type in DOCUMENT_CONTENT_TYPES:
+        return DOCUMENT_CONTENT_TYPES[media_type]
+    if media_type.endswith("+json"):
+        return "json"
+    if media_type == "application/xhtml+xml":
+        # Ordinary XHTML pages; checked before the generic +xml (feed) branch
+        return "html"
+    if media_type in XML_CONTENT_TYPES or media_type.endswith("+xml"):
+        return "feed" if any(marker in head[:DOCUMENT_SNIFF_BYTES].lower() for marker in FEED_ROOT_MARKERS) else None
+    if not media_type or "html" in media_type:
+        return "html"
+    return None
+
+
+def _document_name(url: str) -> str:
+    parts = urlsplit(url)
+    return os.path.basename(parts.path.rstrip("/")) or parts.hostname or url
+
+
+def _local_name(tag: str) -> str:
+    # "{http://www.w3.org/2005/Atom}entry" -> "entry", "content:encoded" stays as is
+    return tag.rsplit("}", 1)[-1].lower()
+
+
+def html_to_text(markup: str) -> str:
+    extractor = HtmlTextExtractor()
+    extractor.feed(markup)
+    extractor.close()
+    return extractor.get_text()
+
+
+class DocumentExtractor:
+    # Fast paths for responses that are not web pages: PDF (page by page, up to a page
+    # cap), plain text, JSON and RSS/Atom feeds. Bodies are read as a stream with a size
+    # cap; PDFs are spooled to a temporary file once they outgrow memory and parsed in a
+    # thread, so large documents never sit in memory whole or block the event loop.
+    def __init__(self, global_config: Config):
+        self.max_bytes = int(global_config.get_float("SCRAPER_MAX_DOCUMENT_MB", 20) * 1024 * 1024)
+        self.pdf_max_pages = global_config.get_int("SCRAPER_PDF_MAX_PAGES", 50)
+        self.pdf_spool_bytes = 4 * 1024 * 1024
+        self.feed_max_items = global_config.get_int("SCRAPER_FEED_MAX_ITEMS", 50)
+        self.json_max_lines = global_config.get_int("SCRAPER_JSON_MAX_LINES", 5000)
+
+    async def extract(self, kind: str, url: str, chunks: AsyncIterator[bytes], encoding: Optional[str]) -> Dict[str, Any]:
+        # Returns title, text, links and `details` for the extraction metadata
+        try:
+            if kind == "pdf":
+                return await self._extract_pdf(url, chunks)
+            if kind == "feed":
+                return await self._extract_feed(url, chunks)
+            text, truncated = await self._read_text(url, chunks, encoding)
+            return self._extract_json(url, text, truncated) if kind == "json" else self._extract_text(url, text, truncated)
+        except httpx.HTTPError as e:
+            raise HTTPException(status_code=502, detail=f"Failed to download {url}: {type(e).__name__}: {e}")
+        except HTTPException:
+            raise
+        except Exception as e:
+            # Any other failure (e.g. RecursionError on deeply nested JSON) is still an
+            # unreadable document; it must not fall through to the browser tier
+            raise HTTPException(status_code=422, detail=f"Could not read the {kind} document at {url}: {type(e).__name__}: {e}")
+
+    async def _read_text(self, url: str, chunks: AsyncIterator[bytes], encoding: Optional[str]) -> Tuple[str, bool]:
+        decoder = codecs.getincrementaldecoder(encoding or "utf-8")(errors="replace")
+        parts: List[str] = []
+        received = 0
+        async for chunk in chunks:
+            received += len(chunk)
+            parts.append(decoder.decode(chunk))
+            if received >= self.max_bytes:
+                console.print(f"[yellow]Stopped reading {url} after {received} bytes[/yellow]")
+                return "".join(parts), True
+        parts.append(decoder.decode(b"", final=True))
+        return "".join(parts), False
+
+    def _extract_text(self, url: str, text: str, truncated: bool) -> Dict[str, Any]:
+        text = "\n".join(line.rstrip() for line in text.splitlines()).strip()
+        first_line = next((line.strip() for line in text.splitlines() if line.strip()), "")
+        # A leading Markdown heading makes a good title; other first lines only when short
+        title = first_line.lstrip("#").strip() if first_line.startswith("#") or len(first_line) <= 80 else ""
+        return {"title": title[:120] or _document_name(url), "text": text, "links": [], "details": {"truncated": truncated}}
+
+    def _extract_json(self, url: str, raw: str, truncated: bool) -> Dict[str, Any]:
+        try:
+            value = json.loads(raw)
+        except ValueError:
+            # Truncated or invalid: the raw text is still readable
+            return {"title": _document_name(url), "text": raw.strip(), "links": [], "details": {"truncated": truncated, "parsed": False}}
+        lines: List[str] = []
+        self._flatten_json(value, "", lines)
+        title = _document_name(url)
+        if isinstance(value, dict):
+            title = next((value[key] for key in ("title", "name") if isinstance(value.get(key), str)), title)
+        return {
+            "title": title[:120],
+            "text": "\n".join(lines[:self.json_max_lines]),
+            "links": [],
+            "details": {"truncated": truncated or len(lines) > self.json_max_lines, "parsed": True},
+        }
+
+    def _flatten_json(self, value: Any, path: str, lines: List[str]) -> None:
+        # One "path: value" line per scalar, e.g. "items[0].title: Hello"
+        if len(lines) > self.json_max_lines:
+            return
+        if isinstance(value, dict):
+            for key, item in value.items():
+                self._flatten_json(item, f"{path}.{key}" if path else str(key), lines)
+        elif isinstance(value, list):
+            for index, item in enumerate(value):
+                self._flatten_json(item, f"{path}[{index}]", lines)
+        elif value is not None and value != "":
+            lines.append(f"{path or 'value'}: {value}")
+
+    async def _extract_feed(self, url: str, chunks: AsyncIterator[bytes]) -> Dict[str, Any]:
+        # Incremental XML parse; every item is turned into text and then cleared, and
+        # reading stops as soon as enough items have been collected
+        parser = ElementTree.XMLPullParser(events=("start", "end"))
+        stack: List[str] = []
+        feed_title = ""
+        items: List[str] = []
+        links: List[str] = []
+        received = 0
+        try:
+            async for chunk in chunks:
+                received += len(chunk)
+                parser.feed(chunk)
+                for event, element in parser.read_events():
+                    name = _local_name(element.tag)
+                    if event == "start":
+                        stack.append(name)
+                        continue
+                    stack.pop()
+                    if name == "title" and not feed_title and stack and stack[-1] in ("channel", "feed"):
+                        feed_title = " ".join((element.text or "").split())
+                    elif name in ("item", "entry"):
+                        text, link = self._feed_item(element, url)
+                        items.append(text)
+                        if link:
+                            links.append(link)
+                        element.clear()
+                if len(items) >= self.feed_max_items or received >= self.max_bytes:
+                    break
+        except ElementTree.ParseError as e:
+            if not items:
+                raise HTTPException(status_code=422, detail=f"Could not parse the feed at {url}: {e}")
+            console.print(f"[yellow]Feed {url} is malformed after {len(items)} items, using those: {e}[/yellow]")
+        return {
+            "title": feed_title or _document_name(url),
+            "text": "\n\n".join(items[:self.feed_max_items]),
+            "links": links[:MAX_PAGE_LINKS],
+            "details": {"items": min(len(items), self.feed_max_items)},
+        }
+
+    @staticmethod
+    def _feed_item(element: ElementTree.Element, base_url: str) -> Tuple[str, Optional[str]]:
+        fields: Dict[str, str] = {}
+        link = None
+        for child in element:
+            name = _local_name(child.tag)
+            if name == "link":
+                # RSS puts the URL in the text, Atom in href (preferring rel="alternate")
+                href = child.get("href") or (child.text or "").strip()
+                if href and (link is None or child.get("rel", "alternate") == "alternate"):
+                    link = urljoin(base_url, href)
+            elif child.text and name not in fields:
+                fields[name] = child.text
+        title = " ".join(fields.get("title", "").split())
+        date = fields.get("pubdate") or fields.get("published") or fields.get("updated") or fields.get("date")
+        body = fields.get("encoded") or fields.get("content") or fields.get("summary") or fields.get("description") or ""
+        lines = [f"{title} ({date.strip()})" if date else title, html_to_text(body)]
+        return "\n".join(line for line in lines if line), link
+
+    async def _extract_pdf(self, url: str, chunks: AsyncIterator[bytes]) -> Dict[str, Any]:
+        with tempfile.SpooledTemporaryFile(max_size=self.pdf_spool_bytes) as spool:
+            received = 0
+            async for chunk in chunks:
+                received += len(chunk)
+                if received > self.max_bytes:
+                    # A PDF's cross-reference table is at the end, so a truncated file is unreadable
+                    raise HTTPException(status_code=413, detail=f"The PDF at {url} is larger than {self.max_bytes / (1024 * 1024):g} MB.")
+                spool.write(chunk)
+            spool.seek(0)
+            with stage_timer("extract"):
+                return await asyncio.to_thread(self._read_pdf, url, spool)
+
+    def _read_pdf(self, url: str, stream) -> Dict[str, Any]:
+        try:
+            from pypdf import PdfReader
+            from pypdf.errors import DependencyError
+        except ImportError:
+            raise HTTPException(status_code=415, detail="PDF support needs the pypdf package (pip install pypdf).")
+        try:
+            reader = PdfReader(stream)
+            if reader.is_encrypted:
+                reader.decrypt("")
+            total_pages = len(reader.pages)
+            pages = []
+            for index in range(min(total_pages, self.pdf_max_pages)):
+                page_text = reader.pages[index].extract_text() or ""
+                if page_text.strip():
+                    pages.append(page_text.strip())
+            title = reader.metadata.title if reader.metadata and reader.metadata.title else None
+        except DependencyError as e:
+            # e.g. AES-encrypted PDFs need the cryptography package
+            raise HTTPException(status_code=415, detail=f"Could not read the PDF at {url}: {e}")
+        except Exception as e:
+            raise HTTPException(status_code=422, detail=f"Could not read the PDF at {url}: {type(e).__name__}: {e}")
+        if not pages:
+            raise HTTPException(status_code=422, detail=f"The PDF at {url} has no extractable text (it may be scanned images).")
+        if total_pages > self.pdf_max_pages:
+            console.print(f"[yellow]Read the first {self.pdf_max_pages} of {total_pages} pages of {url}[/yellow]")
+        return {
+            "title": " ".join((title or "").split()) or _document_name(url),
+            "text": dedupe_lines("\n".join(pages)),
+            "links": [],
+            "details": {"pages_read": min(total_pages, self.pdf_max_pages), "pages_total": total_pages},
+        }
+
+
+class UnsupportedResponseError(Exception):
+    # The HTTP tier can't use this one response (error status, media type it doesn't
+    # read). Unlike a client-rendered page, it says nothing about the rest of the domain.
+    pass
+
+
+class HttpFetcher:
+    # First scrape tier: a plain pooled HTTP GET plus HtmlTextExtractor. Pages that look
+    # client-rendered are escalated to Chromium, and the outcome is remembered per domain
+    # so known JS-only sites skip straight to the browser next time. PDFs, plain text,
+    # JSON and feeds are handed to DocumentExtractor and never reach the browser.
+    def __init__(self, global_config: Config):
+        self.enabled = global_config.get_bool("SCRAPER_HTTP_TIER", True)
+        self.min_text_chars = global_config.get_int("SCRAPER_MIN_TEXT_CHARS", 200)
+        self.min_text_ratio = global_config.get_float("SCRAPER_MIN_TEXT_RATIO", 0.02)
+        self.max_html_bytes = int(global_config.get_float("SCRAPER_MAX_HTML_MB", 5) * 1024 * 1024)
+        self.domain_memory_seconds = global_config.get_float("SCRAPER_DOMAIN_MEMORY_SECONDS", 3600)
+        self.probe_documents = global_config.get_bool("SCRAPER_PROBE_DOCUMENTS", True)
+        self._domain_tiers = LruCache(max_entries=4096, max_bytes=4096)
+
+    def preferred_tier(self, url: str) -> str:
+        if not self.enabled:
+            return "browser"
+        remembered = self._domain_tiers.get(urlsplit(url).hostname or "")
+        if remembered and time.time() - remembered[1] < self.domain_memory_seconds:
+            return remembered[0]
+        return "http"
+
+    def remember(self, url: str, tier: str) -> None:
+        self._domain_tiers.set(urlsplit(url).hostname or "", (tier, time.time()), 1)
+
+    @staticmethod
+    async def _prepend(first_chunk: bytes, chunks: AsyncIterator[bytes]) -> AsyncIterator[bytes]:
+        # The response body again, after its first chunk was read to sniff the content kind
+        if first_chunk:
+            yield first_chunk
+        async for chunk in chunks:
+            yield chunk
+
+    def needs_browser(self, extractor: HtmlTextExtractor, text: str) -> Optional[str]:
+        if len(text) < self.min_text_chars:
+            return f"only {len(text)} characters of text"
+        if extractor.spa_markers and len(text) < self.min_text_chars * 5:
+            return f"client-side app markers {extractor.spa_markers[:3]}"
+        if extractor.noscript_warning and len(text) < self.min_text_chars * 5:
+            return "page asks for JavaScript"
+        if extractor.markup_chars and len(text) / extractor.markup_chars < self.min_text_ratio and len(text) < 5000:
+            return f"text-to-markup ratio {len(text) / extractor.markup_chars:.3f}"
+        return None
+
+    async def probe(self, url: str) -> Optional[str]:
+        # Content kind (see document_kind) from a HEAD request, or from the headers and first
+        # bytes of a ranged GET when HEAD is refused or not conclusive. Used before sending a
+        # URL to the browser, so documents never start Chromium.
+        headers = {"User-Agent": USER_AGENTS[randint(0, len(USER_AGENTS) - 1)], "Accept": "*/*"}
+        client = get_http_client()
+        try:
+            with stage_timer("probe"):
+                response = await client.head(url, headers=headers, timeout=5)
+                if response.status_code < 400 and response.headers.get("content-type"):
+                    kind = document_kind(response.headers["content-type"])
+                    if kind is not None:
+                        return kind
+                ranged = dict(headers, Range=f"bytes=0-{DOCUMENT_SNIFF_BYTES - 1}")
+                async with client.stream("GET", url, headers=ranged, timeout=5) as response:
+                    if response.status_code >= 400:
+                        return None
+                    head = b""
+                    async for chunk in response.aiter_bytes():
+                        head += chunk
+                        if len(head) >= DOCUMENT_SNIFF_BYTES:
+                            break
+                    return document_kind(response.headers.get("content-type", ""), head)
+        except Exception as e:
+            console.print(f"[yellow]Content-type probe of {url} failed: {type(e).__name__}: {e}[/yellow]")
+            return None
+
+    async def fetch(self, url: str) -> Optional[Dict[str, Any]]:
+        # Returns kind/title/text/headers/links, or None when the page needs JavaScript to
+        # render. Raises UnsupportedResponseError for responses the tier can't read.
+        headers = {
+            "User-Agent": USER_AGENTS[randint(0, len(USER_AGENTS) - 1)],
+            "Accept": "text/html,application/xhtml+xml;q=0.9,*/*;q=0.8",
+        }
+        client = get_http_client()
+        async with client.stream("GET", url, headers=headers) as response:
+            content_type = response.headers.get("content-type", "")
+            if response.status_code >= 400:
+                raise UnsupportedResponseError(f"status {response.status_code}")
+            chunks = response.aiter_bytes()
+            first_chunk = await anext(chunks, b"")
+            kind = document_kind(content_type, first_chunk)
+            if kind is None:
+                raise UnsupportedResponseError(f"content type {content_type or 'missing'}")
+            body = self._prepend(first_chunk, chunks)
+            if kind in DOCUMENT_KINDS:
+                console.print(f"Extracting {url} as {kind} ({content_type or 'no content type'})")
+                document = await document_extractor.extract(kind, url, body, response.charset_encoding)
+                return dict(document, kind=kind, headers=dict(response.headers))
+
+            extractor = HtmlTextExtractor()
+            decoder = codecs.getincrementaldecoder(response.charset_encoding or "utf-8")(errors="replace")
+            received = 0
+            async for chunk in body:
+                received += len(chunk)
+                extractor.feed(decoder.decode(chunk))
+                if received >= self.max_html_bytes:
+                    console.print(f"[yellow]Stopped reading {url} after {received} bytes[/yellow]")
+                    break
+            extractor.feed(decoder.decode(b"", final=True))
+            extractor.close()
+
+            text = extractor.get_text()
+            reason = self.needs_browser(extractor, text)
+            if reason:
+                console.print(f"[yellow]HTTP tier not enough for {url} ({reason}), escalating to browser[/yellow]")
+                return None
+            return {
+                "kind": "html",
+                "title": " ".join(extractor.title.split()),
+                "text": text,
+                "main_text": extractor.get_main_text(),
+                "headers": dict(response.headers),
+                "links": resolve_links(urljoin(str(response.url), extractor.base_href or ""), extractor.links),
+            }
+
+
+class _ProgressRelay:
+    # Progress listener of a shared task: forwards each event to every caller waiting on
+    # it, and replays earlier events to callers that join late
+    def __init__(self):
+        self.listeners: List[Callable[[str, Dict[str, Any]], None]] = []
+        self.reported: List[Tuple[str, Dict[str, Any]]] = []
+
+    def __call__(self, stage: str, details: Dict[str, Any]) -> None:
+        self.reported.append((stage, details))
+        for listener in list(self.listeners):
+            listener(stage, details)
+
+    def add(self, listener: Callable[[str, Dict[str, Any]], None]) -> None:
+        for stage, details in self.reported:
+            listener(stage, details)
+        self.listeners.append(listener)
+
+
+class SingleFlight:
+    # Collapses concurrent calls that share a key onto one in-flight task. Callers are
+    # shielded from each other: one client disconnecting doesn't cancel the shared work.
+    # Progress reported by the task (see report_progress) reaches every waiting caller.
+    def __init__(self):
+        self._inflight: Dict[str, asyncio.Future] = {}
+        self._relays: Dict[str, _ProgressRelay] = {}
+
+    def __len__(self) -> int:
+        return len(self._inflight)
+
+    async def do(self, key: str, factory: Callable[[], Awaitable[Any]]) -> Any:
+        future = self._inflight.get(key)
+        if future is None:
+            relay = _ProgressRelay()
+
+            async def run() -> Any:
+                # The task runs in a copy of the first caller's context; report to all callers instead
+                current_progress.set(relay)
+                return await factory()
+
+            future = asyncio.ensure_future(run())
+            self._inflight[key] = future
+            self._relays[key] = relay
+            future.add_done_callback(lambda done: self._forget(key, done))
+        else:
+            console.print(f"Joining in-flight work for {key[:80]}")
+            relay = self._relays[key]
+        listener = current_progress.get()
+        if listener is not None:
+            relay.add(listener)
+        try:
+            return await asyncio.shield(future)
+        finally:
+            if listener in relay.listeners:
+                relay.listeners.remove(listener)
+
+    def _forget(self, key: str, future: asyncio.Future) -> None:
+        if self._inflight.get(key) is future:
+            del self._inflight[key]
+            del self._relays[key]
+        # Mark the exception as retrieved even if every caller went away
+        if not future.cancelled():
+            future.exception()
+
+
+class StreamBroadcast:
+    # Pumps one upstream async iterator and fans its items out to any number of
+    # subscribers. Late subscribers first replay everything produced so far.
+    def __init__(self, source: AsyncIterator[Any]):
+        self._items: List[Any] = []
+        self._error: Optional[BaseException] = None
+        self._done = False
+        self._changed = asyncio.Event()
+        self._task = asyncio.ensure_future(self._pump(source))
+
+    @property
+    def done(self) -> bool:
+        return self._done
+
+    def _notify(self) -> None:
+        self._changed.set()
+        self._changed = asyncio.Event()
+
+    async def _pump(self, source: AsyncIterator[Any]) -> None:
+        try:
+            async for item in source:
+                self._items.append(item)
+                self._notify()
+        except Exception as e:
+            self._error = e
+        finally:
+            self._done = True
+            self._notify()
+
+    async def subscribe(self) -> AsyncIterator[Any]:
+        index = 0
+        while True:
+            changed = self._changed
+            while index < len(self._items):
+                yield self._items[index]
+                index += 1
+            if self._done:
+                if self._error is not None:
+                    raise self._error
+                return
+            await changed.wait()
+
+
+class StreamFlight:
+    # Single-flight for streams: concurrent subscribers with the same key share one upstream
+    def __init__(self):
+        self._inflight: Dict[str, StreamBroadcast] = {}
+
+    def __len__(self) -> int:
+        return len(self._inflight)
+
+    async def subscribe(self, key: str, factory: Callable[[], AsyncIterator[Any]]) -> AsyncIterator[Any]:
+        broadcast = self._inflight.get(key)
+        if broadcast is None or broadcast.done:
+            broadcast = StreamBroadcast(factory())
+            self._inflight[key] = broadcast
+            broadcast._task.add_done_callback(lambda _: self._forget(key, broadcast))
+        else:
+            console.print(f"Joining in-flight stream for {key[:80]}")
+        async for item in broadcast.subscribe():
+            yield item
+
+    def _forget(self, key: str, broadcast: StreamBroadcast) -> None:
+        if self._inflight.get(key) is broadcast:
+            del self._inflight[key]
+
+
+def _api_key_fingerprint(api_key: Optional[str]) -> str:
+    # In-flight LLM work is only shared between callers using the same credentials,
+    # so one user's bad key can never fail another user's request.
+    return hashlib.sha256((api_key or "").encode("utf-8")).hexdigest()[:16]
+
+
+class Website:
+    __url: str
+    __title: str
+    __text: str
+
+
+    @property
+    def url(self) -> str:
+        return self.__url
+
+    @property
+    def title(self) -> str:
+        return self.__title
+
+    @property
+    def text(self) -> str:
+        return self.__text
+
+    @property
+    def validators(self) -> Dict[str, str]:
+        # Lowercased ETag / Last-Modified response headers, used to revalidate cached scrapes
+        return self.__validators
+
+    @property
+    def cache_status(self) -> str:
+        return self.__cache_status
+
+    @property
+    def scrape_tier(self) -> Optional[str]:
+        # "http" or "browser"; None when the result came from the scrape cache
+        return self.__scrape_tier
+
+    @property
+    def extraction(self) -> Optional[Dict[str, Any]]:
+        # Main-content extraction outcome and token counts; None for cached scrapes
+        return self.__extraction
+
+    @property
+    def links(self) -> List[str]:
+        # Absolute URLs the page links to, used by crawl mode
+        return self.__links
+
+    @property
+    def complete(self) -> bool:
+        # False when the browser ran out of budget and only a partial render was extracted
+        return self.__complete
+
+    def _set_validators(self, headers: Optional[Dict[str, str]]) -> None:
+        headers = {key.lower(): value for key, value in (headers or {}).items()}
+        self.__validators = {
+            key: headers[key] for key in ("etag", "last-modified") if headers.get(key)
+        }
+
+    
+    async def scrape_async(self) -> None:
+        console.print("Started scraping")
+        if http_fetcher.preferred_tier(self.__url) == "http":
+            if await self._scrape_http():
+                return
+        elif http_fetcher.probe_documents and await http_fetcher.probe(self.__url) in DOCUMENT_KINDS:
+            # Documents are read over HTTP even on domains that otherwise need the browser
+            if await self._scrape_http(remember=False):
+                return
+        await self._scrape_browser()
+
+    async def _scrape_http(self, remember: bool = True) -> bool:
+        try:
+            with stage_timer("http_fetch"):
+                result = await http_fetcher.fetch(self.__url)
+        except HTTPException:
+            # A document that was recognized but could not be read; a browser would not do better
+            raise
+        except UnsupportedResponseError as e:
+            # Only this URL goes to the browser; the domain's tier memory is left alone
+            console.print(f"[yellow]HTTP tier got {e} for {self.__url}, escalating to browser[/yellow]")
+            return False
+        except Exception as e:
+            # A network error says nothing about whether the domain needs a browser,
+            # so fall back for this request without updating the tier memory
+            console.print(f"[yellow]HTTP tier failed for {self.__url}, falling back to browser: {type(e).__name__}: {e}[/yellow]")
+            return False
+        if result is None:
+            if remember:
+                http_fetcher.remember(self.__url, "browser")
+            return False
+        self.__title = result["title"]
+        self.__scrape_tier = "http"
+        if result["kind"] in DOCUMENT_KINDS:
+            # One PDF or feed says nothing about how the site's HTML pages render
+            self.__text = result["text"]
+            self.__extraction = content_extractor.document(self.__url, result["kind"], result["text"], result["details"])
+            self.__links = result["links"]
+            self._set_validators(result["headers"])
+            report_progress("extracted", tier="http", title=self.__title, method=result["kind"])
+            return True
+        if remember:
+            http_fetcher.remember(self.__url, "http")
+        self.__text, self.__extraction = content_extractor.choose(self.__url, dedupe_lines(result["text"]), result["main_text"])
+        self.__links = result["links"]
+        self._set_validators(result["headers"])
+        report_progress("extracted", tier="http", title=self.__title, method=self.__extraction["method"])
+        return True
+
+    async def _scrape_browser(self) -> None:
+        from pyppeteer.errors import TimeoutError as PyppeteerTimeoutError
+        self.__scrape_tier = "browser"
+        policy = browser_pool.load_policy
+        budget_ms = self.__budget_ms or policy.budget_ms
+        deadline = time.monotonic() + budget_ms / 1000
+
+        def remaining_ms() -> int:
+            return max(0, int((deadline - time.monotonic()) * 1000))
+
+        try:
+            async with browser_pool.page() as page:
+                report_progress("browser_acquired")
+                response = None
+                try:
+                    # Only wait for the DOM; readiness is decided by the text settling below
+                    with stage_timer("goto"):
+                        response = await page.goto(
+                            self.__url,
+                            {
+                                "waitUntil": "domcontentloaded",
+                                "timeout": max(1, remaining_ms())  # 0 would disable the timeout
+                            }
+                        )
+                except PyppeteerTimeoutError as nav_error:
+                    # Out of budget: keep whatever has rendered so far if there is a body
+                    if not await page.evaluate('() => !!document.body'):
+                        raise
+                    console.print(f"[yellow]Navigation hit the {budget_ms} ms budget, using partial page: {nav_error}[/yellow]")
+                    self.__complete = False
+
+                report_progress("navigated", status=response.status if response else None)
+                with stage_timer("ready_wait"):
+                    readiness = await policy.wait_until_ready(page, remaining_ms())
+                if not readiness.get("stable"):
+                    console.print(f"[yellow]Page text still changing after {readiness.get('waitedMs')} ms, extracting anyway[/yellow]")
+                    self.__complete = False
+
+                with stage_timer("extract"):
+                    extracted = await page.evaluate(
+                        EXTRACT_CONTENT_JS, CONTENT_HINT_POSITIVE, CONTENT_HINT_NEGATIVE, CONTENT_HINT_KEEP, BOILERPLATE_SELECTOR
+                    )
+                self.__title = extracted["title"]
+                self.__text, self.__extraction = content_extractor.choose(self.__url, extracted["fullText"], extracted["mainText"])
+                self.__links = resolve_links(page.url, await page.evaluate(EXTRACT_LINKS_JS, MAX_PAGE_LINKS))
+                report_progress("extracted", tier="browser", title=self.__title, method=self.__extraction["method"])
+                self._set_validators(response.headers if response else None)
+
+        except Exception as e:
+            console.print(f"[red]Error scraping {self.__url}: {e}[/red]")
+            self.__title = "Error"
+            self.__text = f"Could not scrape content: {str(e)}"
+            raise
+
+    # The constructor now needs to be async or call an async method
+    @classmethod
+    async def create(cls, url: str, budget_ms: Optional[int] = None):
+        cached = await scrape_cache.get(url)
+        if cached:
+            console.print(f"Scrape cache {cached['cache_status']} for {url}")
+            instance = cls()
+            instance.__url = url
+            instance.__title = cached["title"]
+            instance.__text = cached["text"]
+            instance.__links = cached.get("links", [])
+            instance._set_validators({"etag": cached.get("etag"), "last-modified": cached.get("last_modified")})
+            instance.__cache_status = cached["cache_status"]
+            report_progress("extracted", tier="cache", title=instance.__title)
+            return instance
+        # Concurrent requests for the same page share a single render
+        return await scrape_flights.do(normalize_url(url), lambda: cls._render(url, budget_ms))
+
+    @classmethod
+    async def _render(cls, url: str, budget_ms: Optional[int] = None):
+        instance = cls()
+        instance.__url = url
+        instance.__budget_ms = budget_ms
+        await instance.scrape_async() # Scrape when created
+        if instance.complete:
+            await scrape_cache.put(instance)
+        else:
+            # A partial render would otherwise be served for the full cache TTL
+            console.print(f"[yellow]Not caching partial render of {url}[/yellow]")
+        return instance
+
+    # Private constructor for the factory method
+    def __init__(self):
+        self.__validators = {}
+        self.__cache_status = "miss"
+        self.__scrape_tier = None
+        self.__extraction = None
+        self.__links = []
+        self.__budget_ms = None
+        self.__complete = True
+
+    def __str__(self) -> str:
+        return f"Website(url={self.url}, title=\"{self.title}\")"
+
+LLMProvider = Literal["openai", "ollama", "anthropic", "google", "groq", "deepseek"]  
+
+# Bump whenever the system/user prompts change so cached summaries are not reused
+PROMPT_VERSION = "1"
+
+DEFAULT_MODELS: Dict[str, str] = {
+    "openai": "gpt-4o-mini",
+    "ollama": "gemma2:9b",
+    "anthropic": "claude-3-haiku-20240307",
+    "google": "gemini-1.5-flash-latest",
+    "groq": "llama3-8b-8192",
+    "deepseek": "deepseek-chat",
+}
+
+# Context windows (in tokens) by model-name prefix; the longest matching prefix wins
+MODEL_CONTEXT_WINDOWS: Dict[str, int] = {
+    "gpt-4o": 128000,
+    "gpt-4.1": 1000000,
+    "gpt-4-turbo": 128000,
+    "gpt-4": 8192,
+    "gpt-3.5-turbo": 16385,
+    "o1": 128000,
+    "o3": 200000,
+    "claude": 200000,
+    "gemini-1.5": 1000000,
+    "gemini-2": 1000000,
+    "gemini": 32768,
+    "llama3-": 8192,
+    "llama-3.1": 128000,
+    "llama-3.3": 128000,
+    "mixtral": 32768,
+    "gemma2": 8192,
+    "gemma": 8192,
+    "deepseek": 64000,
+}
+DEFAULT_CONTEXT_WINDOW = 8192
+# Room kept free for the system prompt, instructions and the completion itself
+PROMPT_OVERHEAD_TOKENS = 512
+MAX_OUTPUT_TOKENS = 1024
+
+
+def context_window(model: str) -> int:
+    model = model.lower()
+    matches = [prefix for prefix in MODEL_CONTEXT_WINDOWS if model.startswith(prefix)]
+    return MODEL_CONTEXT_WINDOWS[max(matches, key=len)] if matches else DEFAULT_CONTEXT_WINDOW
+
+
+def count_tokens(text: str, model: str) -> int:
+    # Exact for OpenAI-family models when tiktoken is installed; otherwise the usual
+    # ~4 characters per token estimate, which is close enough for budgeting.
+    if tiktoken is not None:
+        try:
+            encoding = tiktoken.encoding_for_model(model)
+        except KeyError:
+            encoding = None
+        if encoding is not None:
+            return len(encoding.encode(text, disallowed_special=()))
+    return (len(text) + 3) // 4
+
+
+def split_into_chunks(text: str, max_chars: int, overlap_chars: int) -> List[str]:
+    # Split on line boundaries into chunks of at most max_chars; each chunk repeats the
+    # last overlap_chars of the previous one so nothing is lost at the seams.
+    max_chars = max(1, max_chars)
+    overlap_chars = min(overlap_chars, max_chars // 2)
+    lines: List[str] = []
+    for line in text.splitlines(keepends=True):
+        # Hard-wrap lines that are longer than a chunk on their own
+        while len(line) > max_chars:
+            lines.append(line[:max_chars])
+            line = line[max_chars:]
+        if line:
+            lines.append(line)
+
+    chunks: List[str] = []
+    current: List[str] = []
+    current_len = 0
+    for line in lines:
+        if current and current_len + len(line) > max_chars:
+            chunks.append("".join(current))
+            overlap: List[str] = []
+            overlap_len = 0
+            for previous in reversed(current):
+                if overlap_len + len(previous) > overlap_chars:
+                    break
+                overlap.insert(0, previous)
+                overlap_len += len(previous)
+            current, current_len = overlap, overlap_len
+        current.append(line)
+        current_len += len(line)
+    if current:
+        chunks.append("".join(current))
+    return chunks
+
+
+class ChunkingPolicy:
+    # How much page text goes into a single LLM call and how wide the map stage fans out.
+    # The per-call budget is capped well below large context windows: several medium
+    # prompts in parallel finish sooner than one enormous prompt.
+    def __init__(self, global_config: Config):
+        self.max_chunk_tokens = global_config.get_int("SUMMARY_CHUNK_TOKENS", 12000)
+        self.overlap_tokens = global_config.get_int("SUMMARY_CHUNK_OVERLAP_TOKENS", 200)
+        self.map_concurrency = max(1, global_config.get_int("SUMMARY_MAP_CONCURRENCY", 4))
+
+    def input_budget(self, model: str) -> int:
+        available = context_window(model) - PROMPT_OVERHEAD_TOKENS - MAX_OUTPUT_TOKENS
+        return max(256, min(self.max_chunk_tokens, available))
+
+
+class SummaryCache:
+    # Summaries keyed by a hash of page content + provider + model + prompt version,
+    # so unchanged pages never hit the LLM twice. Same tiers as the scrape cache.
+    def __init__(self, global_config: Config):
+        self.ttl = global_config.get_float("SUMMARY_CACHE_TTL_SECONDS", 86400)
+        self.memory = LruCache(
+            max_entries=global_config.get_int("SUMMARY_CACHE_MAX_ENTRIES", 2048),
+            max_bytes=int(global_config.get_float("SUMMARY_CACHE_MAX_MB", 16) * 1024 * 1024),
+        )
+        self.sqlite_path = global_config.get("SUMMARY_CACHE_SQLITE_PATH")
+        self.sqlite_max_bytes = int(global_config.get_float("SUMMARY_CACHE_SQLITE_MAX_MB", 128) * 1024 * 1024)
+        self.disk: Optional[SqliteCacheTier] = None
+
+    @property
+    def enabled(self) -> bool:
+        return self.ttl > 0
+
+    def open(self) -> None:
+        if self.sqlite_path and self.enabled:
+            self.disk = SqliteCacheTier(self.sqlite_path, "summary_cache", self.sqlite_max_bytes)
+
+    def close(self) -> None:
+        if self.disk:
+            self.disk.close()
+            self.disk = None
+
+    async def get(self, key: str) -> Optional[str]:
+        if not self.enabled:
+            return None
+        entry = self.memory.get(key)
+        if entry is None and self.disk:
+            entry = await asyncio.to_thread(self.disk.get, key)
+            if entry is not None:
+                self.memory.set(key, entry, len(entry["summary"]))
+        if entry is None:
+            return None
+        if time.time() - entry["stored_at"] >= self.ttl:
+            self.memory.pop(key)
+            if self.disk:
+                await asyncio.to_thread(self.disk.delete, key)
+            return None
+        return entry["summary"]
+
+    async def set(self, key: str, summary: str) -> None:
+        if not self.enabled:
+            return
+        entry = {"summary": summary, "stored_at": time.time()}
+        self.memory.set(key, entry, len(summary))
+        if self.disk:
+            await asyncio.to_thread(self.disk.set, key, entry)
+
+def split_into_blocks(text: str) -> List[str]:
+    # Extracted page text has one paragraph (or heading, list item...) per line
+    return [" ".join(line.split()) for line in text.splitlines() if line.strip()]
+
+
+def block_hash(block: str) -> str:
+    return hashlib.sha256(block.encode("utf-8")).hexdigest()[:16]
+
+
+def diff_blocks(previous: List[str], current: List[str]) -> Tuple[List[str], List[str]]:
+    # (added, removed) blocks, each in page order. Moved blocks count as unchanged.
+    previous_hashes = {block_hash(block) for block in previous}
+    current_hashes = {block_hash(block) for block in current}
+    added = [block for block in current if block_hash(block) not in previous_hashes]
+    removed = [block for block in previous if block_hash(block) not in current_hashes]
+    return added, removed
+
+
+class SnapshotStore:
+    # Last seen blocks and summary per (URL, provider, model), for incremental
+    # re-summarization of pages that are checked repeatedly. Same tiers as the caches.
+    def __init__(self, global_config: Config):
+        self.ttl = global_config.get_float("SNAPSHOT_TTL_SECONDS", 30 * 86400)
+        self.max_changed_ratio = global_config.get_float("SNAPSHOT_MAX_CHANGED_RATIO", 0.5)
+        self.memory = LruCache(
+            max_entries=global_config.get_int("SNAPSHOT_MAX_ENTRIES", 1024),
+            max_bytes=int(global_config.get_float("SNAPSHOT_MAX_MB", 64) * 1024 * 1024),
+        )
+        self.sqlite_path = global_config.get("SNAPSHOT_SQLITE_PATH")
+        self.sqlite_max_bytes = int(global_config.get_float("SNAPSHOT_SQLITE_MAX_MB", 512) * 1024 * 1024)
+        self.disk: Optional[SqliteCacheTier] = None
+
+    def open(self) -> None:
+        if self.sqlite_path:
+            self.disk = SqliteCacheTier(self.sqlite_path, "page_snapshots", self.sqlite_max_bytes)
+
+    def close(self) -> None:
+        if self.disk:
+            self.disk.close()
+            self.disk = None
+
+    @staticmethod
+    def key(url: str, llm_provider: LLMProvider, model_name: Optional[str] = None, base_url: Optional[str] = None) -> str:
+        effective_model = model_name or DEFAULT_MODELS[llm_provider]
+        payload = json.dumps([PROMPT_VERSION, llm_provider, effective_model, base_url, normalize_url(url)])
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    @staticmethod
+    def _size(entry: Dict[str, Any]) -> int:
+        return sum(len(block) for block in entry["blocks"]) + len(entry["summary"])
+
+    async def get(self, key: str) -> Optional[Dict[str, Any]]:
+        entry = self.memory.get(key)
+        if entry is None and self.disk:
+            entry = await asyncio.to_thread(self.disk.get, key)
+            if entry is not None:
+                self.memory.set(key, entry, self._size(entry))
+        if entry is None:
+            return None
+        if self.ttl > 0 and time.time() - entry["stored_at"] >= self.ttl:
+            self.memory.pop(key)
+            if self.disk:
+                await asyncio.to_thread(self.disk.delete, key)
+            return None
+        return entry
+
+    async def set(self, key: str, title: str, blocks: List[str], summary: str) -> None:
+        entry = {"title": title, "blocks": blocks, "summary": summary, "stored_at": time.time()}
+        self.memory.set(key, entry, self._size(entry))
+        if self.disk:
+            await asyncio.to_thread(self.disk.set, key, entry)
+
+
+class ProviderCandidate(BaseModel):
+    llm_provider: LLMProvider = Field(..., description="The LLM provider to use")
+    api_key: Optional[str] = Field(None, description="API key for this provider (if required)")
+    model_name: Optional[str] = Field(None, description="Specific model name for the provider")
+    base_url: Optional[str] = Field(None, description="Custom base URL for the LLM API")
+
+    @property
+    def effective_model(self) -> str:
+        return self.model_name or DEFAULT_MODELS[self.llm_provider]
+
+    @property
+    def stats_key(self) -> str:
+        return f"{self.llm_provider}:{self.effective_model}"
+
+class RoutingPolicy(BaseModel):
+    candidates: List[ProviderCandidate] = Field(..., min_length=1, description="Fallback providers, tried in order after the request's own provider")
+    hedge: bool = Field(True, description="Start the next candidate when no first token arrived within the hedge delay")
+    hedge_delay_ms: Optional[int] = Field(None, gt=0, description="Fixed hedge delay; by default derived from the provider's recent p95 time-to-first-token")
+    adaptive_order: bool = Field(True, description="Reorder candidates by their recent latency and error rate")
+
+class ProviderStats:
+    # Rolling time-to-first-token and error stats per provider/model, used to derive
+    # hedge deadlines and to move slow or failing upstreams down the candidate list.
+    def __init__(self, global_config: Config):
+        self.window = global_config.get_int("ROUTING_STATS_WINDOW", 100)
+        self.min_samples = global_config.get_int("ROUTING_STATS_MIN_SAMPLES", 5)
+        self.default_hedge_ms = global_config.get_int("ROUTING_DEFAULT_HEDGE_MS", 4000)
+        self.min_hedge_ms = global_config.get_int("ROUTING_MIN_HEDGE_MS", 250)
+        self._ttft: Dict[str, deque] = {}
+        self._outcomes: Dict[str, deque] = {}
+
+    def record_success(self, key: str, ttft_seconds: float) -> None:
+        self._ttft.setdefault(key, deque(maxlen=self.window)).append(ttft_seconds)
+        self._outcomes.setdefault(key, deque(maxlen=self.window)).append(True)
+
+    def record_failure(self, key: str) -> None:
+        self._outcomes.setdefault(key, deque(maxlen=self.window)).append(False)
+
+    def record_censored(self, key: str, elapsed_seconds: float) -> None:
+        # A hedged attempt cancelled before its first token: its TTFT is at least the time
+        # it had been waiting. Recording that lower bound lets a primary that slowed down
+        # (but doesn't fail) lose its old fast samples and drop down the order.
+        self._ttft.setdefault(key, deque(maxlen=self.window)).append(elapsed_seconds)
+        self._outcomes.setdefault(key, deque(maxlen=self.window))
+
+    def percentile(self, key: str, fraction: float) -> Optional[float]:
+        samples = self._ttft.get(key)
+        if not samples or len(samples) < self.min_samples:
+            return None
+        ordered = sorted(samples)
+        return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))]
+
+    def error_rate(self, key: str) -> float:
+        outcomes = self._outcomes.get(key)
+        if not outcomes:
+            return 0.0
+        return outcomes.count(False) / len(outcomes)
+
+    def hedge_delay(self, key: str) -> float:
+        p95 = self.percentile(key, 0.95)
+        delay_ms = p95 * 1000 if p95 is not None else self.default_hedge_ms
+        return max(self.min_hedge_ms, delay_ms) / 1000
+
+    def expected_latency(self, key: str) -> float:
+        # Median TTFT inflated by the error rate; unknown upstreams get the default deadline
+        p50 = self.percentile(key, 0.5)
+        latency = p50 if p50 is not None else self.default_hedge_ms / 1000
+        return latency * (1 + 4 * self.error_rate(key))
+
+    def order(self, candidates: List[ProviderCandidate]) -> List[ProviderCandidate]:
+        # Stable sort: candidates without data keep their requested position relative to each other
+        return sorted(candidates, key=lambda candidate: self.expected_latency(candidate.stats_key))
+
+    def snapshot(self) -> Dict[str, Dict[str, Any]]:
+        def to_ms(seconds: Optional[float]) -> Optional[int]:
+            return round(seconds * 1000) if seconds is not None else None
+
+        return {
+            key: {
+                "samples": len(self._ttft.get(key, ())),
+                "p50_ttft_ms": to_ms(self.percentile(key, 0.5)),
+                "p95_ttft_ms": to_ms(self.percentile(key, 0.95)),
+                "hedge_delay_ms": round(self.hedge_delay(key) * 1000),
+                "error_rate": round(self.error_rate(key), 3),
+            }
+            for key in self._outcomes
+        }
+
+
+# --- Provider rate limiting ---
+# Status codes worth retrying; 529 is Anthropic's "overloaded"
+RETRYABLE_STATUS_CODES = {408, 429, 500, 502, 503, 504, 529}
+
+
+def parse_retry_seconds(value: Optional[str]) -> Optional[float]:
+    # Seconds from a rate-limit header: "2", "0.5", "1m30s", "250ms", an HTTP date or an ISO timestamp
+    if value in (None, ""):
+        return None
+    value = str(value).strip()
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    match = re.fullmatch(r"(?:(\d+(?:\.\d+)?)h)?(?:(\d+(?:\.\d+)?)m(?!s))?(?:(\d+(?:\.\d+)?)s)?(?:(\d+(?:\.\d+)?)ms)?", value)
+    if match and any(match.groups()):
+        hours, minutes, seconds, millis = (float(group) if group else 0.0 for group in match.groups())
+        return hours * 3600 + minutes * 60 + seconds + millis / 1000
+    try:
+        moment = email.utils.parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        try:
+            moment = datetime.fromisoformat(value.replace("Z", "+00:00"))
+        except ValueError:
+            return None
+    return max(0.0, moment.timestamp() - time.time())
+
+
+def rate_limit_hints(headers: Any) -> Tuple[Optional[float], Optional[int], Optional[float]]:
+    # (retry after, remaining requests, seconds until the request quota resets) from
+    # OpenAI-style x-ratelimit-* and Anthropic-style anthropic-ratelimit-* headers
+    if not headers:
+        return None, None, None
+    headers = {str(name).lower(): value for name, value in headers.items()}
+    retry_after = None
+    if headers.get("retry-after-ms"):
+        retry_after = (parse_retry_seconds(headers["retry-after-ms"]) or 0) / 1000
+    elif headers.get("retry-after"):
+        retry_after = parse_retry_seconds(headers["retry-after"])
+    remaining = headers.get("x-ratelimit-remaining-requests", headers.get("anthropic-ratelimit-requests-remaining"))
+    try:
+        remaining = int(remaining) if remaining is not None else None
+    except ValueError:
+        remaining = None
+    reset = parse_retry_seconds(headers.get("x-ratelimit-reset-requests", headers.get("anthropic-ratelimit-requests-reset")))
+    return retry_after, remaining, reset
+
+
+class ProviderLimiter:
+    # Concurrency cap plus token bucket (requests per minute) for one provider, base URL
+    # and API key. When the provider says to slow down (Retry-After, or no requests
+    # left until a reset) the whole key is paused, not just the request that was told.
+    def __init__(self, key: str, requests_per_minute: float, burst: int, max_concurrency: int):
+        self.key = key
+        self.rate = requests_per_minute / 60
+        self.capacity = max(1, burst)
+        self.tokens = float(self.capacity)
+        self.paused_until = 0.0
+        self.waiting = 0
+        self.active = 0
+        self._updated = time.monotonic()
+        self._semaphore = asyncio.Semaphore(max(1, max_concurrency))
+        self._bucket_lock = asyncio.Lock()
+
+    def pause(self, seconds: float) -> None:
+        self.paused_until = max(self.paused_until, time.monotonic() + seconds)
+
+    def observe(self, headers: Any) -> None:
+        retry_after, remaining, reset = rate_limit_hints(headers)
+        if retry_after:
+            self.pause(retry_after)
+        elif remaining == 0 and reset:
+            self.pause(reset)
+
+    def throttled(self, delay: float) -> HTTPException:
+        provider = self.key.split(":", 1)[0]
+        return HTTPException(
+            status_code=429,
+            detail=f"Rate limit for {provider} reached, try again later",
+            headers={"Retry-After": str(max(1, math.ceil(delay)))},
+        )
+
+    async def _take_token(self, deadline: float) -> None:
+        # The lock makes waiters take tokens in arrival order
+        async with self._bucket_lock:
+            while True:
+                now = time.monotonic()
+                delay = self.paused_until - now
+                if delay <= 0:
+                    if self.rate <= 0:
+                        return
+                    self.tokens = min(self.capacity, self.tokens + (now - self._updated) * self.rate)
+                    self._updated = now
+                    if self.tokens >= 1:
+                        self.tokens -= 1
+                        return
+                    delay = (1 - self.tokens) / self.rate
+                if now + delay > deadline:
+                    raise self.throttled(delay)
+                await asyncio.sleep(delay)
+
+    @asynccontextmanager
+    async def permit(self, max_wait: float):
+        started = time.monotonic()
+        deadline = started + max_wait
+        self.waiting += 1
+        try:
+            try:
+                await asyncio.wait_for(self._semaphore.acquire(), timeout=max(0.001, max_wait))
+            except asyncio.TimeoutError:
+                raise self.throttled(max_wait)
+            try:
+                await self._take_token(deadline)
+            except BaseException:
+                self._semaphore.release()
+                raise
+        finally:
+            self.waiting -= 1
+        record_stage("llm_queue", time.monotonic() - started)
+        self.active += 1
+        try:
+            yield
+        finally:
+            self.active -= 1
+            self._semaphore.release()
+
+    def snapshot(self) -> Dict[str, Any]:
+        return {
+            "active": self.active,
+            "waiting": self.waiting,
+            "tokens": round(self.tokens, 2) if self.rate > 0 else None,
+            "paused_for_ms": max(0, round((self.paused_until - time.monotonic()) * 1000)),
+        }
+
+
+class ProviderGovernor:
+    # Runs every LLM call under the limiter of its (provider, base URL, API key) and
+    # retries throttled or transient failures with full-jitter exponential backoff,
+    # never waiting less than the provider's Retry-After. A stream is only retried if
+    # it failed before its first token. Limits can be set per provider by suffixing
+    # the setting with the provider name, e.g. LLM_REQUESTS_PER_MINUTE_GOOGLE=15.
+    def __init__(self, global_config: Config):
+        self.global_config = global_config
+        self.max_retries = global_config.get_int("LLM_MAX_RETRIES", 3)
+        self.backoff_base = global_config.get_float("LLM_BACKOFF_BASE_SECONDS", 0.5)
+        self.backoff_max = global_config.get_float("LLM_BACKOFF_MAX_SECONDS", 30)
+        self.max_wait = global_config.get_float("LLM_MAX_QUEUE_WAIT_SECONDS", 30)
+        self._limiters: Dict[str, ProviderLimiter] = {}
+
+    def _setting(self, name: str, provider: str, default: float) -> float:
+        return self.global_config.get_float(f"{name}_{provider.upper()}", self.global_config.get_float(name, default))
+
+    def limiter(self, adapter: "ProviderAdapter") -> ProviderLimiter:
+        key = f"{adapter.provider}:{adapter.base_url or ''}:{_api_key_fingerprint(adapter.api_key)}"
+        limiter = self._limiters.get(key)
+        if limiter is None:
+            limiter = self._limiters[key] = ProviderLimiter(
+                key,
+                requests_per_minute=self._setting("LLM_REQUESTS_PER_MINUTE", adapter.provider, 0),
+                burst=int(self._setting("LLM_RATE_BURST", adapter.provider, 5)),
+                max_concurrency=int(self._setting("LLM_MAX_CONCURRENCY", adapter.provider, 8)),
+            )
+        return limiter
+
+    @property
+    def waiting(self) -> int:
+        return sum(limiter.waiting for limiter in self._limiters.values())
+
+    @property
+    def active(self) -> int:
+        return sum(limiter.active for limiter in self._limiters.values())
+
+    def snapshot(self) -> Dict[str, Dict[str, Any]]:
+        # Keys carry an API key fingerprint, never the key itself
+        return {key: limiter.snapshot() for key, limiter in self._limiters.items()}
+
+    @staticmethod
+    def _retry_hint(e: Exception) -> Tuple[Optional[int], bool, Optional[float]]:
+        # (status code, retryable, retry after) for SDK errors and adapter HTTPExceptions
+        if isinstance(e, HTTPException):
+            retry_after = parse_retry_seconds((e.headers or {}).get("Retry-After"))
+            return e.status_code, e.status_code in (429, 503), retry_after
+        status = getattr(e, "status_code", None)
+        if not isinstance(status, int):
+            status = getattr(e, "code", None)
+        status = status if isinstance(status, int) else None
+        retry_after, _, _ = rate_limit_hints(getattr(getattr(e, "response", None), "headers", None))
+        return status, status in RETRYABLE_STATUS_CODES, retry_after
+
+    def _backoff(self, attempt: int, retry_after: Optional[float]) -> float:
+        return max(uniform(0, min(self.backoff_max, self.backoff_base * 2 ** attempt)), retry_after or 0)
+
+    def _give_up(self, limiter: ProviderLimiter, e: Exception, status: Optional[int], retry_after: Optional[float]) -> Exception:
+        # Throttling reaches the client as a 429 with Retry-After instead of a generic 500
+        if status == 429 and not (isinstance(e, HTTPException) and e.headers):
+            return limiter.throttled(retry_after or self.backoff_base)
+        return e
+
+    async def _before_retry(self, limiter: ProviderLimiter, attempt: int, e: Exception, retry_after: Optional[float]) -> None:
+        if retry_after:
+            limiter.pause(retry_after)
+        delay = self._backoff(attempt, retry_after)
+        console.print(f"[yellow]{limiter.key.split(':', 1)[0]} call failed ({e}), retrying in {delay:.1f}s[/yellow]")
+        await asyncio.sleep(delay)
+
+    async def complete(
+        self, adapter: "ProviderAdapter", system_prompt_dict: Dict[str, str], user_prompt_dict: Dict[str, str]
+    ) -> Optional[str]:
+        limiter = self.limiter(adapter)
+        adapter.on_headers = limiter.observe
+        for attempt in range(self.max_retries + 1):
+            async with limiter.permit(self.max_wait):
+                try:
+                    return await adapter.complete(system_prompt_dict, user_prompt_dict)
+                except Exception as e:
+                    error = e
+                    status, retryable, retry_after = self._retry_hint(e)
+                    if not retryable or attempt == self.max_retries:
+                        raise self._give_up(limiter, e, status, retry_after)
+            await self._before_retry(limiter, attempt, error, retry_after)
+
+    async def stream(
+        self,
+        adapter: "ProviderAdapter",
+        system_prompt_dict: Dict[str, str],
+        user_prompt_dict: Dict[str, str],
+        max_retries: Optional[int] = None
+    ) -> AsyncIterator[str]:
+        limiter = self.limiter(adapter)
+        adapter.on_headers = limiter.observe
+        max_retries = self.max_retries if max_retries is None else max_retries
+        for attempt in range(max_retries + 1):
+            started = False
+            async with limiter.permit(self.max_wait):
+                try:
+                    async for delta in adapter.stream(system_prompt_dict, user_prompt_dict):
+                        started = True
+                        yield delta
+                    return
+                except Exception as e:
+                    error = e
+                    status, retryable, retry_after = self._retry_hint(e)
+                    if started or not retryable or attempt == max_retries:
+                        raise self._give_up(limiter, e, status, retry_after)
+            await self._before_retry(limiter, attempt, error, retry_after)
+
+
+class SdkExecutor:
+    # Bounded thread pool for synchronous provider SDKs (google-generativeai), kept apart
+    # from the default executor that asyncio.to_thread and the caches use. `pending`
+    # counts calls queued behind busy threads.
+    def __init__(self, global_config: Config):
+        self.max_workers = global_config.get_int("LLM_SYNC_SDK_WORKERS", 8)
+        self.pending = 0
+        self.running = 0
+        self._executor: Optional[ThreadPoolExecutor] = None
+
+    def _wrap(self, fn: Callable[[], Any]) -> Callable[[], Any]:
+        self.pending += 1
+
+        def run() -> Any:
+            self.pending -= 1
+            self.running += 1
+            try:
+                return fn()
+            finally:
+                self.running -= 1
+        return run
+
+    def submit(self, fn: Callable[[], Any]) -> asyncio.Future:
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="llm-sdk")
+        return asyncio.get_running_loop().run_in_executor(self._executor, self._wrap(fn))
+
+    async def run(self, fn: Callable[[], Any]) -> Any:
+        return await self.submit(fn)
+
+    def close(self) -> None:
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+
+# SDK clients by provider, base URL and API key. Each client owns a connection pool, so
+# reusing it keeps connections warm across calls; a new client per call reconnects every
+# time, which falls over when a batch or job queue makes hundreds of calls. Evicted
+# clients are closed after a delay, so calls still holding them can finish first (the
+# SDKs' own request timeout is 10 minutes).
+SDK_CLIENT_CLOSE_DELAY_SECONDS = 600
+_sdk_clients_closing: Dict[asyncio.Task, Any] = {}
+
+
+async def _close_sdk_client(client: Any) -> None:
+    try:
+        # The async SDKs close their connection pool; Google's gRPC client closes through its transport
+        if hasattr(client, "close"):
+            await client.close()
+        else:
+            client.transport.close()
+    except Exception as e:
+        console.print(f"[yellow]Could not close SDK client: {e}[/yellow]")
+
+
+def _close_sdk_client_later(client: Any) -> None:
+    async def close_later() -> None:
+        await asyncio.sleep(SDK_CLIENT_CLOSE_DELAY_SECONDS)
+        await _close_sdk_client(client)
+
+    task = asyncio.ensure_future(close_later())
+    _sdk_clients_closing[task] = client
+    task.add_done_callback(lambda done: _sdk_clients_closing.pop(done, None))
+
+
+async def close_sdk_clients() -> None:
+    # On shutdown: close cached clients and evicted ones still waiting out their delay
+    clients = _sdk_clients.values()
+    for task, client in list(_sdk_clients_closing.items()):
+        task.cancel()
+        clients.append(client)
+    _sdk_clients_closing.clear()
+    _sdk_clients.clear()
+    for client in clients:
+        await _close_sdk_client(client)
+
+
+_sdk_clients = LruCache(max_entries=64, max_bytes=64, on_evict=_close_sdk_client_later)
+
+
+def shared_sdk_client(provider: str, api_key: Optional[str], base_url: Optional[str], factory: Callable[[], Any]) -> Any:
+    key = hashlib.sha256(json.dumps([provider, base_url, api_key]).encode("utf-8")).hexdigest()
+    client = _sdk_clients.get(key)
+    if client is None:
+        client = factory()
+        _sdk_clients.set(key, client, 1)
+    return client
+
+
+class ProviderAdapter:
+    # Uniform interface over the provider SDKs: `complete` returns the whole answer,
+    # `stream` yields text deltas as they arrive. Adapters validate their settings on
+    # construction and raise HTTPException for bad requests. Each adapter imports its
+    # SDK on construction; `sdk_module` names it so startup can pre-import it.
+    provider: str = ""
+    sdk_module: str = ""
+
+    def __init__(self, global_config: Config, api_key: Optional[str] = None, model_name: Optional[str] = None, base_url: Optional[str] = None):
+        self.global_config = global_config
+        self.api_key = api_key
+        self.model = model_name or DEFAULT_MODELS[self.provider]
+        self.base_url = base_url
+        # Set by ProviderGovernor to learn about rate limits from response headers
+        self.on_headers: Optional[Callable[[Any], None]] = None
+
+    def _observe_headers(self, headers: Any) -> None:
+        if self.on_headers is not None and headers is not None:
+            self.on_headers(headers)
+
+    def _require_api_key(self, provider_label: str) -> None:
+        if not self.api_key:
+            raise HTTPException(status_code=400, detail=f"API key is required for {provider_label}.")
+
+    async def complete(self, system_prompt_dict: Dict[str, str], user_prompt_dict: Dict[str, str]) -> Optional[str]:
+        raise NotImplementedError
+
+    async def stream(self, system_prompt_dict: Dict[str, str], user_prompt_dict: Dict[str, str]) -> AsyncIterator[str]:
+        raise NotImplementedError
+        yield ""
+
+
+class OpenAICompatibleAdapter(ProviderAdapter):
+    # OpenAI itself plus every provider that speaks its chat completions API
+    sdk_module = "openai"
+
+    def __init__(self, global_config: Config, api_key: Optional[str] = None, model_name: Optional[str] = None, base_url: Optional[str] = None):
+        super().__init__(global_config, api_key, model_name, base_url)
+        if self.provider == "openai":
+            self._require_api_key("OpenAI")
+        elif self.provider == "deepseek":
+            self._require_api_key("DeepSeek")
+            self.base_url = "https://api.deepseek.com"
+        elif self.provider == "groq":
+            self._require_api_key("Groq")
+            # Groq's OpenAI-compatible endpoint
+            self.base_url = base_url or "https://api.groq.com/openai/v1"
+        elif self.provider == "ollama":
+            self.api_key = api_key or "ollama"
+            self.base_url = base_url or global_config.ollama_base_url
+        from openai import AsyncOpenAI
+        # Retries are left to ProviderGovernor so every 429 reaches the rate limiter
+        self.client = shared_sdk_client(
+            self.provider, self.api_key, self.base_url,
+            lambda: AsyncOpenAI(api_key=self.api_key, base_url=self.base_url, max_retries=0)
+        )
+
+    async def complete(self, system_prompt_dict: Dict[str, str], user_prompt_dict: Dict[str, str]) -> Optional[str]:
+        raw = await self.client.chat.completions.with_raw_response.create(
+            model=self.model,
+            messages=[system_prompt_dict, user_prompt_dict],
+            temperature=0.2,
+            max_tokens=MAX_OUTPUT_TOKENS,
+        )
+        self._observe_headers(raw.headers)
+        response = raw.parse()
+        return response.choices[0].message.content
+
+    async def stream(self, system_prompt_dict: Dict[str, str], user_prompt_dict: Dict[str, str]) -> AsyncIterator[str]:
+        raw = await self.client.chat.completions.with_raw_response.create(
+            model=self.model,
+            messages=[system_prompt_dict, user_prompt_dict],
+            temperature=0.2,
+            max_tokens=MAX_OUTPUT_TOKENS,
+            stream=True
+        )
+        self._observe_headers(raw.headers)
+        stream = raw.parse()
+        async for chunk in stream:
+            if chunk.choices and chunk.choices[0].delta.content is not None:
+                yield chunk.choices[0].delta.content
+
+
+class OpenAIAdapter(OpenAICompatibleAdapter):
+    provider = "openai"
+
+
+class OllamaAdapter(OpenAICompatibleAdapter):
+    provider = "ollama"
+
+
+class GroqAdapter(OpenAICompatibleAdapter):
+    provider = "groq"
+
+
+class DeepSeekAdapter(OpenAICompatibleAdapter):
+    provider = "deepseek"
+
+
+class AnthropicAdapter(ProviderAdapter):
+    provider = "anthropic"
+    sdk_module = "anthropic"
+
+    def __init__(self, global_config: Config, api_key: Optional[str] = None, model_name: Optional[str] = None, base_url: Optional[str] = None):
+        super().__init__(global_config, api_key, model_name, base_url)
+        self._require_api_key("Anthropic")
+        from anthropic import AsyncAnthropic
+        self.client = shared_sdk_client(
+            self.provider, self.api_key, self.base_url,
+            lambda: AsyncAnthropic(api_key=self.api_key, base_url=self.base_url, max_retries=0)
+        )
+
+    async def complete(self, system_prompt_dict: Dict[str, str], user_prompt_dict: Dict[str, str]) -> Optional[str]:
+        raw = await self.client.messages.with_raw_response.create(
+            model=self.model,
+            system=system_prompt_dict['content'],
+            messages=[user_prompt_dict],
+            max_tokens=MAX_OUTPUT_TOKENS,
+            temperature=0.2,
+        )
+        self._observe_headers(raw.headers)
+        response = raw.parse()
+        return response.content[0].text
+
+    async def stream(self, system_prompt_dict: Dict[str, str], user_prompt_dict: Dict[str, str]) -> AsyncIterator[str]:
+        async with self.client.messages.stream(
+            model=self.model,
+            system=system_prompt_dict['content'],
+            messages=[user_prompt_dict],
+            max_tokens=MAX_OUTPUT_TOKENS,
+            temperature=0.2,
+        ) as stream:
+            self._observe_headers(stream.response.headers)
+            async for text in stream.text_stream:
+                yield text
+
+
+class GoogleAdapter(ProviderAdapter):
+    # The google-generativeai SDK is synchronous: calls run on the SDK thread pool, and
+    # streamed chunks are handed back to the event loop through an asyncio.Queue.
+    provider = "google"
+    sdk_module = "google.generativeai"
+
+    # For safety config,
+    safety_settings = [
+        {"category": "HARM_CATEGORY_HARASSMENT", "threshold": "BLOCK_NONE"},
+        {"category": "HARM_CATEGORY_HATE_SPEECH", "threshold": "BLOCK_NONE"},
+        {"category": "HARM_CATEGORY_SEXUALLY_EXPLICIT", "threshold": "BLOCK_NONE"},
+        {"category": "HARM_CATEGORY_DANGEROUS_CONTENT", "threshold": "BLOCK_NONE"},
+    ]
+
+    def __init__(self, global_config: Config, api_key: Optional[str] = None, model_name: Optional[str] = None, base_url: Optional[str] = None):
+        super().__init__(global_config, api_key, model_name, base_url)
+        self._require_api_key("Google Generative AI")
+        import google.generativeai as genai
+        import google.ai.generativelanguage as glm
+        # Gemini has no separate system role in the simple API, so the system context
+        # is prepended to the user prompt (broadly compatible across models)
+        self.model_instance = genai.GenerativeModel(model_name=self.model)
+        # A client per key rather than genai.configure(), which sets one key for the whole
+        # process: with concurrent requests, a call could go out with another user's key
+        try:
+            self.model_instance._client = shared_sdk_client(
+                self.provider, self.api_key, None,
+                lambda: glm.GenerativeServiceClient(client_options={"api_key": self.api_key})
+            )
+        except Exception as e:
+            raise HTTPException(status_code=500, detail=f"Failed to configure Google AI SDK: {str(e)}")
+        self.generation_config = genai.types.GenerationConfig(
+            max_output_tokens=MAX_OUTPUT_TOKENS,
+            temperature=0.2,
+        )
+
+    def _full_prompt(self, system_prompt_dict: Dict[str, str], user_prompt_dict: Dict[str, str]) -> str:
+        return f"{system_prompt_dict['content']}\n\n{user_prompt_dict['content']}"
+
+    def _raise_if_blocked(self, response) -> None:
+        # Check for empty response or blocked content
+        if response.prompt_feedback and response.prompt_feedback.block_reason:
+            block_reason = response.prompt_feedback.block_reason_message or str(response.prompt_feedback.block_reason)
+            console.print(f"[yellow]Google AI response blocked. Feedback: {response.prompt_feedback}[/yellow]")
+            raise HTTPException(status_code=400, detail=f"Content generation blocked by Google AI. Reason: {block_reason}")
+
+    def _map_error(self, e: Exception) -> HTTPException:
+        if isinstance(e, HTTPException):
+            return e
+        console.print(f"[red]Error with Google AI generation: {e}[/red]")
+        if "API key not valid" in str(e):
+            return HTTPException(status_code=401, detail="Invalid Google API Key.")
+        if getattr(e, "code", None) == 429:
+            return HTTPException(status_code=429, detail=f"Google AI rate limit exceeded: {str(e)}")
+        return HTTPException(status_code=500, detail=f"Error during Google AI summarization: {str(e)}")
+
+    async def complete(self, system_prompt_dict: Dict[str, str], user_prompt_dict: Dict[str, str]) -> Optional[str]:
+        full_prompt = self._full_prompt(system_prompt_dict, user_prompt_dict)
+        try:
+            response = await sdk_executor.run(
+                lambda: self.model_instance.generate_content(
+                    full_prompt,
+                    generation_config=self.generation_config,
+                    safety_settings=self.safety_settings
+                )
+            )
+            self._raise_if_blocked(response)
+            if not response.candidates or not response.text:
+                raise HTTPException(status_code=400, detail="Content generation blocked by Google AI. Reason: Unknown reason")
+            return response.text
+        except Exception as e:
+            raise self._map_error(e)
+
+    async def stream(self, system_prompt_dict: Dict[str, str], user_prompt_dict: Dict[str, str]) -> AsyncIterator[str]:
+        full_prompt = self._full_prompt(system_prompt_dict, user_prompt_dict)
+        loop = asyncio.get_running_loop()
+        queue: asyncio.Queue = asyncio.Queue()
+        done = object()
+        cancelled = threading.Event()
+
+        def produce() -> None:
+            try:
+                response = self.model_instance.generate_content(
+                    full_prompt,
+                    generation_config=self.generation_config,
+                    safety_settings=self.safety_settings,
+                    stream=True
+                )
+                for chunk in response:
+                    if cancelled.is_set():
+                        break
+                    self._raise_if_blocked(chunk)
+                    text = "".join(part.text for part in chunk.parts if getattr(part, "text", None))
+                    if text:
+                        loop.call_soon_threadsafe(queue.put_nowait, text)
+            except Exception as e:
+                loop.call_soon_threadsafe(queue.put_nowait, e)
+            finally:
+                loop.call_soon_threadsafe(queue.put_nowait, done)
+
+        sdk_executor.submit(produce)
+        try:
+            while True:
+                item = await queue.get()
+                if item is done:
+                    break
+                if isinstance(item, Exception):
+                    raise self._map_error(item)
+                yield item
+        finally:
+            # Let the worker thread stop at the next chunk if the consumer went away
+            cancelled.set()
+
+
+PROVIDER_ADAPTERS: Dict[str, type] = {
+    "openai": OpenAIAdapter,
+    "ollama": OllamaAdapter,
+    "anthropic": AnthropicAdapter,
+    "google": GoogleAdapter,
+    "groq": GroqAdapter,
+    "deepseek": DeepSeekAdapter,
+}
+
+
+def get_provider_adapter(
+    global_config: Config,
+    llm_provider: LLMProvider,
+    api_key: Optional[str] = None,
+    model_name: Optional[str] = None,
+    base_url: Optional[str] = None
+) -> ProviderAdapter:
+    adapter_class = PROVIDER_ADAPTERS.get(llm_provider)
+    if adapter_class is None:
+        raise HTTPException(status_code=400, detail=f"Unsupported LLM provider: {llm_provider}")
+    return adapter_class(global_config, api_key=api_key, model_name=model_name, base_url=base_url)
+
+
+async def timed_llm_stream(deltas: AsyncIterator[str], model: str) -> AsyncIterator[str]:
+    # Records time-to-first-token, total LLM time and output tokens/sec of a delta stream
+    started = time.perf_counter()
+    first_token_at: Optional[float] = None
+    output: List[str] = []
+    async for delta in deltas:
+        if first_token_at is None:
+            first_token_at = time.perf_counter()
+            record_stage("llm_ttft", first_token_at - started)
+        output.append(delta)
+        yield delta
+    finished = time.perf_counter()
+    record_stage("llm_total", finished - started)
+    if first_token_at is not None and finished > first_token_at:
+        tokens_per_second = count_tokens("".join(output), model) / (finished - first_token_at)
+        metrics.llm_tokens_per_second.observe(tokens_per_second)
+        timings = current_timings.get()
+        if timings is not None:
+            timings.llm_tokens_per_second = round(tokens_per_second, 1)
+
+class LlmSummarizer:
+    def __init__(self, global_config: Config):
+        self.global_config = global_config
+        self.summary_cache = SummaryCache(global_config)
+        self.summary_flights = SingleFlight()
+        self.chunking = ChunkingPolicy(global_config)
+        self.provider_stats = ProviderStats(global_config)
+        self.governor = ProviderGovernor(global_config)
+        self.snapshots = SnapshotStore(global_config)
+        self.stream_flights = StreamFlight()
+        # For Google, API key is configured globally via the SDK usually
+        # but we'll accept it from the user for max flexibility
+
+    def _get_system_prompt(self) -> Dict[str, str]:
+        return {
+            "role": "system",
+            "content": (
+                # "You are an assistant that analyzes the contents of a website "
+                # "and provides a short summary, ignoring the text that might be navigation-related. "
+                "You are faithful companion for fetching AI-powered website summaries! 🐾 "
+                "Respond in markdown and be concise."
+            )
+        }
+
+    def _get_user_prompt(self, website: Website) -> Dict[str, str]:
+        return {
+            "role": "user",
+            "content": (
+                f"You are looking at the website titled \"{website.title}\". "
+                "The content of this website is as follows; "
+                "please provide a short summary of this website in markdown. "
+                "If it includes news or announcements, then summarize these too.\n\n"
+                f"\"\"\"\n{website.text}\n\"\"\"\n\n"
+            )
+        }
+        
+    def _get_chunk_prompt(self, website: Website, chunk: str, index: int, total: int) -> Dict[str, str]:
+        return {
+            "role": "user",
+            "content": (
+                f"You are looking at part {index + 1} of {total} of the website titled \"{website.title}\". "
+                "Summarize the key points of this part in a few markdown bullet points, "
+                "keeping any news or announcements. Do not add an introduction.\n\n"
+                f"\"\"\"\n{chunk}\n\"\"\"\n\n"
+            )
+        }
+
+    def _get_reduce_prompt(self, website: Website, chunk_summaries: List[str]) -> Dict[str, str]:
+        sections = "\n\n".join(f"Part {i + 1}:\n{summary}" for i, summary in enumerate(chunk_summaries))
+        return {
+            "role": "user",
+            "content": (
+                f"You are looking at the website titled \"{website.title}\". "
+                "The website was too long to read at once, so here are summaries of its parts in order; "
+                "please provide a short summary of this website in markdown. "
+                "If it includes news or announcements, then summarize these too.\n\n"
+                f"\"\"\"\n{sections}\n\"\"\"\n\n"
+            )
+        }
+
+    def _get_update_prompt(self, website: Website, previous_summary: str, added: List[str], removed: List[str]) -> Dict[str, str]:
+        # Only what changed is sent; removed blocks are listed shortened, as a hint of what to drop
+        removed_lines = [block if len(block) <= 200 else block[:200] + "..." for block in removed[:30]]
+        if len(removed) > 30:
+            removed_lines.append(f"(and {len(removed) - 30} more)")
+        content = (
+            f"You previously summarized the website titled \"{website.title}\" as follows:\n\n"
+            f"\"\"\"\n{previous_summary}\n\"\"\"\n\n"
+            "The page has changed since then. This is its new or changed content:\n\n"
+            f"\"\"\"\n{chr(10).join(added) or '(none)'}\n\"\"\"\n\n"
+        )
+        if removed_lines:
+            content += f"This content is no longer on the page:\n\n\"\"\"\n{chr(10).join(removed_lines)}\n\"\"\"\n\n"
+        content += (
+            "Please update the summary in markdown: work in the new content, putting news and "
+            "announcements first, drop what is no longer on the page and keep the rest. "
+            "Reply with the complete updated summary only."
+        )
+        return {"role": "user", "content": content}
+
+    def _get_site_prompt(self, site_title: str, start_url: str, sections: List[str], level: str) -> Dict[str, str]:
+        combined = "\n\n".join(sections)
+        return {
+            "role": "user",
+            "content": (
+                f"You are looking at the website titled \"{site_title}\" ({start_url}). "
+                f"Here are summaries of {len(sections)} {level} of the site; "
+                "please provide a short summary of the whole site in markdown: what it is about, "
+                "how it is organised and its most important content. "
+                "If it includes news or announcements, then summarize these too.\n\n"
+                f"\"\"\"\n{combined}\n\"\"\"\n\n"
+            )
+        }
+
+    def _get_site_group_prompt(self, site_title: str, sections: List[str], index: int, total: int) -> Dict[str, str]:
+        combined = "\n\n".join(sections)
+        return {
+            "role": "user",
+            "content": (
+                f"You are looking at group {index + 1} of {total} of page summaries from the website titled \"{site_title}\". "
+                "Combine them into a few markdown bullet points covering the key points, "
+                "keeping any news or announcements. Do not add an introduction.\n\n"
+                f"\"\"\"\n{combined}\n\"\"\"\n\n"
+            )
+        }
+
+    async def scrape(self, website_url: str, scrape_budget_ms: Optional[int] = None) -> Website:
+        try:
+            with stage_timer("scrape_total"):
+                website = await Website.create(website_url, budget_ms=scrape_budget_ms)
+        except HTTPException: # e.g. an unreadable or oversized document
+            raise
+        except Exception as e:
+            raise HTTPException(status_code=500, detail=f"Failed to scrape website: {str(e)}")
+
+        if "Could not scrape content" in website.text:
+             raise HTTPException(status_code=500, detail=f"Failed to process website content from: {website.url}")
+        return website
+
+    def summary_cache_key(
+        self,
+        website: Website,
+        llm_provider: LLMProvider,
+        model_name: Optional[str] = None,
+        base_url: Optional[str] = None
+    ) -> str:
+        effective_model = model_name or DEFAULT_MODELS[llm_provider]
+        payload = json.dumps([PROMPT_VERSION, llm_provider, effective_model, base_url, website.title, website.text])
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    async def summarize_website(
+        self,
+        website: Website,
+        llm_provider: LLMProvider,
+        api_key: Optional[str] = None,
+        model_name: Optional[str] = None,
+        base_url: Optional[str] = None
+    ) -> Optional[str]:
+        cache_key = self.summary_cache_key(website, llm_provider, model_name, base_url)
+        cached_summary = await self.summary_cache.get(cache_key)
+        if cached_summary is not None:
+            console.print(f"Summary cache hit for {website.url} ({llm_provider})")
+            return cached_summary
+
+        async def generate_and_store() -> Optional[str]:
+            summary = await self._generate(website, llm_provider, api_key, model_name, base_url)
+            if summary:
+                await self.summary_cache.set(cache_key, summary)
+            return summary
+
+        return await self.summary_flights.do(f"{cache_key}:{_api_key_fingerprint(api_key)}", generate_and_store)
+
+    async def _generate(
+        self,
+        website: Website,
+        llm_provider: LLMProvider,
+        api_key: Optional[str] = None,
+        model_name: Optional[str] = None,
+        base_url: Optional[str] = None
+    ) -> Optional[str]:
+        user_prompt_dict = await self.prepare_user_prompt(website, llm_provider, api_key, model_name, base_url)
+        with stage_timer("llm_total"):
+            return await self._complete(self._get_system_prompt(), user_prompt_dict, llm_provider, api_key, model_name, base_url)
+
+    async def prepare_user_prompt(
+        self,
+        website: Website,
+        llm_provider: LLMProvider,
+        api_key: Optional[str] = None,
+        model_name: Optional[str] = None,
+        base_url: Optional[str] = None
+    ) -> Dict[str, str]:
+        # Pages that fit the model's input budget are summarized in one call. Larger
+        # pages are split into overlapping chunks that are summarized concurrently (map)
+        # and the final prompt combines those partial summaries (reduce). The map calls
+        # are timed as `llm_map`, so `prompt_build` only covers building the prompt.
+        started = time.perf_counter()
+        effective_model = model_name or DEFAULT_MODELS[llm_provider]
+        budget = self.chunking.input_budget(effective_model)
+        page_tokens = count_tokens(website.text, effective_model)
+        if page_tokens <= budget:
+            user_prompt_dict = self._get_user_prompt(website)
+            record_stage("prompt_build", time.perf_counter() - started)
+            return user_prompt_dict
+        building = time.perf_counter() - started
+
+        with stage_timer("llm_map"):
+            chunk_summaries = await self._map_chunks(website, website.text, page_tokens, budget, llm_provider, api_key, model_name, base_url)
+            # Partial summaries can themselves exceed the budget on enormous pages; fold again
+            combined = "\n\n".join(chunk_summaries)
+            while count_tokens(combined, effective_model) > budget and len(chunk_summaries) > 1:
+                chunk_summaries = await self._map_chunks(website, combined, count_tokens(combined, effective_model), budget, llm_provider, api_key, model_name, base_url)
+                combined = "\n\n".join(chunk_summaries)
+
+        started = time.perf_counter()
+        user_prompt_dict = self._get_reduce_prompt(website, chunk_summaries)
+        record_stage("prompt_build", building + time.perf_counter() - started)
+        return user_prompt_dict
+
+    async def _map_chunks(
+        self,
+        website: Website,
+        text: str,
+        text_tokens: int,
+        budget: int,
+        llm_provider: LLMProvider,
+        api_key: Optional[str],
+        model_name: Optional[str],
+        base_url: Optional[str]
+    ) -> List[str]:
+        # Convert the token budget into characters using this text's own density
+        chars_per_token = len(text) / max(1, text_tokens)
+        chunks = split_into_chunks(
+            text,
+            max_chars=int(budget * chars_per_token),
+            overlap_chars=int(self.chunking.overlap_tokens * chars_per_token),
+        )
+        console.print(f"Summarizing {website.url} in {len(chunks)} chunks ({text_tokens} tokens, budget {budget})")
+        semaphore = asyncio.Semaphore(self.chunking.map_concurrency)
+        system_prompt_dict = self._get_system_prompt()
+
+        async def summarize_chunk(index: int, chunk: str) -> str:
+            async with semaphore:
+                prompt = self._get_chunk_prompt(website, chunk, index, len(chunks))
+                return await self._complete(system_prompt_dict, prompt, llm_provider, api_key, model_name, base_url) or ""
+
+        return list(await asyncio.gather(*(summarize_chunk(i, chunk) for i, chunk in enumerate(chunks))))
+
+    async def _complete(
+        self,
+        system_prompt_dict: Dict[str, str],
+        user_prompt_dict: Dict[str, str],
+        llm_provider: LLMProvider,
+        api_key: Optional[str] = None,
+        model_name: Optional[str] = None,
+        base_url: Optional[str] = None
+    ) -> Optional[str]:
+        try:
+            adapter = get_provider_adapter(self.global_config, llm_provider, api_key, model_name, base_url)
+            return await self.governor.complete(adapter, system_prompt_dict, user_prompt_dict)
+        except HTTPException: # Re-raise known HTTPExceptions
+            raise
+        except Exception as e:
+            import traceback
+            console.print(f"[red]Error during summarization with {llm_provider}: {e}[/red]")
+            traceback.print_exc()
+            raise HTTPException(status_code=500, detail=f"Error during summarization: {str(e)}")
+        finally:
+            console.print("Completed summarization i.e hitting the LLM")
+
+    async def _attempt_stream(self, website: Website, candidate: ProviderCandidate) -> AsyncIterator[str]:
+        adapter = get_provider_adapter(self.global_config, candidate.llm_provider, candidate.api_key, candidate.model_name, candidate.base_url)
+        user_prompt_dict = await self.prepare_user_prompt(website, candidate.llm_provider, candidate.api_key, candidate.model_name, candidate.base_url)
+        # No retries here: failing over to the next candidate is the retry
+        deltas = self.governor.stream(adapter, self._get_system_prompt(), user_prompt_dict, max_retries=0)
+        async for delta in timed_llm_stream(deltas, adapter.model):
+            yield delta
+
+    async def stream_routed(
+        self,
+        website: Website,
+        candidates: List[ProviderCandidate],
+        routing: "RoutingPolicy",
+        outcome: Dict[str, Any]
+    ) -> AsyncIterator[str]:
+        # Sends the request to the first candidate; if it fails, the next one is tried,
+        # and if no first token arrives within the hedge delay the next candidate is
+        # started alongside it. The first attempt to produce a token wins and the
+        # others are cancelled. `outcome` receives the winning candidate.
+        if routing.adaptive_order:
+            candidates = self.provider_stats.order(candidates)
+
+        for candidate in candidates:
+            cached_summary = await self.summary_cache.get(
+                self.summary_cache_key(website, candidate.llm_provider, candidate.model_name, candidate.base_url)
+            )
+            if cached_summary is not None:
+                outcome.update(candidate=candidate, cached=True)
+                for frame in _split_into_frames(cached_summary):
+                    yield frame
+                return
+
+        remaining = list(candidates)
+        attempts: Dict[asyncio.Task, Tuple[ProviderCandidate, AsyncIterator[str], float]] = {}
+        last_error: Optional[BaseException] = None
+
+        def start_next() -> None:
+            candidate = remaining.pop(0)
+            stream = self._attempt_stream(website, candidate)
+            task = asyncio.ensure_future(stream.__anext__())
+            attempts[task] = (candidate, stream, time.monotonic())
+            if len(attempts) > 1:
+                console.print(f"Hedging with {candidate.stats_key}")
+
+        async def cancel_attempts(tasks: List[asyncio.Task], censor: bool = False) -> None:
+            for task in tasks:
+                task.cancel()
+                candidate, stream, started = attempts.pop(task)
+                if censor:
+                    self.provider_stats.record_censored(candidate.stats_key, time.monotonic() - started)
+                try:
+                    await task
+                except BaseException:
+                    pass
+                await stream.aclose()
+
+        start_next()
+        winner = None
+        try:
+            while winner is None:
+                if not attempts:
+                    if not remaining:
+                        break
+                    start_next()
+                primary = next(iter(attempts.values()))[0]
+                timeout = None
+                if routing.hedge and remaining:
+                    timeout = (routing.hedge_delay_ms / 1000) if routing.hedge_delay_ms else self.provider_stats.hedge_delay(primary.stats_key)
+                done, _ = await asyncio.wait(list(attempts), timeout=timeout, return_when=asyncio.FIRST_COMPLETED)
+                if not done:
+                    start_next()
+                    continue
+                for task in done:
+                    candidate, stream, started = attempts[task]
+                    error = task.exception()
+                    if error is None:
+                        if winner is None:
+                            winner = (task, candidate, stream, started)
+                        continue
+                    attempts.pop(task)
+                    await stream.aclose()
+                    if isinstance(error, StopAsyncIteration):
+                        error = HTTPException(status_code=502, detail=f"{candidate.stats_key} returned an empty answer")
+                    console.print(f"[yellow]Routing attempt {candidate.stats_key} failed: {error}[/yellow]")
+                    self.provider_stats.record_failure(candidate.stats_key)
+                    last_error = error
+        except BaseException:
+            await cancel_attempts(list(attempts))
+            raise
+
+        if winner is None:
+            if isinstance(last_error, HTTPException):
+                raise last_error
+            raise HTTPException(status_code=502, detail=f"All providers failed. Last error: {last_error}")
+
+        task, candidate, stream, started = winner
+        self.provider_stats.record_success(candidate.stats_key, time.monotonic() - started)
+        attempts.pop(task)
+        # The losers were still waiting for their first token
+        await cancel_attempts(list(attempts), censor=True)
+        outcome.update(candidate=candidate, cached=False)
+
+        summary_parts = [task.result()]
+        yield summary_parts[0]
+        async for delta in stream:
+            summary_parts.append(delta)
+            yield delta
+        await self.summary_cache.set(
+            self.summary_cache_key(website, candidate.llm_provider, candidate.model_name, candidate.base_url),
+            "".join(summary_parts)
+        )
+
+    async def summarize_routed(
+        self,
+        website: Website,
+        candidates: List[ProviderCandidate],
+        routing: "RoutingPolicy"
+    ) -> Tuple[str, ProviderCandidate]:
+        outcome: Dict[str, Any] = {}
+        summary = "".join([delta async for delta in self.stream_routed(website, candidates, routing, outcome)])
+        return summary, outcome["candidate"]
+
+    async def stream_summary(
+        self,
+        website: Website,
+        llm_provider: LLMProvider,
+        api_key: Optional[str] = None,
+        model_name: Optional[str] = None,
+        base_url: Optional[str] = None
+    ) -> AsyncIterator[str]:
+        # Token stream for an already scraped website; the finished summary is cached.
+        # Validates the provider settings before any work so errors surface immediately.
+        adapter = get_provider_adapter(self.global_config, llm_provider, api_key, model_name, base_url)
+        cache_key = self.summary_cache_key(website, llm_provider, model_name, base_url)
+
+        async def upstream_deltas() -> AsyncIterator[str]:
+            # Oversized pages run the map stage here; only the final (reduce) stage streams
+            user_prompt_dict = await self.prepare_user_prompt(website, llm_provider, api_key, model_name, base_url)
+            summary_parts: List[str] = []
+            deltas = self.governor.stream(adapter, self._get_system_prompt(), user_prompt_dict)
+            async for delta in timed_llm_stream(deltas, adapter.model):
+                summary_parts.append(delta)
+                yield delta
+            if summary_parts:
+                await self.summary_cache.set(cache_key, "".join(summary_parts))
+
+        # Identical concurrent requests subscribe to one upstream token stream
+        flight_key = f"{cache_key}:{_api_key_fingerprint(api_key)}"
+        async for delta in self.stream_flights.subscribe(flight_key, upstream_deltas):
+            yield delta
+
+    async def stream_incremental(
+        self,
+        website: Website,
+        llm_provider: LLMProvider,
+        api_key: Optional[str] = None,
+        model_name: Optional[str] = None,
+        base_url: Optional[str] = None,
+        outcome: Optional[Dict[str, Any]] = None
+    ) -> AsyncIterator[str]:
+        # Change-aware summary of a page seen before: replays the previous summary when
+        # no block changed, sends only added/removed blocks plus the previous summary
+        # when a few did, and falls back to a full summary for new or mostly rewritten
+        # pages. `outcome` receives the mode and block/token counts.
+        outcome = outcome if outcome is not None else {}
+        adapter = get_provider_adapter(self.global_config, llm_provider, api_key, model_name, base_url)
+        key = SnapshotStore.key(website.url, llm_provider, model_name, base_url)
+        previous = await self.snapshots.get(key)
+        blocks = split_into_blocks(website.text)
+        page_tokens = count_tokens(website.text, adapter.model)
+        outcome.update(total_blocks=len(blocks), page_tokens=page_tokens)
+
+        added: List[str] = blocks
+        removed: List[str] = []
+        mode = "full"
+        if previous is not None:
+            added, removed = diff_blocks(previous["blocks"], blocks)
+            changed_ratio = (len(added) + len(removed)) / max(1, len(blocks) + len(removed))
+            if not added and not removed and previous["title"] == website.title:
+                mode = "unchanged"
+            elif changed_ratio <= self.snapshots.max_changed_ratio:
+                mode = "incremental"
+        outcome.update(mode=mode, added_blocks=len(added), removed_blocks=len(removed))
+
+        if mode == "unchanged":
+            console.print(f"No changes on {website.url} since the last summary")
+            outcome["input_tokens"] = 0
+            for frame in _split_into_frames(previous["summary"]):
+                yield frame
+            return
+
+        if mode == "incremental":
+            with stage_timer("prompt_build"):
+                user_prompt_dict = self._get_update_prompt(website, previous["summary"], added, removed)
+            input_tokens = count_tokens(user_prompt_dict["content"], adapter.model)
+            budget = self.chunking.input_budget(adapter.model)
+            if input_tokens > budget:
+                # Too many changes for one call; the full path chunks the page (map-reduce)
+                console.print(
+                    f"[yellow]Update prompt for {website.url} is {input_tokens} tokens (budget {budget}), "
+                    f"summarizing the page from scratch[/yellow]"
+                )
+                mode = "full"
+                outcome["mode"] = mode
+
+        if mode == "incremental":
+            outcome["input_tokens"] = input_tokens
+            console.print(
+                f"{len(added)} new and {len(removed)} removed blocks on {website.url}: "
+                f"sending {outcome['input_tokens']} instead of {page_tokens} page tokens"
+            )
+            deltas = timed_llm_stream(self.governor.stream(adapter, self._get_system_prompt(), user_prompt_dict), adapter.model)
+        else:
+            outcome["input_tokens"] = page_tokens
+            deltas = self.stream_summary(website, llm_provider, api_key, model_name, base_url)
+
+        summary_parts: List[str] = []
+        async for delta in deltas:
+            summary_parts.append(delta)
+            yield delta
+        if summary_parts:
+            await self.snapshots.set(key, website.title, blocks, "".join(summary_parts))
+
+    async def summarize_incremental(
+        self,
+        website: Website,
+        llm_provider: LLMProvider,
+        api_key: Optional[str] = None,
+        model_name: Optional[str] = None,
+        base_url: Optional[str] = None
+    ) -> Tuple[str, Dict[str, Any]]:
+        outcome: Dict[str, Any] = {}
+        summary = "".join([
+            delta async for delta in self.stream_incremental(website, llm_provider, api_key, model_name, base_url, outcome)
+        ])
+        return summary, outcome
+
+    async def summarize_many(
+        self,
+        urls: List[str],
+        llm_provider: LLMProvider,
+        api_key: Optional[str] = None,
+        model_name: Optional[str] = None,
+        base_url: Optional[str] = None,
+        scrape_budget_ms: Optional[int] = None,
+        scrape_concurrency: int = 4,
+        llm_concurrency: int = 4
+    ) -> AsyncIterator[Dict[str, Any]]:
+        # Two-stage pipeline: scrape workers feed a bounded queue that LLM workers drain,
+        # so pages are summarized while others are still rendering. Results are yielded
+        # as soon as each URL finishes; a failing URL never aborts the rest of the batch.
+        url_queue: asyncio.Queue = asyncio.Queue()
+        llm_queue: asyncio.Queue = asyncio.Queue(maxsize=llm_concurrency * 2)
+        results: asyncio.Queue = asyncio.Queue()
+        for index, url in enumerate(urls):
+            url_queue.put_nowait((index, url))
+
+        async def scrape_worker() -> None:
+            while True:
+                try:
+                    index, url = url_queue.get_nowait()
+                except asyncio.QueueEmpty:
+                    return
+                started = time.time()
+                try:
+                    website = await Website.create(url, budget_ms=scrape_budget_ms)
+                    if "Could not scrape content" in website.text:
+                        raise HTTPException(status_code=500, detail=f"Failed to process website content from: {website.url}")
+                except Exception as e:
+                    detail = e.detail if isinstance(e, HTTPException) else f"Failed to scrape website: {str(e)}"
+                    await results.put({"index": index, "url": url, "status": "error", "error": detail})
+                    continue
+                await llm_queue.put((index, url, website, started))
+
+        async def llm_worker() -> None:
+            while True:
+                item = await llm_queue.get()
+                if item is None:
+                    return
+                index, url, website, started = item
+                try:
+                    summary = await self.summarize_website(website, llm_provider, api_key, model_name, base_url)
+                    await results.put({
+                        "index": index,
+                        "url": url,
+                        "status": "ok",
+                        "title": website.title,
+                        "summary": summary,
+                        "processing_time": f"{time.time() - started:.1f} seconds",
+                    })
+                except Exception as e:
+                    detail = e.detail if isinstance(e, HTTPException) else f"Error during summarization: {str(e)}"
+                    await results.put({"index": index, "url": url, "status": "error", "error": detail})
+
+        async def run_pipeline() -> None:
+            llm_tasks = [asyncio.create_task(llm_worker()) for _ in range(llm_concurrency)]
+            try:
+                await asyncio.gather(*(scrape_worker() for _ in range(scrape_concurrency)))
+                for _ in llm_tasks:
+                    await llm_queue.put(None)
+                await asyncio.gather(*llm_tasks)
+            finally:
+                for task in llm_tasks:
+                    task.cancel()
+
+        pipeline = asyncio.create_task(run_pipeline())
+        try:
+            for _ in urls:
+                yield await results.get()
+            await pipeline
+        finally:
+            # Client went away or the pipeline failed: stop all outstanding work
+            pipeline.cancel()
+
+    @staticmethod
+    def _group_sections(sections: List[str], budget: int, model: str) -> List[List[str]]:
+        # Greedily packs consecutive sections into groups that fit the token budget
+        groups: List[List[str]] = []
+        group_tokens = 0
+        for section in sections:
+            tokens = count_tokens(section, model)
+            if groups and group_tokens + tokens <= budget:
+                groups[-1].append(section)
+                group_tokens += tokens
+            else:
+                groups.append([section])
+                group_tokens = tokens
+        return groups
+
+    async def summarize_site(
+        self,
+        site_title: str,
+        start_url: str,
+        pages: List[Dict[str, Any]],
+        llm_provider: LLMProvider,
+        api_key: Optional[str] = None,
+        model_name: Optional[str] = None,
+        base_url: Optional[str] = None
+    ) -> Optional[str]:
+        # Hierarchical roll-up of per-page summaries. When they all fit the model's input
+        # budget they go into a single prompt; otherwise they are packed into groups under
+        # the budget, each group is condensed concurrently and the result is rolled up again.
+        effective_model = model_name or DEFAULT_MODELS[llm_provider]
+        budget = self.chunking.input_budget(effective_model)
+        sections = [f"Page: {page['title']} ({page['url']})\n{page['summary']}" for page in pages]
+        payload = json.dumps([PROMPT_VERSION, "site", llm_provider, effective_model, base_url, site_title, start_url, sections])
+        cache_key = hashlib.sha256(payload.encode("utf-8")).hexdigest()
+        cached_summary = await self.summary_cache.get(cache_key)
+        if cached_summary is not None:
+            console.print(f"Summary cache hit for the site summary of {start_url} ({llm_provider})")
+            return cached_summary
+
+        system_prompt_dict = self._get_system_prompt()
+        semaphore = asyncio.Semaphore(self.chunking.map_concurrency)
+        level = "pages"
+        groups = self._group_sections(sections, budget, effective_model)
+        # Only fold while it actually reduces the number of sections
+        while 1 < len(groups) < len(sections):
+            console.print(f"Rolling up {len(sections)} {level} of {start_url} in {len(groups)} groups (budget {budget})")
 
-            # Set timeouts using correct property names
-            page.defaultNavigationTimeout = 60000  # 60 seconds
-            page.defaultTimeout = 60000  # 60 seconds for other operations
+            async def condense(index: int, group: List[str], total: int) -> str:
+                async with semaphore:
+                    prompt = self._get_site_group_prompt(site_title, group, index, total)
+                    return await self._complete(system_prompt_dict, prompt, llm_provider, api_key, model_name, base_url) or ""
 
-            user_agents: List[str] = [
-                "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/114.0.0.0 Safari/537.36",
-                "Mozilla/5.0 (Macintosh; Intel Mac OS X 13_0) AppleWebKit/605.1.15 (KHTML, like Gecko) Version/16.0 Safari/605.1.15",
-                "Mozilla/5.0 (X11; Linux x86_64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/102.0.0.0 Safari/537.36",
-            ]
-            ua = user_agents[randint(0, len(user_agents) - 1)]
-            await page.setUserAgent(ua)
+            condensed = await asyncio.gather(*(condense(i, group, len(groups)) for i, group in enumerate(groups)))
+            sections = [f"Group {i + 1}:\n{summary}" for i, summary in enumerate(condensed)]
+            level = "groups of pages"
+            groups = self._group_sections(sections, budget, effective_model)
 
-            # Set viewport to a reasonable desktop size
-            await page.setViewport({'width': 1280, 'height': 800})
+        with stage_timer("llm_total"):
+            summary = await self._complete(
+                system_prompt_dict, self._get_site_prompt(site_title, start_url, sections, level), llm_provider, api_key, model_name, base_url
+            )
+        if summary:
+            await self.summary_cache.set(cache_key, summary)
+        return summary
+
+# Links with these extensions are never crawled: they are not pages that can be summarized
+CRAWL_SKIP_EXTENSIONS = (
+    ".7z", ".avi", ".css", ".csv", ".dmg", ".doc", ".docx", ".exe", ".gif", ".gz", ".ico", ".jpeg", ".jpg",
+    ".js", ".mov", ".mp3", ".mp4", ".pdf", ".png", ".ppt", ".pptx", ".svg", ".tar", ".tgz", ".wav", ".webm",
+    ".webp", ".woff", ".woff2", ".xls", ".xlsx", ".xml", ".zip",
+)
 
-            await page.setRequestInterception(False)
-            
-            try:
-                # First attempt with networkidle0
-                await page.goto(
-                    self.__url,
-                    {
-                        "waitUntil": "networkidle0",
-                        "timeout": 60000  # 60 seconds timeout
-                    }
-                )
-            except Exception as nav_error:
-                console.print(f"[yellow]First navigation attempt failed, retrying with different settings: {nav_error}[/yellow]")
-                # If first attempt fails, try again with different settings
-                await page.goto(
-                    self.__url,
-                    {
-                        "waitUntil": "domcontentloaded",
-                        "timeout": 60000
-                    }
-                )
 
-            # Wait for body with increased timeout
-            await page.waitForSelector('body', {"timeout": 30000})
-            
-            # Wait a bit for dynamic content
-            await asyncio.sleep(2)
-            
-            self.__title = await page.title()
-            self.__text = await page.evaluate('() => document.body.innerText')
+class RobotsPolicy:
+    # robots.txt rules per origin, fetched once through the pooled HTTP client and cached.
+    # As in RFC 9309, a missing robots.txt (4xx) allows everything while a server error or
+    # an unreachable host counts as "disallow all" until the cached entry expires.
+    def __init__(self, global_config: Config):
+        self.enabled = global_config.get_bool("CRAWL_RESPECT_ROBOTS", True)
+        self.user_agent = global_config.get("CRAWL_USER_AGENT", "page-summarizer") or "page-summarizer"
+        self.ttl = global_config.get_float("CRAWL_ROBOTS_TTL_SECONDS", 3600)
+        self._rules = LruCache(max_entries=1024, max_bytes=1024)
+        self._flights = SingleFlight()
 
+    async def _fetch(self, origin: str) -> RobotFileParser:
+        robots_url = f"{origin}/robots.txt"
+        parser = RobotFileParser(robots_url)
+        try:
+            response = await get_http_client().get(robots_url, headers={"User-Agent": USER_AGENTS[0]}, timeout=10)
         except Exception as e:
-            console.print(f"[red]Error scraping {self.__url}: {e}[/red]")
-            self.__title = "Error"
-            self.__text = f"Could not scrape content: {str(e)}"
-            raise
-        finally:
-            if page:
-                console.print("Closing page")
-                await page.close()
-            if browser:
-                console.print("Closing browser")
-                await browser.close()
+            console.print(f"[yellow]Could not fetch {robots_url}, not crawling {origin}: {type(e).__name__}: {e}[/yellow]")
+            parser.disallow_all = True
+            return parser
+        if response.status_code >= 500:
+            console.print(f"[yellow]{robots_url} returned {response.status_code}, not crawling {origin}[/yellow]")
+            parser.disallow_all = True
+        elif response.status_code >= 400:
+            parser.allow_all = True
+        else:
+            parser.parse(response.text.splitlines())
+        return parser
 
-    # The constructor now needs to be async or call an async method
-    @classmethod
-    async def create(cls, url: str):
-        instance = cls()
-        instance.__url = url
-        await instance.scrape_async() # Scrape when created
-        return instance
+    async def rules(self, origin: str) -> Optional[RobotFileParser]:
+        # None when robots.txt is not respected
+        if not self.enabled:
+            return None
+        cached = self._rules.get(origin)
+        if cached and time.time() - cached[1] < self.ttl:
+            return cached[0]
+        parser = await self._flights.do(origin, lambda: self._fetch(origin))
+        self._rules.set(origin, (parser, time.time()), 1)
+        return parser
 
-    # Private constructor for the factory method
-    def __init__(self):
-        pass
+    def allowed(self, rules: Optional[RobotFileParser], url: str) -> bool:
+        return rules is None or rules.can_fetch(self.user_agent, url)
 
-    def __str__(self) -> str:
-        return f"Website(url={self.url}, title=\"{self.title}\")"
+    def crawl_delay(self, rules: Optional[RobotFileParser]) -> float:
+        delay = rules.crawl_delay(self.user_agent) if rules is not None else None
+        return float(delay or 0)
 
-LLMProvider = Literal["openai", "ollama", "anthropic", "google", "groq", "deepseek"]  
 
-class LlmSummarizer:
+class _HostSlot:
+    def __init__(self, concurrency: int):
+        self.semaphore = asyncio.Semaphore(concurrency)
+        self.next_start = 0.0
+
+
+class HostThrottle:
+    # Per-host politeness shared by all crawls: at most `concurrency` requests in flight
+    # per host, and request starts spaced at least `delay` seconds apart (or the site's
+    # robots.txt Crawl-delay when that is longer).
     def __init__(self, global_config: Config):
-        self.global_config = global_config
-        # For Google, API key is configured globally via the SDK usually
-        # but we'll accept it from the user for max flexibility
+        self.concurrency = max(1, global_config.get_int("CRAWL_HOST_CONCURRENCY", 4))
+        self.delay = global_config.get_float("CRAWL_HOST_DELAY_MS", 100) / 1000
+        self._slots = LruCache(max_entries=1024, max_bytes=1024)
 
-    def _get_system_prompt(self) -> Dict[str, str]:
-        return {
-            "role": "system",
-            "content": (
-                # "You are an assistant that analyzes the contents of a website "
-                # "and provides a short summary, ignoring the text that might be navigation-related. "
-                "You are faithful companion for fetching AI-powered website summaries!" 🐾
+    @asynccontextmanager
+    async def slot(self, host: str, delay: float = 0):
+        slot = self._slots.get(host)
+        if slot is None:
+            slot = _HostSlot(self.concurrency)
+            self._slots.set(host, slot, 1)
+        async with slot.semaphore:
+            now = time.monotonic()
+            start = max(now, slot.next_start)
+            # Reserve the start time before sleeping so concurrent callers queue up behind it
+            slot.next_start = start + max(self.delay, delay)
+            if start > now:
+                await asyncio.sleep(start - now)
+            yield
 
-""
-                "Respond in markdown and be concise."
-            )
-        }
 
-    def _get_user_prompt(self, website: Website) -> Dict[str, str]:
-        return {
-            "role": "user",
-            "content": (
-                f"You are looking at the website titled \"{website.title}\". "
-                "The content of this website is as follows; "
-                "please provide a short summary of this website in markdown. "
-                "If it includes news or announcements, then summarize these too.\n\n"
-                f"\"\"\"\n{website.text}\n\"\"\"\n\n"
-            )
-        }
-        
-    async def summarize(
+class SiteCrawler:
+    # Crawl mode: follows same-origin links from a start URL up to a depth and page limit.
+    # The frontier is worked by concurrent scrape workers (deduplicated on normalize_url,
+    # filtered by robots.txt, paced per host); pages go through Website.create, so the HTTP
+    # tier, the scrape cache and pooled browser pages are reused, and are summarized by LLM
+    # workers while the frontier is still growing. The page summaries are then rolled up
+    # into a site summary.
+    def __init__(self, global_config: Config):
+        self.default_max_pages = global_config.get_int("CRAWL_MAX_PAGES", 50)
+        self.max_pages_limit = global_config.get_int("CRAWL_MAX_PAGES_LIMIT", 200)
+        self.default_max_depth = global_config.get_int("CRAWL_MAX_DEPTH", 2)
+        self.max_depth_limit = global_config.get_int("CRAWL_MAX_DEPTH_LIMIT", 5)
+        self.default_scrape_concurrency = global_config.get_int("CRAWL_SCRAPE_CONCURRENCY", 8)
+        self.max_scrape_concurrency = global_config.get_int("CRAWL_MAX_SCRAPE_CONCURRENCY", 16)
+        self.default_llm_concurrency = global_config.get_int("CRAWL_LLM_CONCURRENCY", 8)
+        self.max_llm_concurrency = global_config.get_int("CRAWL_MAX_LLM_CONCURRENCY", 16)
+        self.max_crawl_delay = global_config.get_float("CRAWL_MAX_CRAWL_DELAY_SECONDS", 5)
+        self.robots = RobotsPolicy(global_config)
+        self.throttle = HostThrottle(global_config)
+        self.active = 0
+
+    @staticmethod
+    def origin(url: str) -> str:
+        parts = urlsplit(normalize_url(url))
+        return f"{parts.scheme}://{parts.netloc}"
+
+    @staticmethod
+    def in_scope(url: str, origin: str, path_prefix: Optional[str]) -> bool:
+        parts = urlsplit(normalize_url(url))
+        if f"{parts.scheme}://{parts.netloc}" != origin:
+            return False
+        if path_prefix and not parts.path.startswith(path_prefix):
+            return False
+        return not parts.path.lower().endswith(CRAWL_SKIP_EXTENSIONS)
+
+    async def check_start(self, start_url: str) -> None:
+        # Raised before streaming starts, so the client gets a plain HTTP error
+        if urlsplit(start_url).scheme not in ("http", "https"):
+            raise HTTPException(status_code=400, detail="Crawl mode needs an http(s) URL.")
+        if not self.robots.allowed(await self.robots.rules(self.origin(start_url)), start_url):
+            raise HTTPException(status_code=403, detail=f"robots.txt does not allow crawling {start_url}.")
+
+    async def crawl(
         self,
-        website_url: str,
+        start_url: str,
         llm_provider: LLMProvider,
         api_key: Optional[str] = None,
         model_name: Optional[str] = None,
-        base_url: Optional[str] = None
-    ) -> Optional[str]:
-        print("Started summarization i.e hitting the LLM")
-        try:
-            website = await Website.create(website_url)
-        except Exception as e:
-            raise HTTPException(status_code=500, detail=f"Failed to scrape website: {str(e)}")
+        base_url: Optional[str] = None,
+        max_pages: Optional[int] = None,
+        max_depth: Optional[int] = None,
+        path_prefix: Optional[str] = None,
+        scrape_budget_ms: Optional[int] = None,
+        scrape_concurrency: Optional[int] = None,
+        llm_concurrency: Optional[int] = None
+    ) -> AsyncIterator[Dict[str, Any]]:
+        # Yields a "page" event as each page is summarized (or fails), then a "site" event
+        # with the rolled-up summary
+        max_pages = min(max_pages or self.default_max_pages, self.max_pages_limit)
+        max_depth = min(self.default_max_depth if max_depth is None else max_depth, self.max_depth_limit)
+        scrape_concurrency = min(scrape_concurrency or self.default_scrape_concurrency, self.max_scrape_concurrency)
+        llm_concurrency = min(llm_concurrency or self.default_llm_concurrency, self.max_llm_concurrency)
+        origin = self.origin(start_url)
+        host = urlsplit(origin).netloc
+        rules = await self.robots.rules(origin)
+        crawl_delay = min(self.robots.crawl_delay(rules), self.max_crawl_delay)
+        console.print(f"Crawling {start_url}: up to {max_pages} pages, depth {max_depth}, {scrape_concurrency} scrape / {llm_concurrency} LLM workers")
 
-        if "Could not scrape content" in website.text:
-             raise HTTPException(status_code=500, detail=f"Failed to process website content from: {website.url}")
+        seen = {normalize_url(start_url)}
+        accepted = 1
+        skipped = {"robots": 0, "page_limit": 0}
+        frontier: asyncio.Queue = asyncio.Queue()
+        frontier.put_nowait((0, start_url, 0))
+        llm_queue: asyncio.Queue = asyncio.Queue(maxsize=llm_concurrency * 2)
+        results: asyncio.Queue = asyncio.Queue()
+        pages: List[Dict[str, Any]] = []
 
-        system_prompt_dict = self._get_system_prompt()
-        user_prompt_dict = self._get_user_prompt(website)
+        def discover(links: List[str], depth: int) -> None:
+            nonlocal accepted
+            if depth >= max_depth:
+                return
+            for link in links:
+                if not self.in_scope(link, origin, path_prefix):
+                    continue
+                key = normalize_url(link)
+                if key in seen:
+                    continue
+                seen.add(key)
+                if not self.robots.allowed(rules, link):
+                    skipped["robots"] += 1
+                elif accepted >= max_pages:
+                    skipped["page_limit"] += 1
+                else:
+                    frontier.put_nowait((accepted, link, depth + 1))
+                    accepted += 1
 
-        # For Google Gemini, the prompt structure is a bit different (no explicit 'system' role in simpler use)
-        # We can concatenate or adapt. For now, let's try a simple concatenation for Gemini.
-        # Or, Gemini supports specific "tools" and "system_instruction" in more advanced setups.
-        
-        # For Groq using OpenAI SDK, messages format is standard.
-
-        try:
-            if llm_provider == "openai":
-                if not api_key:
-                    raise HTTPException(status_code=400, detail="API key is required for OpenAI.")
-                effective_model = model_name or "gpt-4o-mini"
-                client = AsyncOpenAI(api_key=api_key, base_url=base_url)
-                messages_for_openai = [system_prompt_dict, user_prompt_dict]
-                response = await client.chat.completions.create(
-                    model=effective_model,
-                    messages=messages_for_openai,
-                    temperature=0.2,
-                    max_tokens=1024,
-                )
-                return response.choices[0].message.content
-
-            elif llm_provider == "ollama":
-                effective_model = model_name or "gemma2:9b"
-                ollama_url = base_url or self.global_config.ollama_base_url
-                client = AsyncOpenAI(base_url=ollama_url, api_key=api_key or "ollama")
-                messages_for_ollama = [system_prompt_dict, user_prompt_dict]
-                response = await client.chat.completions.create(
-                    model=effective_model,
-                    messages=messages_for_ollama,
-                    temperature=0.2,
-                    max_tokens=1024,
-                )
-                return response.choices[0].message.content
-            elif llm_provider == "deepseek":
-                if not api_key:
-                    raise HTTPException(status_code=400, detail="API key is required for DeepSeek.")
-                effective_model = model_name or "deepseek-chat"
-                client = AsyncOpenAI(api_key=api_key, base_url='https://api.deepseek.com')
-                messages_for_deepseek = [system_prompt_dict, user_prompt_dict]
-                response = await client.chat.completions.create(
-                    model=effective_model,
-                    messages=messages_for_deepseek,
-                    temperature=0.2,
-                    max_tokens=1024,
-                    stream=False
-                )
-                return response.choices[0].message.content
-            elif llm_provider == "anthropic":
-                if not api_key:
-                    raise HTTPException(status_code=400, detail="API key is required for Anthropic.")
-                effective_model = model_name or "claude-3-haiku-20240307"
-                client = AsyncAnthropic(api_key=api_key, base_url=base_url)
-                response = await client.messages.create(
-                    model=effective_model,
-                    system=system_prompt_dict['content'],
-                    messages=[user_prompt_dict],
-                    max_tokens=1024,
-                    temperature=0.2,
-                )
-                return response.content[0].text
-            
-            elif llm_provider == "google":
-                if not api_key:
-                    raise HTTPException(status_code=400, detail="API key is required for Google Generative AI.")
-                
-                # Configure the SDK with the API key
+        async def scrape_worker() -> None:
+            while True:
+                index, url, depth = await frontier.get()
+                started = time.time()
                 try:
-                    genai.configure(api_key=api_key)
+                    async with self.throttle.slot(host, crawl_delay):
+                        website = await summarizer_service.scrape(url, scrape_budget_ms)
+                    discover(website.links, depth)
+                    await llm_queue.put((index, url, depth, website, started))
                 except Exception as e:
-                    raise HTTPException(status_code=500, detail=f"Failed to configure Google AI SDK: {str(e)}")
-
-                effective_model = model_name or "gemini-1.5-flash-latest" # Or "gemini-pro"
-                
-                # Gemini models have different ways to handle system instructions.
-                # Option 1: Using `system_instruction` (for newer models that support it well)
-                # model_instance = genai.GenerativeModel(
-                #     model_name=effective_model,
-                #     system_instruction=system_prompt_dict['content']
-                # )
-                # full_prompt = user_prompt_dict['content']
-
-                # Option 2: Prepending system context to the user prompt (more broadly compatible)
-                model_instance = genai.GenerativeModel(model_name=effective_model)
-                full_prompt = f"{system_prompt_dict['content']}\n\n{user_prompt_dict['content']}"
-
-                # Non-streaming generation
-                # Note: The google-generativeai SDK's generate_content is synchronous.
-                # To make it async, we need to run it in a thread pool executor with FastAPI.
-                loop = asyncio.get_event_loop()
+                    detail = e.detail if isinstance(e, HTTPException) else f"Failed to scrape website: {str(e)}"
+                    await results.put({"type": "page", "index": index, "url": url, "depth": depth, "status": "error", "error": detail})
+                finally:
+                    frontier.task_done()
+
+        async def llm_worker() -> None:
+            while True:
+                item = await llm_queue.get()
+                if item is None:
+                    return
+                index, url, depth, website, started = item
                 try:
-                    # For safety config,
-                    safety_settings = [
-                        {"category": "HARM_CATEGORY_HARASSMENT", "threshold": "BLOCK_NONE"},
-                        {"category": "HARM_CATEGORY_HATE_SPEECH", "threshold": "BLOCK_NONE"},
-                        {"category": "HARM_CATEGORY_SEXUALLY_EXPLICIT", "threshold": "BLOCK_NONE"},
-                        {"category": "HARM_CATEGORY_DANGEROUS_CONTENT", "threshold": "BLOCK_NONE"},
-                    ]
-                    generation_config = genai.types.GenerationConfig(
-                        # candidate_count=1, # Default is 1
-                        # stop_sequences=['...'],
-                        max_output_tokens=1024,
-                        temperature=0.2,
-                        # top_p=...,
-                        # top_k=...
-                    )
-                    # The SDK call itself is sync
-                    response = await loop.run_in_executor(
-                        None, # Uses default ThreadPoolExecutor
-                        lambda: model_instance.generate_content(
-                            full_prompt,
-                            generation_config=generation_config,
-                            safety_settings=safety_settings
-                        )
-                    )
-                    # Check for empty response or blocked content
-                    if not response.candidates or not response.text:
-                         # Log the finish_reason and safety_ratings for debugging
-                        console.print(f"[yellow]Google AI response empty or blocked. Finish reason: {response.prompt_feedback if response.prompt_feedback else 'N/A'}. Safety ratings: {response.candidates[0].safety_ratings if response.candidates else 'N/A'}[/yellow]")
-                        # Try to get more info if available
-                        block_reason = "Unknown reason"
-                        if response.prompt_feedback and response.prompt_feedback.block_reason:
-                            block_reason = response.prompt_feedback.block_reason_message or str(response.prompt_feedback.block_reason)
-                        raise HTTPException(status_code=400, detail=f"Content generation blocked by Google AI. Reason: {block_reason}")
-                    return response.text
+                    summary = await summarizer_service.summarize_website(website, llm_provider, api_key, model_name, base_url)
+                    pages.append({"index": index, "url": url, "title": website.title, "summary": summary or ""})
+                    await results.put({
+                        "type": "page",
+                        "index": index,
+                        "url": url,
+                        "depth": depth,
+                        "status": "ok",
+                        "title": website.title,
+                        "summary": summary,
+                        "processing_time": f"{time.time() - started:.1f} seconds",
+                    })
                 except Exception as e:
-                    # Catch specific Google API errors if possible, or re-raise generic
-                    console.print(f"[red]Error with Google AI generation: {e}[/red]")
-                    if "API key not valid" in str(e):
-                         raise HTTPException(status_code=401, detail="Invalid Google API Key.")
-                    raise HTTPException(status_code=500, detail=f"Error during Google AI summarization: {str(e)}")
-
-            elif llm_provider == "groq":
-                if not api_key:
-                    raise HTTPException(status_code=400, detail="API key is required for Groq.")
-                
-                # Option 1: Using Groq's own SDK (AsyncGroqClient)
-                # effective_model = model_name or "llama3-8b-8192" # Check Groq docs for available models
-                # client = AsyncGroqClient(api_key=api_key, base_url=base_url) # base_url usually not needed for Groq Cloud
-                # messages_for_groq = [system_prompt_dict, user_prompt_dict]
-                # response = await client.chat.completions.create(
-                #     model=effective_model,
-                #     messages=messages_for_groq,
-                #     temperature=0.2,
-                #     max_output_tokens=1024, # Groq uses max_output_tokens
-                # )
-                # return response.choices[0].message.content
-
-                # Option 2: Using OpenAI SDK with Groq's endpoint (Often simpler if already using OpenAI SDK)
-                effective_model = model_name or "llama3-8b-8192" # Groq's default or common model
-                # Groq's OpenAI-compatible endpoint:
-                groq_openai_base_url = base_url or "https://api.groq.com/openai/v1"
-                
-                client = AsyncOpenAI(api_key=api_key, base_url=groq_openai_base_url)
-                messages_for_groq_openai = [system_prompt_dict, user_prompt_dict]
-                response = await client.chat.completions.create(
-                    model=effective_model,
-                    messages=messages_for_groq_openai,
-                    temperature=0.2,
-                    max_tokens=1024, # OpenAI SDK uses max_tokens
-                )
-                
-                return response.choices[0].message.content
+                    detail = e.detail if isinstance(e, HTTPException) else f"Error during summarization: {str(e)}"
+                    await results.put({"type": "page", "index": index, "url": url, "depth": depth, "status": "error", "error": detail})
 
-            else:
-                raise HTTPException(status_code=400, detail=f"Unsupported LLM provider: {llm_provider}")
+        async def run_pipeline() -> None:
+            scrape_tasks = [asyncio.create_task(scrape_worker()) for _ in range(scrape_concurrency)]
+            llm_tasks = [asyncio.create_task(llm_worker()) for _ in range(llm_concurrency)]
+            try:
+                # Workers add newly discovered pages before marking theirs done, so an empty
+                # frontier with nothing in progress means the crawl is complete
+                await frontier.join()
+                for _ in llm_tasks:
+                    await llm_queue.put(None)
+                await asyncio.gather(*llm_tasks)
+            finally:
+                for task in scrape_tasks + llm_tasks:
+                    task.cancel()
+                await results.put(None)
 
-        except HTTPException: # Re-raise known HTTPExceptions
-            raise
-        except Exception as e:
-            import traceback
-            console.print(f"[red]Error during summarization with {llm_provider} for {website.url}: {e}[/red]")
-            traceback.print_exc()
-            raise HTTPException(status_code=500, detail=f"Error during summarization: {str(e)}")
+        self.active += 1
+        pipeline = asyncio.create_task(run_pipeline())
+        try:
+            failed = 0
+            while True:
+                result = await results.get()
+                if result is None:
+                    break
+                if result["status"] != "ok":
+                    failed += 1
+                yield result
+            await pipeline
+
+            site = {"type": "site", "url": start_url, "pages": accepted, "succeeded": len(pages), "failed": failed, "skipped": skipped}
+            if not pages:
+                yield dict(site, status="error", error="None of the crawled pages could be summarized.")
+                return
+            pages.sort(key=lambda page: page["index"])
+            site_title = pages[0]["title"] if pages[0]["index"] == 0 else start_url
+            try:
+                summary = await summarizer_service.summarize_site(site_title, start_url, pages, llm_provider, api_key, model_name, base_url)
+                yield dict(site, status="ok", title=site_title, summary=summary)
+            except Exception as e:
+                detail = e.detail if isinstance(e, HTTPException) else f"Error during site summarization: {str(e)}"
+                yield dict(site, status="error", error=detail)
         finally:
-            console.print("Completed summarization i.e hitting the LLM")
+            # Client went away or the pipeline failed: stop all outstanding work
+            pipeline.cancel()
+            self.active -= 1
+
+class Startup:
+    # Cold-start bookkeeping. The process answers /health as soon as it is up; /ready
+    # only succeeds once the optional warm-up (launching Chromium with a blank page and
+    # pre-importing provider SDKs) has run, so a load balancer can hold traffic back.
+    def __init__(self, global_config: Config):
+        self.warm_browser = global_config.get_bool("STARTUP_WARM_BROWSER", True)
+        self.warm_providers = [
+            provider.strip() for provider in (global_config.get("STARTUP_WARM_PROVIDERS", "") or "").split(",") if provider.strip()
+        ]
+        self.import_budget_ms = global_config.get_float("IMPORT_TIME_BUDGET_MS", 1500)
+        self.import_seconds: Optional[float] = None
+        self.ready_seconds: Optional[float] = None
+        self.ready = False
+        self.checks: Dict[str, str] = {}
+        self._started = time.perf_counter()
+        self._task: Optional[asyncio.Task] = None
+
+    def record_import(self, seconds: float) -> None:
+        self.import_seconds = seconds
+        if self.import_budget_ms > 0 and seconds * 1000 > self.import_budget_ms:
+            console.print(f"[yellow]Importing the API took {seconds * 1000:.0f} ms, over the {self.import_budget_ms:.0f} ms budget[/yellow]")
+
+    async def _warm_up(self, pool: BrowserPool) -> None:
+        for provider in self.warm_providers:
+            adapter_class = PROVIDER_ADAPTERS.get(provider)
+            if adapter_class is None:
+                self.checks[f"sdk:{provider}"] = "unknown provider"
+                continue
+            try:
+                await asyncio.to_thread(importlib.import_module, adapter_class.sdk_module)
+                self.checks[f"sdk:{provider}"] = "ok"
+            except Exception as e:
+                self.checks[f"sdk:{provider}"] = f"failed: {e}"
+        if self.warm_browser:
+            try:
+                with stage_timer("browser_warm_up"):
+                    await pool.warm_up()
+                self.checks["browser"] = "ok"
+            except Exception as e:
+                # Not fatal: the HTTP tier still works and the pool retries on demand
+                console.print(f"[yellow]Browser warm-up failed: {e}[/yellow]")
+                self.checks["browser"] = f"failed: {e}"
+        self.ready = True
+        self.ready_seconds = time.perf_counter() - self._started
+        console.print(f"Ready {self.ready_seconds * 1000:.0f} ms after startup")
+
+    def start(self, pool: BrowserPool) -> None:
+        self._started = time.perf_counter()
+        self._task = asyncio.create_task(self._warm_up(pool))
+
+    async def close(self) -> None:
+        if self._task:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+
+    def status(self) -> Dict[str, Any]:
+        return {
+            "status": "ready" if self.ready else "starting",
+            "checks": self.checks,
+            "import_ms": round(self.import_seconds * 1000, 1) if self.import_seconds is not None else None,
+            "ready_ms": round(self.ready_seconds * 1000, 1) if self.ready_seconds is not None else None,
+        }
+
+
+# Load config, browser pool and summarizer once on startup
+config = Config()
+startup = Startup(global_config=config)
+browser_pool = BrowserPool(global_config=config)
+scrape_cache = ScrapeCache(global_config=config)
+http_fetcher = HttpFetcher(global_config=config)
+content_extractor = ContentExtractor(global_config=config)
+document_extractor = DocumentExtractor(global_config=config)
+sdk_executor = SdkExecutor(global_config=config)
+scrape_flights = SingleFlight()
+summarizer_service = LlmSummarizer(global_config=config)
+site_crawler = SiteCrawler(global_config=config)
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    scrape_cache.open()
+    summarizer_service.summary_cache.open()
+    summarizer_service.snapshots.open()
+    await browser_pool.start()
+    await job_manager.start()
+    startup.start(browser_pool)
+    try:
+        yield
+    finally:
+        await startup.close()
+        await job_manager.close()
+        await browser_pool.close()
+        await close_http_client()
+        await close_sdk_clients()
+        sdk_executor.close()
+        scrape_cache.close()
+        summarizer_service.summary_cache.close()
+        summarizer_service.snapshots.close()
 
 # --- FastAPI App ---
-app = FastAPI()
+app = FastAPI(lifespan=lifespan)
+
+@app.middleware("http")
+async def record_timings(request: Request, call_next):
+    # Every request gets a RequestTimings; stages recorded while handling it end up in
+    # the Server-Timing header (for streams, only those finished before the first byte)
+    timings = RequestTimings()
+    token = current_timings.set(timings)
+    try:
+        response = await call_next(request)
+    finally:
+        current_timings.reset(token)
+    route = request.scope.get("route")
+    path = getattr(route, "path", "unmatched")
+    metrics.request_seconds.observe(time.perf_counter() - timings.started, route=path, method=request.method)
+    response.headers["Server-Timing"] = timings.server_timing_header()
+    return response
 
 # Configure CORS with more specific settings
 app.add_middleware(
@@ -397,44 +3827,91 @@ app.add_middleware(
     expose_headers=["*"]
 )
 
-# Load config and summarizer once on startup
-config = Config()
-summarizer_service = LlmSummarizer(global_config=config)
-
 class SummarizeRequest(BaseModel):
     url: str
     llm_provider: LLMProvider = Field(..., description="The LLM provider to use")
     api_key: Optional[str] = Field(None, description="API key for the selected LLM provider (if required)")
     model_name: Optional[str] = Field(None, description="Specific model name for the provider")
     base_url: Optional[str] = Field(None, description="Custom base URL for the LLM API")
+    scrape_budget_ms: Optional[int] = Field(None, gt=0, description="Latency budget for rendering the page in the browser, in milliseconds")
+    routing: Optional[RoutingPolicy] = Field(None, description="Fallback/hedging across several providers")
+    incremental: bool = Field(False, description="Only send what changed since this page was last summarized, together with the previous summary")
 
-@app.post("/summarize")
-async def api_summarize_website(request: SummarizeRequest):
-    console.print(f"Received request: URL='{request.url}', Provider='{request.llm_provider}', Model='{request.model_name}' HasAPIKey={'Yes' if request.api_key else 'No'}, BaseURL: {request.base_url}")
-    try:
-        import time
-        start_time = time.time()
-        
-        summary_text = await summarizer_service.summarize(
-            website_url=request.url,
+    def routing_candidates(self) -> List[ProviderCandidate]:
+        primary = ProviderCandidate(llm_provider=self.llm_provider, api_key=self.api_key, model_name=self.model_name, base_url=self.base_url)
+        return [primary] + list(self.routing.candidates if self.routing else [])
+
+class BatchSummarizeRequest(BaseModel):
+    urls: List[str] = Field(..., min_length=1, description="URLs to summarize")
+    llm_provider: LLMProvider = Field(..., description="The LLM provider to use")
+    api_key: Optional[str] = Field(None, description="API key for the selected LLM provider (if required)")
+    model_name: Optional[str] = Field(None, description="Specific model name for the provider")
+    base_url: Optional[str] = Field(None, description="Custom base URL for the LLM API")
+    scrape_budget_ms: Optional[int] = Field(None, gt=0, description="Latency budget for rendering each page in the browser, in milliseconds")
+    scrape_concurrency: Optional[int] = Field(None, gt=0, description="Pages scraped at the same time")
+    llm_concurrency: Optional[int] = Field(None, gt=0, description="LLM calls running at the same time")
+
+class CrawlRequest(BaseModel):
+    url: str = Field(..., description="Start URL; only links on the same origin are followed")
+    llm_provider: LLMProvider = Field(..., description="The LLM provider to use")
+    api_key: Optional[str] = Field(None, description="API key for the selected LLM provider (if required)")
+    model_name: Optional[str] = Field(None, description="Specific model name for the provider")
+    base_url: Optional[str] = Field(None, description="Custom base URL for the LLM API")
+    max_pages: Optional[int] = Field(None, gt=0, description="Most pages to summarize, including the start page")
+    max_depth: Optional[int] = Field(None, ge=0, description="Most link hops away from the start page")
+    path_prefix: Optional[str] = Field(None, description="Only follow links whose path starts with this, e.g. /docs/")
+    scrape_budget_ms: Optional[int] = Field(None, gt=0, description="Latency budget for rendering each page in the browser, in milliseconds")
+    scrape_concurrency: Optional[int] = Field(None, gt=0, description="Pages scraped at the same time")
+    llm_concurrency: Optional[int] = Field(None, gt=0, description="LLM calls running at the same time")
+
+async def run_summarize_request(request: SummarizeRequest) -> Dict[str, Any]:
+    # Shared by POST /summarize and the job workers
+    import time
+    start_time = time.time()
+    
+    provider, model = request.llm_provider, request.model_name or "default model"
+    incremental = None
+    if request.routing and request.incremental:
+        raise HTTPException(status_code=400, detail="Incremental mode does not support routing; pick a single provider.")
+    if request.routing:
+        website = await summarizer_service.scrape(request.url, request.scrape_budget_ms)
+        summary_text, winner = await summarizer_service.summarize_routed(website, request.routing_candidates(), request.routing)
+        provider, model = winner.llm_provider, winner.effective_model
+    elif request.incremental:
+        website = await summarizer_service.scrape(request.url, request.scrape_budget_ms)
+        summary_text, incremental = await summarizer_service.summarize_incremental(
+            website, request.llm_provider, request.api_key, request.model_name, request.base_url
+        )
+    else:
+        website = await summarizer_service.scrape(request.url, request.scrape_budget_ms)
+        summary_text = await summarizer_service.summarize_website(
+            website,
             llm_provider=request.llm_provider,
             api_key=request.api_key,
             model_name=request.model_name,
             base_url=request.base_url
         )
-        
-        processing_time = f"{time.time() - start_time:.1f} seconds"
-        
-        return {
-            "summary": summary_text,
-            "metadata": {
-                "url": request.url,
-                "title": "Website Summary",
-                "provider": request.llm_provider,
-                "model": request.model_name or "default model",
-                "processing_time": processing_time
-            }
+    
+    processing_time = f"{time.time() - start_time:.1f} seconds"
+    
+    return {
+        "summary": summary_text,
+        "metadata": {
+            "url": request.url,
+            "title": "Website Summary",
+            "provider": provider,
+            "model": model,
+            "processing_time": processing_time,
+            "extraction": website.extraction,
+            "incremental": incremental
         }
+    }
+
+@app.post("/summarize")
+async def api_summarize_website(request: SummarizeRequest):
+    console.print(f"Received request: URL='{request.url}', Provider='{request.llm_provider}', Model='{request.model_name}' HasAPIKey={'Yes' if request.api_key else 'No'}, BaseURL: {request.base_url}")
+    try:
+        return await run_summarize_request(request)
     except HTTPException as e:
         console.print(f"[red]HTTPException for {request.url}: {e.detail}[/red]")
         raise e
@@ -444,72 +3921,431 @@ async def api_summarize_website(request: SummarizeRequest):
         traceback.print_exc()
         raise HTTPException(status_code=500, detail="An unexpected server error occurred.")
 
+def _timings_metadata() -> Optional[Dict[str, Any]]:
+    timings = current_timings.get()
+    return timings.to_metadata() if timings else None
+
+def _split_into_frames(text: str, frame_size: int = 256) -> List[str]:
+    # Cut a complete summary into SSE-sized pieces, preferring line boundaries
+    frames: List[str] = []
+    current = ""
+    for line in text.splitlines(keepends=True):
+        if current and len(current) + len(line) > frame_size:
+            frames.append(current)
+            current = ""
+        current += line
+    if current:
+        frames.append(current)
+    return frames
+
+class SseStream:
+    # Writes a stream of events as SSE frames. Content deltas are coalesced until
+    # `coalesce_chars` have accumulated or `coalesce_seconds` have passed since the first
+    # buffered delta, so a fast model produces a few larger writes instead of one write
+    # per token. Progress events reported while the events are produced (see
+    # report_progress) are sent as they happen, and a comment frame keeps idle
+    # connections open through proxies.
+    def __init__(self, global_config: Config):
+        self.coalesce_seconds = global_config.get_float("STREAM_COALESCE_MS", 25) / 1000
+        self.coalesce_chars = global_config.get_int("STREAM_COALESCE_CHARS", 512)
+        self.heartbeat_seconds = global_config.get_float("STREAM_HEARTBEAT_SECONDS", 15)
+
+    @staticmethod
+    def frame(event: Dict[str, Any]) -> str:
+        return f"data: {json.dumps(event)}\n\n"
+
+    async def frames(self, events: Callable[[], AsyncIterator[Dict[str, Any]]]) -> AsyncIterator[str]:
+        queue: asyncio.Queue = asyncio.Queue()
+        started = time.perf_counter()
+
+        def on_progress(stage: str, details: Dict[str, Any]) -> None:
+            queue.put_nowait(dict(details, stage=stage, elapsed_ms=round((time.perf_counter() - started) * 1000)))
+
+        async def produce() -> None:
+            # Runs as its own task, so the listener only sees this request's progress
+            current_progress.set(on_progress)
+            try:
+                async for event in events():
+                    queue.put_nowait(event)
+            except Exception as e:
+                queue.put_nowait({"error": f"Unexpected error: {str(e)}"})
+            finally:
+                queue.put_nowait(None)
+
+        producer = asyncio.create_task(produce())
+        pending: List[str] = []
+        pending_chars = 0
+        flush_at: Optional[float] = None
+
+        def flush(final: bool = False) -> Optional[str]:
+            nonlocal pending_chars, flush_at
+            word = 'markdown'
+            content = "".join(pending).replace(word, '')
+            pending.clear()
+            pending_chars = 0
+            flush_at = None
+            if not final:
+                # Hold back a tail that could be the start of the word, so a word split
+                # across two frames is still removed once the rest arrives
+                held = next((size for size in range(min(len(content), len(word) - 1), 0, -1) if word.startswith(content[-size:])), 0)
+                if held:
+                    pending.append(content[-held:])
+                    pending_chars = held
+                    content = content[:-held]
+            return self.frame({"content": content}) if content else None
+
+        try:
+            while True:
+                timeout = self.heartbeat_seconds if flush_at is None else max(0.0, flush_at - time.monotonic())
+                try:
+                    event = await asyncio.wait_for(queue.get(), timeout)
+                except asyncio.TimeoutError:
+                    # Coalescing window over, or idle for a heartbeat (then flush any held tail too)
+                    frame = flush(final=flush_at is None) if pending else ": keep-alive\n\n"
+                    if frame:
+                        yield frame
+                    continue
+                if event is not None and event.keys() == {"content"}:
+                    pending.append(event["content"])
+                    pending_chars += len(event["content"])
+                    if flush_at is None:
+                        flush_at = time.monotonic() + self.coalesce_seconds
+                    if pending_chars >= self.coalesce_chars:
+                        frame = flush()
+                        if frame:
+                            yield frame
+                    continue
+                if pending:
+                    frame = flush(final=True)
+                    if frame:
+                        yield frame
+                if event is None:
+                    return
+                yield self.frame(event)
+        finally:
+            producer.cancel()
+
+
+sse_stream = SseStream(global_config=config)
+
+async def summary_stream_events(request: SummarizeRequest) -> AsyncIterator[Dict[str, Any]]:
+    # Events of POST /summarize/stream: progress stages, content deltas, then `done` or `error`
+    import time
+    start_time = time.time()
+    report_progress("queued")
+
+    # First, scrape the website
+    try:
+        with stage_timer("scrape_total"):
+            website = await Website.create(request.url, budget_ms=request.scrape_budget_ms)
+    except HTTPException as e:
+        yield {'error': e.detail}
+        return
+
+    if "Could not scrape content" in website.text:
+        yield {'error': f'Failed to process website content from: {website.url}'}
+        return
+
+    if request.routing and request.incremental:
+        yield {'error': 'Incremental mode does not support routing; pick a single provider.'}
+        return
+
+    if request.incremental:
+        outcome: Dict[str, Any] = {}
+        report_progress("llm_started", provider=request.llm_provider, model=request.model_name or DEFAULT_MODELS[request.llm_provider])
+        try:
+            async for delta in summarizer_service.stream_incremental(
+                website, request.llm_provider, request.api_key, request.model_name, request.base_url, outcome
+            ):
+                yield {'content': delta}
+        except HTTPException as e:
+            yield {'error': e.detail}
+            return
+        processing_time = f"{time.time() - start_time:.1f} seconds"
+        yield {'done': True, 'metadata': {'url': request.url, 'title': website.title, 'provider': request.llm_provider, 'model': request.model_name or DEFAULT_MODELS[request.llm_provider], 'processing_time': processing_time, 'timings': _timings_metadata(), 'extraction': website.extraction, 'incremental': outcome}}
+        return
+
+    if request.routing:
+        outcome: Dict[str, Any] = {}
+        report_progress("llm_started", provider=request.llm_provider, model=request.model_name or DEFAULT_MODELS[request.llm_provider])
+        try:
+            async for delta in summarizer_service.stream_routed(website, request.routing_candidates(), request.routing, outcome):
+                yield {'content': delta}
+        except HTTPException as e:
+            yield {'error': e.detail}
+            return
+        winner = outcome["candidate"]
+        processing_time = f"{time.time() - start_time:.1f} seconds"
+        yield {'done': True, 'metadata': {'url': request.url, 'title': website.title, 'provider': winner.llm_provider, 'model': winner.effective_model, 'processing_time': processing_time, 'cached': outcome['cached'], 'timings': _timings_metadata(), 'extraction': website.extraction}}
+        return
+
+    # Replay a cached summary for unchanged content instead of hitting the LLM again
+    cache_key = summarizer_service.summary_cache_key(website, request.llm_provider, request.model_name, request.base_url)
+    cached_summary = await summarizer_service.summary_cache.get(cache_key)
+    if cached_summary is not None:
+        console.print(f"Summary cache hit for {website.url} ({request.llm_provider}), replaying as stream")
+        for frame in _split_into_frames(cached_summary):
+            yield {'content': frame}
+        processing_time = f"{time.time() - start_time:.1f} seconds"
+        yield {'done': True, 'metadata': {'url': request.url, 'title': website.title, 'provider': request.llm_provider, 'model': request.model_name or DEFAULT_MODELS[request.llm_provider], 'processing_time': processing_time, 'cached': True, 'timings': _timings_metadata(), 'extraction': website.extraction}}
+        return
+
+    # Every provider streams tokens from the website scraped above
+    effective_model = request.model_name or DEFAULT_MODELS[request.llm_provider]
+    report_progress("llm_started", provider=request.llm_provider, model=effective_model)
+    try:
+        async for delta in summarizer_service.stream_summary(
+            website, request.llm_provider, request.api_key, request.model_name, request.base_url
+        ):
+            yield {'content': delta}
+
+        processing_time = f"{time.time() - start_time:.1f} seconds"
+        yield {'done': True, 'metadata': {'url': request.url, 'title': website.title, 'provider': request.llm_provider, 'model': effective_model, 'processing_time': processing_time, 'timings': _timings_metadata(), 'extraction': website.extraction}}
+
+    except HTTPException as e:
+        yield {'error': e.detail}
+    except Exception as e:
+        console.print(f"[red]Error during {request.llm_provider} streaming for {request.url}: {e}[/red]")
+        yield {'error': f'Error during {request.llm_provider} streaming: {str(e)}'}
+
 @app.post("/summarize/stream")
 async def api_summarize_website_stream(request: SummarizeRequest):
     console.print(f"Received streaming request: URL='{request.url}', Provider='{request.llm_provider}', Model='{request.model_name}' HasAPIKey={'Yes' if request.api_key else 'No'}, BaseURL: {request.base_url}")
-    
-    async def generate_stream():
-        try:
-            import time
-            start_time = time.time()
-            
-            # First, scrape the website
-            website = await Website.create(request.url)
-            
-            if "Could not scrape content" in website.text:
-                yield f"data: {json.dumps({'error': f'Failed to process website content from: {website.url}'})}\n\n"
-                return
 
-            system_prompt_dict = summarizer_service._get_system_prompt()
-            user_prompt_dict = summarizer_service._get_user_prompt(website)
+    return StreamingResponse(
+        sse_stream.frames(lambda: summary_stream_events(request)),
+        media_type="text/plain",
+        headers={
+            "Cache-Control": "no-cache",
+            "Connection": "keep-alive",
+            "Content-Type": "text/event-stream",
+        }
+    )
+
+@app.post("/summarize/batch")
+async def api_summarize_batch(request: BatchSummarizeRequest):
+    console.print(f"Received batch request: {len(request.urls)} URLs, Provider='{request.llm_provider}', Model='{request.model_name}' HasAPIKey={'Yes' if request.api_key else 'No'}")
+    max_urls = config.get_int("BATCH_MAX_URLS", 100)
+    if len(request.urls) > max_urls:
+        raise HTTPException(status_code=400, detail=f"A batch can contain at most {max_urls} URLs.")
+    scrape_concurrency = min(request.scrape_concurrency or config.get_int("BATCH_SCRAPE_CONCURRENCY", 4), config.get_int("BATCH_MAX_SCRAPE_CONCURRENCY", 8))
+    llm_concurrency = min(request.llm_concurrency or config.get_int("BATCH_LLM_CONCURRENCY", 4), config.get_int("BATCH_MAX_LLM_CONCURRENCY", 8))
 
-            if request.llm_provider == "openai" or request.llm_provider == "deepseek":
-                if not request.api_key:
-                    yield f"data: {json.dumps({'error': 'API key is required for OpenAI.'})}\n\n"
-                    return
-                
-                effective_model = request.model_name or "deepseek-chat" if request.llm_provider == "deepseek" else "gpt-4o-mini"
-                client = AsyncOpenAI(api_key=request.api_key, base_url=request.base_url if request.llm_provider == "openai" else "https://api.deepseek.com")
-                messages_for_openai = [system_prompt_dict, user_prompt_dict]
-                
-                try:
-                    stream = await client.chat.completions.create(
-                        model=effective_model,
-                        messages=messages_for_openai,
-                        temperature=0.2,
-                        max_tokens=1024,
-                        stream=True
-                    )
-                    
-                    async for chunk in stream:
-                        if chunk.choices[0].delta.content is not None:
-                            yield f"data: {json.dumps({'content': chunk.choices[0].delta.content.replace('markdown', '')})}\n\n"
-                    
-                    processing_time = f"{time.time() - start_time:.1f} seconds"
-                    yield f"data: {json.dumps({'done': True, 'metadata': {'url': request.url, 'title': website.title, 'provider': request.llm_provider, 'model': effective_model, 'processing_time': processing_time}})}\n\n"
-                    
-                except Exception as e:
-                    yield f"data: {json.dumps({'error': f'Error during OpenAI streaming: {str(e)}'})}\n\n"
-            
+    async def generate_results():
+        import time
+        start_time = time.time()
+        succeeded = failed = 0
+        async for result in summarizer_service.summarize_many(
+            urls=request.urls,
+            llm_provider=request.llm_provider,
+            api_key=request.api_key,
+            model_name=request.model_name,
+            base_url=request.base_url,
+            scrape_budget_ms=request.scrape_budget_ms,
+            scrape_concurrency=scrape_concurrency,
+            llm_concurrency=llm_concurrency
+        ):
+            if result["status"] == "ok":
+                succeeded += 1
             else:
-                # For non-OpenAI providers, fall back to regular summarization
-                summary_text = await summarizer_service.summarize(
-                    website_url=request.url,
-                    llm_provider=request.llm_provider,
-                    api_key=request.api_key,
-                    model_name=request.model_name,
-                    base_url=request.base_url
-                )
-                yield f"data: {json.dumps({'content': summary_text})}\n\n"
-                
-                processing_time = f"{time.time() - start_time:.1f} seconds"
-                yield f"data: {json.dumps({'done': True, 'metadata': {'url': request.url, 'title': website.title, 'provider': request.llm_provider, 'model': request.model_name or 'default model', 'processing_time': processing_time}})}\n\n"
-                
-        except Exception as e:
-            yield f"data: {json.dumps({'error': f'Unexpected error: {str(e)}'})}\n\n"
+                failed += 1
+            yield json.dumps(result) + "\n"
+        processing_time = f"{time.time() - start_time:.1f} seconds"
+        yield json.dumps({"done": True, "total": len(request.urls), "succeeded": succeeded, "failed": failed, "processing_time": processing_time}) + "\n"
+
+    return StreamingResponse(
+        generate_results(),
+        media_type="application/x-ndjson",
+        headers={"Cache-Control": "no-cache"}
+    )
+
+@app.post("/crawl")
+async def api_crawl_site(request: CrawlRequest):
+    console.print(f"Received crawl request: URL='{request.url}', Provider='{request.llm_provider}', Model='{request.model_name}' HasAPIKey={'Yes' if request.api_key else 'No'}")
+    await site_crawler.check_start(request.url)
+
+    async def generate_events():
+        start_time = time.time()
+        async for event in site_crawler.crawl(
+            start_url=request.url,
+            llm_provider=request.llm_provider,
+            api_key=request.api_key,
+            model_name=request.model_name,
+            base_url=request.base_url,
+            max_pages=request.max_pages,
+            max_depth=request.max_depth,
+            path_prefix=request.path_prefix,
+            scrape_budget_ms=request.scrape_budget_ms,
+            scrape_concurrency=request.scrape_concurrency,
+            llm_concurrency=request.llm_concurrency
+        ):
+            yield json.dumps(event) + "\n"
+        yield json.dumps({"type": "done", "done": True, "processing_time": f"{time.time() - start_time:.1f} seconds"}) + "\n"
+
+    return StreamingResponse(
+        generate_events(),
+        media_type="application/x-ndjson",
+        headers={"Cache-Control": "no-cache"}
+    )
+
+# --- Jobs ---
+JobStatus = Literal["queued", "running", "succeeded", "failed"]
+
+class Job:
+    def __init__(self, request: SummarizeRequest):
+        self.id = uuid.uuid4().hex
+        self.request = request
+        self.status: JobStatus = "queued"
+        self.created_at = time.time()
+        self.started_at: Optional[float] = None
+        self.finished_at: Optional[float] = None
+        self.result: Optional[Dict[str, Any]] = None
+        self.error: Optional[str] = None
+        self.error_status_code: Optional[int] = None
+        self._changed = asyncio.Event()
+
+    @property
+    def finished(self) -> bool:
+        return self.status in ("succeeded", "failed")
+
+    def update(self, status: JobStatus) -> None:
+        self.status = status
+        self._changed.set()
+        self._changed = asyncio.Event()
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "id": self.id,
+            "status": self.status,
+            "url": self.request.url,
+            "created_at": self.created_at,
+            "started_at": self.started_at,
+            "finished_at": self.finished_at,
+            "result": self.result,
+            "error": self.error,
+            "error_status_code": self.error_status_code,
+        }
+
+    async def updates(self) -> AsyncIterator[Dict[str, Any]]:
+        # Current state first, then every change until the job finishes
+        while True:
+            changed = self._changed
+            yield self.to_dict()
+            if self.finished:
+                return
+            await changed.wait()
+
+class QueueFullError(Exception):
+    def __init__(self, retry_after: int):
+        super().__init__(f"Job queue is full, retry after {retry_after} seconds")
+        self.retry_after = retry_after
+
+class JobManager:
+    # In-process job queue: a bounded asyncio.Queue drained by a fixed pool of worker
+    # tasks, so bursts wait their turn instead of piling browsers and LLM calls onto
+    # the process. Finished jobs are kept for `result_ttl` seconds.
+    def __init__(self, global_config: Config):
+        self.workers = max(1, global_config.get_int("JOBS_WORKERS", 4))
+        self.queue_size = max(1, global_config.get_int("JOBS_QUEUE_SIZE", 100))
+        self.result_ttl = global_config.get_float("JOBS_RESULT_TTL_SECONDS", 3600)
+        self.jobs: "OrderedDict[str, Job]" = OrderedDict()
+        self._queue: Optional[asyncio.Queue] = None
+        self._tasks: List[asyncio.Task] = []
+        self._durations: deque = deque(maxlen=50)
+        self.running = 0
+
+    @property
+    def depth(self) -> int:
+        return self._queue.qsize() if self._queue else 0
+
+    async def start(self) -> None:
+        self._queue = asyncio.Queue(maxsize=self.queue_size)
+        self._tasks = [asyncio.create_task(self._worker()) for _ in range(self.workers)]
+
+    async def close(self) -> None:
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+    def retry_after(self) -> int:
+        # Rough time until a queue slot frees up, from recent job durations
+        average = sum(self._durations) / len(self._durations) if self._durations else 10.0
+        return max(1, math.ceil(average * max(1, self.depth) / self.workers))
+
+    def _evict_expired(self) -> None:
+        now = time.time()
+        for job_id in [job_id for job_id, job in self.jobs.items() if job.finished and now - job.finished_at > self.result_ttl]:
+            del self.jobs[job_id]
+
+    def submit(self, request: SummarizeRequest) -> Job:
+        if self._queue is None:
+            raise RuntimeError("Job manager is not running")
+        self._evict_expired()
+        job = Job(request)
+        try:
+            self._queue.put_nowait(job)
+        except asyncio.QueueFull:
+            raise QueueFullError(self.retry_after())
+        self.jobs[job.id] = job
+        return job
+
+    def get(self, job_id: str) -> Optional[Job]:
+        return self.jobs.get(job_id)
+
+    async def _worker(self) -> None:
+        while True:
+            job = await self._queue.get()
+            job.started_at = time.time()
+            self.running += 1
+            job.update("running")
+            try:
+                job.result = await run_summarize_request(job.request)
+                status = "succeeded"
+            except HTTPException as e:
+                job.error, job.error_status_code = str(e.detail), e.status_code
+                status = "failed"
+            except Exception as e:
+                console.print(f"[red]Job {job.id} failed: {e}[/red]")
+                job.error, job.error_status_code = f"Unexpected error: {str(e)}", 500
+                status = "failed"
+            finally:
+                self.running -= 1
+                self._queue.task_done()
+            job.finished_at = time.time()
+            self._durations.append(job.finished_at - job.started_at)
+            job.update(status)
+
+job_manager = JobManager(global_config=config)
+
+@app.post("/jobs", status_code=202)
+async def api_submit_job(request: SummarizeRequest):
+    try:
+        job = job_manager.submit(request)
+    except QueueFullError as e:
+        raise HTTPException(status_code=429, detail=str(e), headers={"Retry-After": str(e.retry_after)})
+    console.print(f"Queued job {job.id}: URL='{request.url}', Provider='{request.llm_provider}' (queue depth {job_manager.depth})")
+    return {"id": job.id, "status": job.status, "queue_depth": job_manager.depth}
+
+@app.get("/jobs/{job_id}")
+async def api_get_job(job_id: str):
+    job = job_manager.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return job.to_dict()
+
+@app.get("/jobs/{job_id}/events")
+async def api_job_events(job_id: str):
+    job = job_manager.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+
+    async def generate_events():
+        async for state in job.updates():
+            yield f"data: {json.dumps(state)}\n\n"
 
     return StreamingResponse(
-        generate_stream(),
+        generate_events(),
         media_type="text/plain",
         headers={
             "Cache-Control": "no-cache",
@@ -518,7 +4354,41 @@ async def api_summarize_website_stream(request: SummarizeRequest):
         }
     )
 
+metrics.gauge("summarizer_browser_pages_active", "Browser pages currently checked out of the pool", lambda: browser_pool.active_pages)
+metrics.gauge("summarizer_jobs_queue_depth", "Jobs waiting in the queue", lambda: job_manager.depth)
+metrics.gauge("summarizer_jobs_running", "Jobs currently being processed", lambda: job_manager.running)
+metrics.gauge("summarizer_scrapes_in_flight", "Distinct page renders in flight", lambda: len(scrape_flights))
+metrics.gauge("summarizer_llm_calls_in_flight", "Distinct LLM calls in flight", lambda: len(summarizer_service.summary_flights) + len(summarizer_service.stream_flights))
+metrics.gauge("summarizer_llm_calls_waiting", "LLM calls waiting for a provider rate-limit or concurrency permit", lambda: summarizer_service.governor.waiting)
+metrics.gauge("summarizer_llm_calls_active", "LLM calls holding a provider permit", lambda: summarizer_service.governor.active)
+metrics.gauge("summarizer_sdk_executor_queue_depth", "Sync SDK calls waiting for a thread", lambda: sdk_executor.pending)
+metrics.gauge("summarizer_crawls_active", "Site crawls in progress", lambda: site_crawler.active)
+metrics.gauge("summarizer_import_seconds", "Time taken to import the API module", lambda: startup.import_seconds or 0)
+metrics.gauge("summarizer_ready", "1 once the startup warm-up has finished", lambda: int(startup.ready))
+
+@app.get("/metrics", response_class=PlainTextResponse)
+async def prometheus_metrics():
+    return PlainTextResponse(metrics.render(), media_type="text/plain; version=0.0.4")
+
+@app.get("/routing/stats")
+async def routing_stats():
+    return summarizer_service.provider_stats.snapshot()
+
+@app.get("/llm/limits")
+async def llm_limits():
+    return summarizer_service.governor.snapshot()
+
 # Add a health check endpoint
 @app.get("/health")
 async def health_check():
+    # Liveness only: the process is up and serving requests
     return {"status": "ok"}
+
+@app.get("/ready")
+async def readiness_check():
+    # Readiness: 503 until the startup warm-up has finished
+    if not startup.ready:
+        raise HTTPException(status_code=503, detail=startup.status())
+    return startup.status()
+
+startup.record_import(time.perf_counter() - _import_started)
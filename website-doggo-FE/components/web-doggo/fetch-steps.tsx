@@ -6,11 +6,21 @@ interface FetchStepsProps {
   currentStep: number
 }
 
+// Progress stages sent by /summarize/stream, mapped to the step they move the dog to.
+// The first summary content moves it to the last step ("Returning").
+export const STAGE_STEPS: Record<string, number> = {
+  queued: 0,
+  browser_acquired: 1,
+  navigated: 1,
+  extracted: 2,
+  llm_started: 3,
+}
+
 export const FetchSteps = ({ currentStep }: FetchStepsProps) => {
   const steps = [
     { id: 0, name: "Sniffing", description: "Finding the website", emoji: "👃" },
-    { id: 1, name: "Digging", description: "Extracting content", emoji: "🕳️" },
-    { id: 2, name: "Chasing", description: "Gathering information", emoji: "🏃‍♂️" },
+    { id: 1, name: "Digging", description: "Opening the page", emoji: "🕳️" },
+    { id: 2, name: "Chasing", description: "Extracting content", emoji: "🏃‍♂️" },
     { id: 3, name: "Fetching", description: "Getting AI summary", emoji: "🦴" },
     { id: 4, name: "Returning", description: "Bringing results", emoji: "🎾" },
   ]
@@ -7,7 +7,7 @@ import { DoggoAnimation } from './doggo-animation';
 import { DoggoResults } from './doggo-results';
 import { DoggoError } from './doggo-error';
 import { BreedSelector } from './breed-selector';
-import { FetchSteps } from './fetch-steps';
+import { FetchSteps, STAGE_STEPS } from './fetch-steps';
 
 interface SummaryRequest {
     url: string;
@@ -90,29 +90,9 @@ export default function WebDoggoApp() {
         console.log('formData', formData);
 
         try {
-            // Simulate the different steps of the fetching process
-            const steps = [
-                'Sniffing out the website',
-                'Digging through the content',
-                'Chasing down key information',
-                'Fetching the AI summary',
-                'Bringing back the results',
-            ];
-
-            for (let i = 0; i < steps.length; i++) {
-                await new Promise((resolve) => setTimeout(resolve, 5000));
-                setCurrentStep(i + 1);
-            }
-
-            // Use streaming for OpenAI, regular request for others
-            if (
-                formData.llm_provider === 'openai' ||
-                formData.llm_provider === 'deepseek'
-            ) {
-                await handleStreamingRequest(formData);
-            } else {
-                await handleRegularRequest(formData);
-            }
+            // Every provider streams tokens from the API; the steps follow
+            // the progress events it sends before the first token
+            await handleStreamingRequest(formData);
         } catch (err) {
             setError(
                 'Woof! Make sure you have entered correct API key and model name. Let&apos;s try again! 🐕'
@@ -144,6 +124,7 @@ export default function WebDoggoApp() {
         }
 
         let summaryText = '';
+        let buffer = '';
         const decoder = new TextDecoder();
 
         // Initialize summary data with empty content
@@ -163,10 +144,16 @@ export default function WebDoggoApp() {
                 const { done, value } = await reader.read();
                 if (done) break;
 
-                const chunk = decoder.decode(value);
-                const lines = chunk.split('\n');
+                // Events can be split across chunks, so keep any partial
+                // event in the buffer until its blank-line terminator arrives
+                buffer += decoder.decode(value, { stream: true });
+                const events = buffer.split('\n\n');
+                buffer = events.pop() ?? '';
 
-                for (const line of lines) {
+                for (const line of events.flatMap((event) =>
+                    event.split('\n')
+                )) {
+                    // Lines starting with ':' are keep-alive comments
                     if (line.startsWith('data: ')) {
                         try {
                             const data = JSON.parse(line.slice(6));
@@ -176,7 +163,34 @@ export default function WebDoggoApp() {
                                 return;
                             }
 
+                            if (data.stage) {
+                                const step = STAGE_STEPS[data.stage];
+                                if (step !== undefined) {
+                                    setCurrentStep((prev) =>
+                                        Math.max(prev, step)
+                                    );
+                                }
+                                if (data.title) {
+                                    setSummaryData((prev) =>
+                                        prev
+                                            ? {
+                                                  ...prev,
+                                                  metadata: {
+                                                      ...prev.metadata,
+                                                      title: data.title,
+                                                  },
+                                              }
+                                            : null
+                                    );
+                                }
+                            }
+
                             if (data.content) {
+                                if (!summaryText) {
+                                    // Show the summary as soon as it starts
+                                    setCurrentStep(4);
+                                    setIsFetching(false);
+                                }
                                 summaryText += data.content;
                                 // Update the summary in real-time
                                 setSummaryData((prev) =>
@@ -216,29 +230,6 @@ export default function WebDoggoApp() {
         }
     };
 
-    const handleRegularRequest = async (formData: SummaryRequest) => {
-        const response = await fetch(
-            `${process.env.NEXT_PUBLIC_SUMMARIZER_API_URL}/summarize`,
-            {
-                method: 'POST',
-                headers: {
-                    'Content-Type': 'application/json',
-                },
-                body: JSON.stringify(formData),
-            }
-            // trigger deployment
-        );
-
-        console.log('response', response.status);
-        if (!response.ok) {
-            console.log('response', await response.text());
-            throw new Error(`HTTP error! status: ${response.status}`);
-        }
-
-        const data: SummaryResponse = await response.json();
-        setSummaryData(data);
-    };
-
     const handleBackToForm = () => {
         setShowForm(true);
         setError(null);